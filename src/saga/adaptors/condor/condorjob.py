@@ -7,6 +7,8 @@ __license__   = "MIT"
 """ Condor job adaptor implementation
 """
 
+import radical.utils as ru
+
 import saga.utils.pty_shell
 
 import saga.url as surl
@@ -19,12 +21,46 @@ from saga.utils.job     import TransferDirectives
 import re
 import os
 import time
+import hashlib
+import threading
 from urlparse import parse_qs
 from tempfile import NamedTemporaryFile
 
 SYNC_CALL  = saga.adaptors.cpi.decorators.SYNC_CALL
 ASYNC_CALL = saga.adaptors.cpi.decorators.ASYNC_CALL
 
+MONITOR_UPDATE_INTERVAL = 3  # seconds
+
+
+# --------------------------------------------------------------------
+#
+class _job_event_monitor(threading.Thread):
+    """ thread that periodically tails the job service's user event log, and
+        thus drives job state changes and callbacks
+    """
+    def __init__(self, job_service):
+
+        self.logger = job_service._logger
+        self.js     = job_service
+        self._stop  = threading.Event()
+
+        super(_job_event_monitor, self).__init__()
+        self.setDaemon(True)
+
+    def stop(self):
+        self._stop.set()
+
+    def stopped(self):
+        return self._stop.isSet()
+
+    def run(self):
+        while not self.stopped():
+            try:
+                self.js._read_event_log()
+            except Exception as e:
+                self.logger.warning("Exception caught in job event monitor: %s" % e)
+            self._stop.wait(MONITOR_UPDATE_INTERVAL)
+
 
 # --------------------------------------------------------------------
 #
@@ -62,9 +98,85 @@ def _condor_to_saga_jobstate(condorjs):
 
 # --------------------------------------------------------------------
 #
-def _condorscript_generator(url, logger, jds, option_dict=None):
+_EVENT_HEADER_RE = re.compile(r'^(\d{3}) \((\d+)\.(\d+)\.\d+\) (\S+ \S+) (.*)$')
+_EVENT_RETVAL_RE = re.compile(r'\(return value (-?\d+)\)')
+_EVENT_SIGNAL_RE = re.compile(r'\(signal (\d+)\)')
+_EVENT_HOST_RE   = re.compile(r'host:\s*<([^:?>]+)')
+
+def _parse_condor_events(data):
+    """ parses (a chunk of) a Condor user event log.  Events look like this:
+
+        005 (123.000.000) 2017-09-27 07:08:42 Job terminated.
+                (1) Normal termination (return value 0)
+                ...
+        ...
+
+    Returns a tuple of the list of complete events found, and the number of
+    bytes consumed from `data` -- an incomplete trailing event is not consumed,
+    and should be parsed again once the remainder arrived.  Events are dicts
+    with the keys 'code', 'pid' (as 'cluster.proc'), 'time' and 'text'.
+    """
+
+    events   = list()
+    consumed = 0
+    offset   = 0
+    current  = None
+
+    for line in data.splitlines(True):
+
+        offset += len(line)
+
+        # skip incomplete lines
+        if not line.endswith('\n'):
+            break
+
+        line = line.rstrip('\r\n')
+
+        if line == '...':
+            if current:
+                events.append(current)
+            current  = None
+            consumed = offset
+            continue
+
+        if current is None:
+            match = _EVENT_HEADER_RE.match(line)
+            if match:
+                code, cluster, proc, ts, text = match.groups()
+                current = {'code' : int(code),
+                           'pid'  : '%d.%d' % (int(cluster), int(proc)),
+                           'time' : ts,
+                           'text' : [text]}
+        else:
+            current['text'].append(line.strip())
+
+    return events, consumed
+
+
+# --------------------------------------------------------------------
+#
+def _file_hash(path):
+    """ returns the sha1 hexdigest of the given local file's content
+    """
+
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                break
+            sha1.update(chunk)
+
+    return sha1.hexdigest()
+
+
+# --------------------------------------------------------------------
+#
+def _condorscript_generator(url, logger, jds, option_dict=None, event_log=None):
     """ 
-    generates a Condor script from a set of SAGA job descriptions
+    generates a Condor script from a set of SAGA job descriptions.  If
+    `event_log` is given, all jobs write their events into that (absolute)
+    user log file, instead of individual logs in their working directories.
     """
 
     if not isinstance(jds, list):
@@ -214,8 +326,11 @@ def _condorscript_generator(url, logger, jds, option_dict=None):
         if jd.working_directory:
             job_pwd = jd.working_directory
             condor_file += "\ninitialdir   = %s " % job_pwd
-        logname = "saga-condor-job-$(cluster)_$(process).log"
-        condor_file += "\nlog          = %s " % os.path.join(job_pwd, logname)
+        if event_log:
+            condor_file += "\nlog          = %s " % event_log
+        else:
+            logname = "saga-condor-job-$(cluster)_$(process).log"
+            condor_file += "\nlog          = %s " % os.path.join(job_pwd, logname)
 
         # output -> output
         if jd.output is not None:
@@ -243,6 +358,16 @@ def _condorscript_generator(url, logger, jds, option_dict=None):
 #
 _CACHE_TIMEOUT = 5.0
 
+# max number of clusters we put into a single condor_q constraint expression
+# (to stay clear of command line length limits)
+_BULK_QUERY_MAX = 1024
+
+# remote directory (relative to the shell's home) for the staging cache
+_STAGE_CACHE_DIR = '.saga/adaptors/condor/staging'
+
+# job states which will not change anymore
+_FINAL_STATES = [saga.job.DONE, saga.job.FAILED, saga.job.CANCELED]
+
 # --------------------------------------------------------------------
 # the adaptor name
 #
@@ -257,6 +382,39 @@ _ADAPTOR_OPTIONS       = [{
         'documentation' : '''Enable condor_history for state checks (slow)''',
         'env_variable'  : 'SAGA_CONDOR_USE_HISTORY'
         },
+        {
+        'category'      : 'saga.adaptor.condorjob',
+        'name'          : 'bulk_query',
+        'type'          : bool,
+        'default'       : False,
+        'valid_options' : [True, False],
+        'documentation' : '''Query the states of all clusters in a container
+                             with a single condor_q (and condor_history) call,
+                             instead of one call per cluster''',
+        'env_variable'  : 'SAGA_CONDOR_BULK_QUERY'
+        },
+        {
+        'category'      : 'saga.adaptor.condorjob',
+        'name'          : 'use_event_log',
+        'type'          : bool,
+        'default'       : False,
+        'valid_options' : [True, False],
+        'documentation' : '''Track job states by tailing a Condor user event
+                             log, instead of polling condor_q and
+                             condor_history''',
+        'env_variable'  : 'SAGA_CONDOR_USE_EVENT_LOG'
+        },
+        {
+        'category'      : 'saga.adaptor.condorjob',
+        'name'          : 'stage_cache',
+        'type'          : bool,
+        'default'       : False,
+        'valid_options' : [True, False],
+        'documentation' : '''Upload each distinct input file only once per job
+                             service (identified by content hash), and copy it
+                             to the requested targets on the submission host''',
+        'env_variable'  : 'SAGA_CONDOR_STAGE_CACHE'
+        },
 ]
 
 # --------------------------------------------------------------------
@@ -346,7 +504,13 @@ class Adaptor (saga.adaptors.base.Base):
         self.id_re = re.compile('^\[(.*)\]-\[(.*?)\]$')
         self.opts  = self.get_config (_ADAPTOR_NAME)
         self.use_hist = self.opts['use_history'].get_value()
+        self.use_bulk = self.opts['bulk_query'].get_value()
+        self.use_log  = self.opts['use_event_log'].get_value()
+        self.use_sc   = self.opts['stage_cache'].get_value()
         self._logger.info("use condor_history: %s", self.use_hist)
+        self._logger.info("use bulk queries  : %s", self.use_bulk)
+        self._logger.info("use event log     : %s", self.use_log)
+        self._logger.info("use stage cache   : %s", self.use_sc)
 
 
     # ----------------------------------------------------------------
@@ -401,6 +565,18 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
         self.is_cray       = False
         self.jobs          = dict()
         self.query_options = dict()
+        self.shell         = None
+        self.mt            = None
+
+        # state for the user event log (if enabled)
+        self._job_objs     = dict()  # job_id -> saga.job.Job, for callbacks
+        self._event_log    = None    # remote path of the log
+        self._event_offset = 0       # number of bytes consumed so far
+        self._event_lock   = threading.RLock()
+
+        # state for the staging cache (if enabled)
+        self._hashes       = dict()  # (path, size, mtime) -> content hash
+        self._staged       = set()   # hashes uploaded to _STAGE_CACHE_DIR
 
         rm_scheme = rm_url.scheme
         pty_url   = surl.Url (rm_url)
@@ -438,12 +614,21 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
 
         self.initialize()
 
+        if self._adaptor.use_log:
+            self.mt = _job_event_monitor(job_service=self)
+            self.mt.start()
+
         return self.get_api ()
 
 
     # ----------------------------------------------------------------
     #
     def close (self) :
+        if  self.mt :
+            self.mt.stop()
+            self.mt.join(10)  # don't block forever on join()
+            self.mt = None
+
         if  self.shell :
             self.shell.finalize (True)
 
@@ -490,6 +675,21 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
 
         self._logger.info("Found Condor tools: %s", self._commands)
 
+        if self._adaptor.use_log:
+
+            # all jobs of this service log their events into a single user log
+            # on the submission host.  Condor wants an absolute path for that.
+            ret, out, _ = self.shell.run_sync("mkdir -p $HOME/.saga/adaptors/condor/ "
+                                              "&& echo $HOME")
+            if ret != 0:
+                message = "Error creating Condor event log dir: %s" % out
+                log_error_and_raise(message, saga.NoSuccess, self._logger)
+
+            home = out.strip().split('\n')[-1].strip()
+            self._event_log = "%s/.saga/adaptors/condor/events.%s.log" \
+                            % (home, ru.generate_id('js', mode=ru.ID_PRIVATE))
+            self._logger.info("Using Condor event log: %s", self._event_log)
+
     # ----------------------------------------------------------------
     #
     def finalize(self, kill_shell=False):
@@ -629,7 +829,8 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
 
         # create a Condor job script from SAGA job description
         script = _condorscript_generator(url=self.rm, logger=self._logger,
-                jds=[jd], option_dict=self.query_options)
+                jds=[jd], option_dict=self.query_options,
+                event_log=self._event_log)
         self._logger.info("Generated Condor script: %s", script)
 
         submit_file = NamedTemporaryFile(mode='w', suffix='.condor',
@@ -725,12 +926,16 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
 
     # --------------------------------------------------------------------------
     #
-    def _handle_file_transfers(self, td, mode):
+    def _handle_file_transfers(self, td, mode, copies=None):
         """
         if mode == 'in' : perform sanity checks on all staging directives.  
 
         if mode == 'in' : stage files to   condor submission site
         if mode == 'out': stage files from condor submission site
+
+        If the stage cache is used and a `copies` list is given, the shell
+        commands which copy cached files to their targets are appended to that
+        list instead of being executed (see `_stage_cached()`).
         """
 
         assert(mode in ['in', 'out'])
@@ -795,9 +1000,12 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
                     td.transfer_input_files.append(source)
 
                     if hop_1 and self.shell.url.scheme in ["ssh", "gsissh"]:
-                        self._logger.info("Transferring in %s to %s", source, target)
-                        self.shell.stage_to_remote(source, target,
-                                                   cp_flags=saga.filesystem.CREATE_PARENTS)
+                        if self._adaptor.use_sc:
+                            self._stage_cached(source, target, copies)
+                        else:
+                            self._logger.info("Transferring in %s to %s", source, target)
+                            self.shell.stage_to_remote(source, target,
+                                                       cp_flags=saga.filesystem.CREATE_PARENTS)
 
             if td.out_overwrite:
 
@@ -858,6 +1066,69 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
                                                      cp_flags=saga.filesystem.CREATE_PARENTS)
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _stage_cached(self, source, target, copies=None):
+        """
+        Stage a local file to the submission site, via the stage cache: the
+        file is uploaded into _STAGE_CACHE_DIR, named by its content hash, only
+        if that content was not uploaded before, and is then copied to the
+        target location (unless the target holds that content already).  The
+        cached files are shared between jobs, so they are never linked to the
+        targets: jobs may modify their staged input.  If `copies` is given, the
+        copy command is appended to it and needs to be run by the caller.
+        """
+
+        st  = os.stat(source)
+        key = (os.path.abspath(source), st.st_size, st.st_mtime)
+
+        if key not in self._hashes:
+            self._hashes[key] = _file_hash(source)
+        digest = self._hashes[key]
+
+        if digest not in self._staged:
+
+            if not self._staged:
+                ret, out, _ = self.shell.run_sync("mkdir -p %s" % _STAGE_CACHE_DIR)
+                if ret != 0:
+                    raise saga.NoSuccess("Error creating stage cache %s: %s"
+                                        % (_STAGE_CACHE_DIR, out))
+
+            self._logger.info("Transferring in %s to stage cache (%s)", source, digest)
+            self.shell.stage_to_remote(source, "%s/%s" % (_STAGE_CACHE_DIR, digest))
+            self._staged.add(digest)
+
+        # the target is checked remotely (it may have been changed or removed
+        # since we last staged to it), and only copied to if its content
+        # differs.  Copy-on-write file systems can share the data blocks.
+        cached = "%s/%s" % (_STAGE_CACHE_DIR, digest)
+        cmd    = "mkdir -p '%s' && (cmp -s '%s' '%s' || "                    \
+                 "cp --reflink=auto -f '%s' '%s' 2>/dev/null || cp -f '%s' '%s')" \
+               % (os.path.dirname(target) or '.', cached, target,
+                  cached, target, cached, target)
+
+        if copies is not None:
+            copies.append(cmd)
+            return
+
+        ret, out, _ = self.shell.run_sync(cmd)
+        if ret != 0:
+            raise saga.NoSuccess("Error copying %s to %s: %s" % (source, target, out))
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _run_copies(self, copies):
+        """
+        run copy commands collected by `_stage_cached()`, a bunch at a time.
+        """
+
+        for i in range(0, len(copies), 100):
+            ret, out, _ = self.shell.run_sync(' && '.join(copies[i:i + 100]))
+            if ret != 0:
+                raise saga.NoSuccess("Error copying staged files: %s" % out)
+
+
     # ----------------------------------------------------------------
     #
     def _job_get_info(self, job_id):
@@ -880,6 +1151,10 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
         if time.time() - info['timestamp'] < _CACHE_TIMEOUT:
             return info
 
+        if self._adaptor.use_log:
+            self._job_get_info_from_log(job_id)
+            return info
+
         rm, pid = self._adaptor.parse_id(job_id)
 
         # run the Condor 'condor_q' command to get some infos about our job
@@ -956,6 +1231,124 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
         info['timestamp'] = time.time()
 
 
+    # ----------------------------------------------------------------
+    #
+    def _job_get_info_from_log(self, job_id):
+        """ get job attributes from the user event log
+        """
+
+        self._read_event_log()
+        self.jobs[job_id]['timestamp'] = time.time()
+
+
+    # ----------------------------------------------------------------
+    #
+    def _read_event_log(self):
+        """ read all events which got appended to the user event log since the
+            last invocation, and update the job infos accordingly.  Output
+            files of finished jobs are staged, then state changes are pushed
+            to the job objects, to trigger callbacks.
+        """
+
+        if not self._event_log:
+            return
+
+        with self._event_lock:
+
+            # 'tail -c +N' starts at byte N, counting from 1
+            ret, out, err = self.shell.run_sync("tail -c +%d %s"
+                                         % (self._event_offset + 1, self._event_log))
+            if ret != 0:
+                # the log only exists after the first submission
+                self._logger.debug("cannot read event log: %s", out)
+                return
+
+            # the pty may add carriage returns, which are not part of the file
+            out = out.replace('\r\n', '\n')
+            events, consumed = _parse_condor_events(out)
+            self._event_offset += consumed
+
+            rm_clone = surl.Url(self.rm)
+            rm_clone.query = ""
+            rm_clone.path  = ""
+
+            changed = list()
+            seen    = set()
+            for event in events:
+
+                job_id = "[%s]-[%s]" % (rm_clone, event['pid'])
+                if job_id not in self.jobs:
+                    continue
+
+                info  = self.jobs[job_id]
+                old   = info['state']
+                code  = event['code']
+                text  = ' '.join(event['text'])
+
+                # don't let late events resurrect final jobs
+                if old in _FINAL_STATES:
+                    continue
+
+                if code == 0:                        # submit
+                    info['state']       = saga.job.PENDING
+                    info['create_time'] = event['time']
+
+                elif code == 1:                      # execute
+                    info['state']       = saga.job.RUNNING
+                    info['start_time']  = event['time']
+                    match = _EVENT_HOST_RE.search(text)
+                    if match:
+                        info['exec_hosts'] = [match.group(1)]
+
+                elif code in [4, 12, 13]:            # evict, held, released
+                    info['state']       = saga.job.PENDING
+
+                elif code == 2:                      # executable error
+                    info['state']       = saga.job.FAILED
+                    info['returncode']  = 1
+                    info['end_time']    = event['time']
+
+                elif code == 5:                      # terminate
+                    info['end_time']    = event['time']
+                    match = _EVENT_RETVAL_RE.search(text)
+                    if match:
+                        info['returncode'] = int(match.group(1))
+                    elif _EVENT_SIGNAL_RE.search(text):
+                        info['returncode'] = 1
+                    else:
+                        self._logger.warn("no exit code in event %s", event)
+                        info['returncode'] = -1
+
+                    if info['returncode'] == 0: info['state'] = saga.job.DONE
+                    else                      : info['state'] = saga.job.FAILED
+
+                elif code == 9:                      # aborted (condor_rm)
+                    info['state']       = saga.job.CANCELED
+                    info['end_time']    = event['time']
+
+                # a job may change state several times per read, but is only
+                # staged and notified once
+                if info['state'] != old and job_id not in seen:
+                    changed.append(job_id)
+                    seen.add(job_id)
+
+                if info['state'] in _FINAL_STATES:
+                    info['gone'] = True
+
+        # stage and fire callbacks outside of the lock
+        for job_id in changed:
+
+            info = self.jobs[job_id]
+            if info['gone']:
+                self._handle_file_transfers(info['td'], mode='out')
+                job = self._job_objs.pop(job_id, None)
+            else:
+                job = self._job_objs.get(job_id)
+
+            if job:
+                job._attributes_i_set('state', info['state'], job._UP, True)
+
+
     # ----------------------------------------------------------------
     #
     def _job_get_info_bulk(self, cluster_id, job_ids):
@@ -1180,6 +1573,164 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
         #             self.shell.stage_from_remote(f, f)
 
 
+    # ----------------------------------------------------------------
+    #
+    def _job_get_info_multi(self, job_ids):
+        """ get job attributes via condor_q, for jobs from any number of
+            clusters.  In contrast to `_job_get_info_bulk()`, all clusters are
+            covered by a single condor_q (and condor_history) invocation, via
+            a constraint expression.
+        """
+
+        # NOTE: bulk queries ignore the cache timeout,
+        #       but they do update the timestamps
+
+        # map 'cluster.proc' to job IDs, and skip jobs which are gone
+        to_check = dict()
+        for job_id in job_ids:
+
+            if job_id not in self.jobs:
+                raise ValueError('job %s: unknown' % job_id)
+
+            if self.jobs[job_id]['gone']:
+                self._logger.debug('dont check %s', job_id)
+                continue
+
+            pid = self._adaptor.parse_id(job_id)[1]
+            to_check[pid] = job_id
+
+        # do we have anything to do?
+        if not to_check:
+            return
+
+        clusters = sorted(set([pid.split('.', 1)[0] for pid in to_check]))
+        chunks   = [clusters[i:i + _BULK_QUERY_MAX]
+                    for i in range(0, len(clusters), _BULK_QUERY_MAX)]
+        found    = set()
+
+        for chunk in chunks:
+
+            constraint = ' || '.join(['ClusterId == %s' % c for c in chunk])
+            opts = "-constraint '%s' -autoformat:, ClusterId ProcId " \
+                   "JobStatus ExitStatus ExitBySignal CompletionDate" % constraint
+            ret, out, err = self._run_condor_q(retries=3, timeout=60, options=opts)
+            self._logger.debug('got state info for %d clusters: %s', len(chunk), ret)
+
+            if ret != 0:
+                raise Exception("condor_q failed\n[%s]\n[%s]" % (out, err))
+
+            ts = time.time()
+            for row in filter(bool, out.split('\n')):
+
+                elems = [col.strip() for col in row.split(',')]
+                if len(elems) != 6:
+                    self._logger.error('condor_q noise [%s]', row)
+                    continue
+
+                cluster_id, procid, jobstatus, exit_code, exit_by_signal, \
+                completiondate = elems
+
+                # clusters may contain procs we don't track
+                job_id = to_check.get('%s.%s' % (cluster_id, procid))
+                if not job_id:
+                    self._logger.warn('cannot match job info to any known job (%s)', row)
+                    continue
+
+                # we always set exit_code to '1' if exited_by_signal
+                if not exit_code and exit_by_signal == 'true':
+                    exit_code = 1
+
+                found.add(job_id)
+                info = self.jobs[job_id]
+                info['state']      = _condor_to_saga_jobstate(jobstatus)
+                info['end_time']   = completiondate
+                info['returncode'] = exit_code
+                info['timestamp']  = ts
+
+        # Now, see if any ids are missing, and search condor history for those
+        missing = [pid for pid in to_check if to_check[pid] not in found]
+
+        if self._adaptor.use_hist and missing:
+
+            self._logger.debug('incomplete %s: %s', len(missing), missing)
+
+            clusters = sorted(set([pid.split('.', 1)[0] for pid in missing]))
+            chunks   = [clusters[i:i + _BULK_QUERY_MAX]
+                        for i in range(0, len(clusters), _BULK_QUERY_MAX)]
+
+            for chunk in chunks:
+
+                self._logger.info("use condor_history on %d clusters", len(chunk))
+                constraint = ' || '.join(['ClusterId == %s' % c for c in chunk])
+                cmd = "%s -constraint '%s' -autoformat:, " \
+                      "ClusterId ProcId ExitCode ExitBySignal CompletionDate " \
+                      "JobCurrentStartDate QDate Err Out" \
+                      % (self._commands['condor_history'], constraint)
+                ret, out, err = self.shell.run_sync(cmd)
+
+                if ret != 0:
+                    # non-fatal, see _job_get_info_bulk()
+                    self._logger.warn("condor_history failed: (%s) (%s)", out, err)
+                    continue
+
+                ts = time.time()
+                for row in filter(bool, out.split('\n')):
+
+                    elems = [col.strip() for col in row.split(',')]
+                    if len(elems) != 9:
+                        self._logger.error('condor_history noise [%s]', row)
+                        continue
+
+                    cluster_id, procid, exit_code, exit_by_signal, \
+                    cdate, sdate, qdate, stderr, stdout = elems
+
+                    job_id = to_check.get('%s.%s' % (cluster_id, procid))
+                    if not job_id or job_id in found:
+                        continue
+
+                    # we always set exit_code to '1' if exited_by_signal
+                    if not exit_code and exit_by_signal == 'true':
+                        exit_code = 1
+
+                    # make sure exit code is an int:
+                    try:
+                        exit_code = int(exit_code)
+                    except:
+                        self._logger.warn("condor_history w/o exit code - assume error")
+                        exit_code = -1
+
+                    found.add(job_id)
+                    info = self.jobs[job_id]
+                    info['returncode']  = exit_code
+                    info['create_time'] = qdate
+                    info['start_time']  = sdate
+                    info['end_time']    = cdate
+                    info['stdout']      = stdout
+                    info['stderr']      = stderr
+                    info['gone']        = True
+                    info['timestamp']   = ts
+
+                    if exit_code == 0: info['state'] = saga.job.DONE
+                    else             : info['state'] = saga.job.FAILED
+
+                    self._logger.debug('move state of %s to %s', job_id, info['state'])
+
+        # are still any jobs missing?  See _job_get_info_bulk() on why we
+        # consider those as DONE.
+        missing = [job_id for job_id in to_check.values() if job_id not in found]
+        if missing:
+
+            self._logger.warn('could not find all jobs %s: %s', len(missing), missing)
+
+            ts = time.time()
+            for job_id in missing:
+                self._logger.warn('jobs %s disappeared', job_id)
+                info = self.jobs[job_id]
+                info['state']     = saga.job.DONE
+                info['gone']      = True
+                info['timestamp'] = ts
+
+
     # ----------------------------------------------------------------
     #
     def _job_cancel_bulk(self, cluster_id, job_ids):
@@ -1477,6 +2028,7 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
         # project IDs, thus we cluster the given jobs by project IDs, and create
         # individual submission scripts for each, and run them.
         clusters = dict()
+        copies   = list()
         for job in jobs:
 
             jd = job.description
@@ -1484,10 +2036,10 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
             # ensure consistency and viability of job description
             self._prepare_jd(jd)
 
-            # TODO: Given that input (and output) are likely similar for
-            #       bulk tasks, we probably don't want to transfer
-            #       duplicates endlessly
-            self._handle_file_transfers(jd.transfer_directives, mode='in')
+            # Input is likely similar for bulk tasks -- the stage cache (if
+            # enabled) ensures that we transfer every content only once.
+            self._handle_file_transfers(jd.transfer_directives, mode='in',
+                                        copies=copies)
 
             project = jd.project
 
@@ -1499,6 +2051,9 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
 
             clusters[project].append(job)
 
+        if copies:
+            self._run_copies(copies)
+
         for project, _jobs in clusters.iteritems():
             self._run_cluster(project, _jobs)
 
@@ -1511,7 +2066,8 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
 
         # create a Condor job script from SAGA job description
         script = _condorscript_generator(url=self.rm, logger=self._logger,
-                                         jds=jds, option_dict=self.query_options)
+                                         jds=jds, option_dict=self.query_options,
+                                         event_log=self._event_log)
         self._logger.info("Generated Condor script: %s", script)
 
         submit_file = NamedTemporaryFile(mode='w', suffix='.condor',
@@ -1571,6 +2127,9 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
             self.jobs[job_id]['state'] = saga.job.PENDING
             self.jobs[job_id]['td']    = job.description.transfer_directives
 
+            if self._adaptor.use_log:
+                self._job_objs[job_id] = job
+
         # remove submit file(s)
         # XXX: maybe leave them in case of debugging?
         # ret, out, _ = self.shell.run_sync ('rm %s' % submit_file_name)
@@ -1646,28 +2205,28 @@ class CondorJobService (saga.adaptors.cpi.job.Service):
             clusters[cluster_id].append(job_id)
 
 
-        states = list()
-        for cluster_id in clusters:
+        # jobs in a final state are never queried again
+        if self._adaptor.use_log:
+            self._read_event_log()
 
-            job_ids   = clusters[cluster_id]
-            log.debug(' query job state for %s', job_ids)
-            bulk_info = self._job_get_info_bulk(cluster_id, job_ids)
-            states   += [self.jobs[job_id]['state'] for job_id in job_ids]
+        elif self._adaptor.use_bulk:
+            job_ids = list()
+            for cluster_id in clusters:
+                job_ids += [job_id for job_id in clusters[cluster_id]
+                            if self.jobs[job_id]['state'] not in _FINAL_STATES]
+            if job_ids:
+                log.debug(' query job state for %d jobs', len(job_ids))
+                self._job_get_info_multi(job_ids)
 
-        return states
+        else:
+            for cluster_id in clusters:
+                job_ids = [job_id for job_id in clusters[cluster_id]
+                           if self.jobs[job_id]['state'] not in _FINAL_STATES]
+                if job_ids:
+                    log.debug(' query job state for %s', job_ids)
+                    self._job_get_info_bulk(cluster_id, job_ids)
 
-        # TODO: check "cache" for final state jobs
-        # check if we have already reach a terminal state
-        # if self.jobs[job_id]['state'] in [saga.job.CANCELED, \
-        #                                   saga.job.FAILED, \
-        #                                   saga.job.DONE]:
-        #     return self.jobs[job_id]['state']
-        #
-        # # check if we can / should update
-        # if (self.jobs[job_id]['gone'] is not True):
-        #     self._job_get_info(job_id=job_id)
-        #
-        # return self.jobs[job_id]['state']
+        return [self.jobs[job._adaptor._id]['state'] for job in jobs]
 
 
 ###############################################################################
@@ -1762,6 +2321,9 @@ class CondorJob (saga.adaptors.cpi.job.Job):
         self._id = self.js._job_run(self.jd)
         self._started = True
 
+        if self.js._adaptor.use_log:
+            self.js._job_objs[self._id] = self._api()
+
 
     # ----------------------------------------------------------------
     #
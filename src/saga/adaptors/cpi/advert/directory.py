@@ -62,6 +62,14 @@ class Directory (cpi_ns.directory.Directory,
     def find_adverts_async      (self, name_pattern, attr_pattern,
                                  obj_type, flags, ttype)             : pass
 
+    @SYNC
+    def set_attributes          (self, attrs, ttype)                 : pass
+    @ASYNC
+    def set_attributes_async    (self, attrs, ttype)                 : pass
+
+    @SYNC
+    def batch                   (self)                               : pass
+
 
 
 
@@ -61,6 +61,11 @@ class Entry (cpi_ns.entry.Entry,
     @ASYNC
     def delete_object_async     (self, ttype)                        : pass
 
+    @SYNC
+    def set_attributes          (self, attrs, ttype)                 : pass
+    @ASYNC
+    def set_attributes_async    (self, attrs, ttype)                 : pass
+
 
 
 
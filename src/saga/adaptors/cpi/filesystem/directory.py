@@ -53,6 +53,9 @@ class Directory (cpi_ns.directory.Directory) :
     @ASYNC                                        
     def is_file_self_async    (self,              ttype)  : pass
 
+    @SYNC
+    def batch                 (self)                      : pass
+
 
 
 
@@ -89,6 +89,11 @@ class Directory (entry.Entry) :
     @ASYNC
     def copy_async              (self, src, tgt, flags, ttype) : pass
 
+    @SYNC
+    def copy_many               (self, copies, flags, concurrency, ttype) : pass
+    @ASYNC
+    def copy_many_async         (self, copies, flags, concurrency, ttype) : pass
+
     @SYNC
     def link                    (self, src, tgt, flags, ttype) : pass
     @ASYNC
@@ -65,6 +65,14 @@ class LogicalDirectory (cpi_ns.directory.Directory,
     @ASYNC
     def find_replicas_async (self, name_pattern, attr_pattern, flags, ttype)  : pass
 
+    @SYNC
+    def replicate               (self, tgts, name, flags, ttype)     : pass
+    @ASYNC
+    def replicate_async         (self, tgts, name, flags, ttype)     : pass
 
+    @SYNC
+    def upload                  (self, name, tgt, flags, ttype)      : pass
+    @ASYNC
+    def upload_async            (self, name, tgt, flags, ttype)      : pass
 
 
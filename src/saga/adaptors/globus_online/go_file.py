@@ -7,14 +7,17 @@ __license__   = "MIT"
 """ (GSI)SSH based Globus Online Adaptor """
 
 import os
+import csv
+import time
 import threading
 import saga.utils.pty_shell as sups
 import saga.utils.misc as sumisc
 
+import saga.task
 import saga.adaptors.base
 import saga.adaptors.cpi.filesystem
 
-from saga.adaptors.cpi.decorators import SYNC_CALL
+from saga.adaptors.cpi.decorators import SYNC_CALL, ASYNC_CALL
 
 # TODO: We could make this configurable,
 # so people without gsissh can still perform some operations,
@@ -23,6 +26,9 @@ from saga.adaptors.cpi.decorators import SYNC_CALL
 GO_DEFAULT_URL = "gsissh://cli.globusonline.org/"
 #GO_DEFAULT_URL = "ssh://cli.globusonline.org/"
 
+# ends the batch input of a 'transfer' command (^D on the GO shell's pty)
+GO_EOF = '\x04'
+
 
 # --------------------------------------------------------------------
 # the adaptor name
@@ -136,6 +142,92 @@ _ADAPTOR_INFO          = {
     ]
 }
 
+
+# --------------------------------------------------------------------
+#
+def _go_batch_input(items):
+    """
+    Return the batch input for a GO 'transfer' command, which lists one
+    'source target [-r]' line per (source, target, flags) path spec triple.
+    Paths are single-quoted, and cannot contain line breaks.
+    """
+
+    def _quote(path):
+        if '\n' in path or '\r' in path:
+            raise saga.BadParameter("cannot transfer path with line break: %r" % path)
+        return "'%s'" % path.replace("'", "'\\''")
+
+    lines = list()
+    for source, target, flags in items:
+
+        line = "%s %s" % (_quote(source), _quote(target))
+        if flags & saga.filesystem.RECURSIVE:
+            line += " -r"
+
+        lines.append(line)
+
+    return "%s\n" % '\n'.join(lines)
+
+
+# --------------------------------------------------------------------
+#
+def _go_failed_items(items, details):
+    """
+    Match the per-file output of 'details' (csv formatted source path,
+    destination path and status) against the submitted (source, target,
+    flags) triples.  Returns the indexes of all items with failed files --
+    a recursive item fails if any file below its source path fails.
+    """
+
+    failed = list()
+    for row in csv.reader(details.splitlines()):
+
+        if len(row) < 3:
+            continue
+
+        path, status = row[0].strip(), row[2].strip()
+        if status in ['SUCCEEDED', 'status', 'Status']:
+            continue
+
+        failed.append(path)
+
+    ret = list()
+    for idx, (source, target, flags) in enumerate(items):
+
+        src_path = '/' + source.split('/', 1)[1]
+        for path in failed:
+            if path == src_path or path.startswith(src_path.rstrip('/') + '/'):
+                ret.append(idx)
+                break
+
+    return ret
+
+
+# --------------------------------------------------------------------
+#
+def _go_results(copies, errors, groups, start):
+    """
+    Summarize per-item transfer errors (and the number of GO transfer tasks
+    used) in the format of Directory.copy_many().
+    """
+
+    duration = time.time() - start
+    results  = [{'src'   : src,
+                 'tgt'   : tgt,
+                 'ok'    : error is None,
+                 'error' : error,
+                 'time'  : duration} for (src, tgt), error in zip(copies, errors)]
+
+    copied   = len([r for r in results if r['ok']])
+
+    return {'results' : results,
+            'copied'  : copied,
+            'failed'  : len(results) - copied,
+            'groups'  : groups,
+            'time'    : duration,
+            'rate'    : copied / duration if duration else 0.0}
+
+
 ################################################################################
 # The adaptor class
 
@@ -164,6 +256,10 @@ class Adaptor(saga.adaptors.base.Base):
         #
         self.shell_lock = threading.RLock()
 
+        # the adaptor *singleton* creates a (single) instance of a bulk
+        # handler, which implements container_* bulk methods
+        self._bulk = BulkTransfer(self)
+
     # --------------------------------------------------------------------------
     #
     def sanity_check(self):
@@ -611,6 +707,15 @@ class Adaptor(saga.adaptors.base.Base):
             raise Exception("Expected Task ID: <id>, got %s" % out)
         task_id = value.strip()
 
+        # Wait until background copy has finished
+        status = self.go_wait(shell, task_id)
+
+        self.go_check_status(status)
+
+    # ----------------------------------------------------------------
+    #
+    def go_wait(self, shell, task_id):
+
         # Wait until background copy has finished
         cmd = "wait -q %s" % task_id
         self.run_go_cmd(shell, cmd)
@@ -622,7 +727,12 @@ class Adaptor(saga.adaptors.base.Base):
         key, value = out.split(':')
         if key != 'Status':
             raise Exception("Expected Status: <status>, got %s" % out)
-        status = value.strip()
+
+        return value.strip()
+
+    # ----------------------------------------------------------------
+    #
+    def go_check_status(self, status):
 
         # Validate task status
         if status == 'SUCCEEDED':
@@ -641,6 +751,113 @@ class Adaptor(saga.adaptors.base.Base):
         else:
             raise Exception('Unknown status: %s' % status)
 
+    # ----------------------------------------------------------------
+    #
+    def go_transfer_many(self, session, shell, items):
+        """
+        Transfer a list of (source, target, flags) path spec triples.  All
+        items between the same pair of endpoints are submitted as a single GO
+        transfer task, so that the service can run them concurrently.  Returns
+        a list of per-item errors (None for successful items), in order of
+        `items`, and the number of submitted transfer tasks.
+        """
+
+        errors = [None] * len(items)
+        groups = dict()
+        order  = list()
+
+        for idx, (source, target, flags) in enumerate(items):
+
+            key = (source.split('/', 1)[0], target.split('/', 1)[0])
+
+            if key not in groups:
+                groups[key] = list()
+                order.append(key)
+
+            groups[key].append(idx)
+
+        for key in order:
+
+            idxs  = groups[key]
+            batch = [items[idx] for idx in idxs]
+
+            try:
+                # transfers are limited per source endpoint
+                with session._transfer_scheduler.transfer(key[0]):
+                    failed = self.go_transfer_batch(shell, batch)
+
+                for idx, error in zip(idxs, failed):
+                    errors[idx] = error
+
+            except Exception as e:
+                self._logger.warn("transfer %s -> %s failed: %s" % (key[0], key[1], e))
+                for idx in idxs:
+                    errors[idx] = e
+
+        return errors, len(order)
+
+    # ----------------------------------------------------------------
+    #
+    def go_transfer_batch(self, shell, items):
+
+        # all items are expected to be between the same endpoints
+
+        self._logger.debug('Adaptor:go_transfer_batch(%d items)' % len(items))
+
+        # 0: Copy files that do not exist at the destination
+        sync_level = 0
+
+        # Create parents (once per target dir)
+        parents = set()
+        for source, target, flags in items:
+            if flags & saga.filesystem.CREATE_PARENTS:
+                parent = os.path.dirname(target)
+                if parent not in parents:
+                    self.mkparents(shell, parent)
+                    parents.add(parent)
+
+        # Submit all items as a single transfer task, which reads the items
+        # from stdin.  The shell must not be used by others meanwhile.
+        with self.shell_lock:
+            shell.run_async("transfer -s %d" % sync_level)
+            shell.send(_go_batch_input(items))
+            shell.send(GO_EOF)
+            _, out = shell.find_prompt()
+
+        # 'Task ID: 8c6f989d-b6aa-11e4-adc6-22000a97197b'
+        task_id = None
+        for line in out.split('\n'):
+            elems = line.split(':', 1)
+            if len(elems) == 2 and elems[0].strip() == 'Task ID':
+                task_id = elems[1].strip()
+
+        if not task_id:
+            raise saga.NoSuccess("Expected Task ID: <id>, got %s" % out)
+
+        self._logger.info('submitted %d transfers as task %s' % (len(items), task_id))
+
+        status = self.go_wait(shell, task_id)
+
+        if status == 'SUCCEEDED':
+            return [None] * len(items)
+
+        # find the failed items.  If the details can't tell, all items share
+        # the fate of the task.
+        error = saga.NoSuccess('Task %s: %s' % (task_id, status))
+        try:
+            self.go_check_status(status)
+        except Exception as e:
+            error = saga.NoSuccess(str(e))
+
+        out, _ = self.run_go_cmd(shell, "details -O csv -f source_path,"
+                                        "destination_path,status %s" % task_id)
+        failed = _go_failed_items(items, out or '')
+
+        if not failed:
+            return [error] * len(items)
+
+        return [error if idx in failed else None for idx in range(len(items))]
+
     ################################################################################
     #
     # Helper function to test for existence and type.
@@ -669,6 +886,194 @@ class Adaptor(saga.adaptors.base.Base):
         }
 
 
+################################################################################
+#
+class BulkTransfer(object):
+    """
+    Implements the container_* bulk methods for copy tasks of GO files and
+    directories: all copies in a container are submitted as one GO transfer
+    task per pair of endpoints, instead of one transfer task per copy.
+    """
+
+    # ----------------------------------------------------------------
+    #
+    def __init__(self, adaptor):
+
+        self._adaptor = adaptor
+
+    # ----------------------------------------------------------------
+    #
+    def container_copy(self, tasks):
+
+        # tasks of different sessions use different GO shells
+        sessions = dict()
+        for task in tasks:
+            sid = task._adaptor.session._id
+            sessions.setdefault(sid, list()).append(task)
+            task._set_state(saga.task.RUNNING)
+
+        for sid in sessions:
+
+            group = sessions[sid]
+            cpi   = group[0]._adaptor
+            items = [task._method_context['item'] for task in group]
+
+            try:
+                errors, _ = self._adaptor.go_transfer_many(cpi.session, cpi.shell, items)
+
+            except Exception as e:
+                errors = [e] * len(group)
+
+            for task, error in zip(group, errors):
+
+                if error:
+                    if not isinstance(error, saga.SagaException):
+                        error = saga.NoSuccess(str(error))
+                    task._set_exception(error)
+                    task._set_state(saga.task.FAILED)
+                else:
+                    task._set_state(saga.task.DONE)
+
+                task._method_context['done'].set()
+
+    # ----------------------------------------------------------------
+    #
+    def container_copy_self(self, tasks):
+
+        self.container_copy(tasks)
+
+    # ----------------------------------------------------------------
+    #
+    def container_wait(self, tasks, mode, timeout):
+
+        # a negative timeout waits forever, a timeout of 0 only polls
+        if timeout < 0:
+            for task in tasks:
+                task.wait()
+            return
+
+        deadline = time.time() + timeout
+        for task in tasks:
+            task.wait(max(0.0, deadline - time.time()))
+
+    # ----------------------------------------------------------------
+    #
+    def container_cancel(self, tasks, timeout):
+
+        for task in tasks:
+            task.cancel()
+
+    # ----------------------------------------------------------------
+    #
+    def container_get_states(self, tasks):
+
+        return [task.get_state() for task in tasks]
+
+    # ----------------------------------------------------------------
+    #
+    def task_run(self, task):
+
+        thread = threading.Thread(target=self.container_copy, args=[[task]])
+        thread.start()
+
+    # ----------------------------------------------------------------
+    #
+    def task_wait(self, task, timeout):
+
+        # only task_run() (via run()) sets the event
+        if task.get_state() == saga.task.NEW:
+            raise saga.IncorrectState("cannot wait for a task which was not started")
+
+        if timeout < 0:
+            timeout = None
+
+        task._method_context['done'].wait(timeout)
+
+
+################################################################################
+#
+class GOTransferBatch(object):
+    """
+    Context manager returned by GODirectory.batch().  Copies issued on the
+    directory (by the same thread) while the batch is active are only
+    collected, and are submitted as one GO transfer task per pair of
+    endpoints when the (outermost) batch is left.  Per-item results are
+    available in `results` afterwards, in the format of copy_many().  If any
+    copy failed, NoSuccess is raised.
+    """
+
+    # ----------------------------------------------------------------
+    #
+    def __init__(self, directory):
+
+        self._dir    = directory
+        self._outer  = None
+        self.copies  = list()
+        self.items   = list()
+        self.results = None
+
+    # ----------------------------------------------------------------
+    #
+    def __enter__(self):
+
+        local = self._dir._local
+
+        # nested batches are merged into the outermost one
+        if getattr(local, 'batch', None):
+            self._outer = local.batch
+            return self._outer
+
+        local.batch = self
+        return self
+
+    # ----------------------------------------------------------------
+    #
+    def __exit__(self, exc_type, exc_val, exc_tb):
+
+        if self._outer:
+            return False
+
+        self._dir._local.batch = None
+
+        if exc_type:
+            # drop the collected copies
+            self.copies = list()
+            self.items  = list()
+            return False
+
+        self.flush()
+
+        return False
+
+    # ----------------------------------------------------------------
+    #
+    def add(self, src, tgt, item):
+
+        self.copies.append((src, tgt))
+        self.items.append(item)
+
+    # ----------------------------------------------------------------
+    #
+    def flush(self):
+
+        start          = time.time()
+        copies, items  = self.copies, self.items
+        self.copies    = list()
+        self.items     = list()
+
+        errors, groups = self._dir._adaptor.go_transfer_many(self._dir.session,
+                                                             self._dir.shell, items)
+        self.results   = _go_results(copies, errors, groups, start)
+
+        if self.results['failed']:
+            raise saga.NoSuccess("%d of %d batched copies failed: %s"
+                                % (self.results['failed'], len(items),
+                                   [r['error'] for r in self.results['results']
+                                                if not r['ok']][0]))
+
+        return self.results
+
+
 ################################################################################
 #
 class GODirectory(saga.adaptors.cpi.filesystem.Directory):
@@ -681,6 +1086,12 @@ class GODirectory(saga.adaptors.cpi.filesystem.Directory):
         _cpi_base = super(GODirectory, self)
         _cpi_base.__init__(api, adaptor)
 
+        # bulk operations on tasks are handled by the adaptor's bulk handler
+        self._container = self._adaptor._bulk
+
+        # keeps the active batch of the calling thread
+        self._local = threading.local()
+
     # ----------------------------------------------------------------
     #
     def _is_valid(self):
@@ -883,10 +1294,86 @@ class GODirectory(saga.adaptors.cpi.filesystem.Directory):
         src_ps = self.get_path_spec(url=src_in)
         tgt_ps = self.get_path_spec(url=tgt_in)
 
+        # within a batch, the copy is submitted when the batch is left
+        batch = getattr(self._local, 'batch', None)
+        if batch:
+            batch.add(src_in, tgt_in, (src_ps, tgt_ps, flags))
+            return
+
         # Check for existence of source
         self._adaptor.stat(self.shell, src_ps)
 
-        self._adaptor.go_transfer(self.shell, flags, src_ps, tgt_ps)
+        # transfers are limited per source endpoint
+        with self.session._transfer_scheduler.transfer(src_ps.split('/')[0]):
+            self._adaptor.go_transfer(self.shell, flags, src_ps, tgt_ps)
+
+    # ----------------------------------------------------------------
+    #
+    @ASYNC_CALL
+    def copy_async(self, src_in, tgt_in, flags, ttype):
+
+        self._is_valid()
+
+        c = {'item' : (self.get_path_spec(url=src_in),
+                       self.get_path_spec(url=tgt_in), flags),
+             'done' : threading.Event()}
+
+        return saga.task.Task(self, 'copy', c, ttype)
+
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def copy_many(self, copies, flags, concurrency=None, _from_task=None):
+        """
+        All copies are submitted as one GO transfer task per pair of
+        endpoints.  The GO service schedules the files of a task itself, so
+        `concurrency` is ignored.
+        """
+
+        self._is_valid()
+
+        start = time.time()
+        items = [(self.get_path_spec(url=src),
+                  self.get_path_spec(url=tgt), flags) for src, tgt in copies]
+
+        errors, groups = self._adaptor.go_transfer_many(self.session, self.shell, items)
+        ret = _go_results(copies, errors, groups, start)
+
+        self._logger.info("copy_many: %(copied)d copied, %(failed)d failed, "
+                          "%(time).2fs (%(rate).1f/s)" % ret)
+
+        if _from_task:
+            _from_task._set_metric('files_copied',
+                                   [r['src'] for r in ret['results'] if r['ok']])
+
+        return ret
+
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def batch(self):
+
+        self._is_valid()
+
+        return GOTransferBatch(self)
+
+    # ----------------------------------------------------------------
+    #
+    def task_run(self, task):
+
+        self._container.task_run(task)
+
+    # ----------------------------------------------------------------
+    #
+    def task_wait(self, task, timeout):
+
+        self._container.task_wait(task, timeout)
+
+    # ----------------------------------------------------------------
+    #
+    def task_cancel(self, task):
+
+        raise saga.NotImplemented("Cannot cancel GO transfers")
 
     # ----------------------------------------------------------------
     #
@@ -1101,6 +1588,9 @@ class GOFile(saga.adaptors.cpi.filesystem.File):
         _cpi_base = super(GOFile, self)
         _cpi_base.__init__(api, adaptor)
 
+        # bulk operations on tasks are handled by the adaptor's bulk handler
+        self._container = self._adaptor._bulk
+
     # ----------------------------------------------------------------
     #
     def _is_valid(self):
@@ -1214,7 +1704,39 @@ class GOFile(saga.adaptors.cpi.filesystem.File):
         src_ps = self.get_path_spec()
         tgt_ps = self.get_path_spec(url=tgt_in)
 
-        self._adaptor.go_transfer(self.shell, flags, src_ps, tgt_ps)
+        # transfers are limited per source endpoint
+        with self.session._transfer_scheduler.transfer(src_ps.split('/')[0]):
+            self._adaptor.go_transfer(self.shell, flags, src_ps, tgt_ps)
+
+    # ----------------------------------------------------------------
+    #
+    @ASYNC_CALL
+    def copy_self_async(self, tgt_in, flags, ttype):
+
+        self._is_valid()
+
+        c = {'item' : (self.get_path_spec(), self.get_path_spec(url=tgt_in), flags),
+             'done' : threading.Event()}
+
+        return saga.task.Task(self, 'copy_self', c, ttype)
+
+    # ----------------------------------------------------------------
+    #
+    def task_run(self, task):
+
+        self._container.task_run(task)
+
+    # ----------------------------------------------------------------
+    #
+    def task_wait(self, task, timeout):
+
+        self._container.task_wait(task, timeout)
+
+    # ----------------------------------------------------------------
+    #
+    def task_cancel(self, task):
+
+        raise saga.NotImplemented("Cannot cancel GO transfers")
 
     # ----------------------------------------------------------------
     #
@@ -0,0 +1,541 @@
+__author__    = "Andre Merzky, Ole Weidner"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" A small HTTP(S) client for the http file adaptor, with keep-alive
+connection pooling, ranged reads, and segmented, resumable downloads -- plus
+a block cache for ranged reads.
+"""
+
+import os
+import json
+import base64
+import socket
+import httplib
+import urlparse
+import threading
+
+import saga.exceptions as se
+
+
+# ------------------------------------------------------------------------------
+#
+_REDIRECTS     = [301, 302, 303, 307, 308]
+_MAX_REDIRECTS = 5
+_CHUNK_SIZE    = 64 * 1024
+_META_SAVE     = 16     # save download state every that many chunks
+
+
+# ------------------------------------------------------------------------------
+#
+def _split_url(url):
+    """
+    split an http(s) URL into (pool key, request path, headers) -- where the
+    headers contain basic auth information if the URL has user info.
+    """
+
+    parts   = urlparse.urlsplit(str(url))
+    scheme  = parts.scheme.lower()
+    host    = parts.hostname
+    port    = parts.port or (443 if scheme == 'https' else 80)
+    path    = parts.path or '/'
+    headers = dict()
+
+    if  scheme not in ['http', 'https']:
+        raise se.BadParameter("unsupported URL scheme (%s)" % url)
+
+    if  parts.query:
+        path += '?' + parts.query
+
+    if  parts.username:
+        auth = '%s:%s' % (parts.username, parts.password or '')
+        headers['Authorization'] = 'Basic %s' % base64.b64encode(auth)
+
+    return (scheme, host, port), path, headers
+
+
+# ------------------------------------------------------------------------------
+#
+class ConnectionPool(object):
+    """
+    Keeps up to `size` idle keep-alive connections per (scheme, host, port).
+    """
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, size=4, timeout=60):
+
+        self._size    = size
+        self._timeout = timeout
+        self._idle    = dict()
+        self._lock    = threading.Lock()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def get(self, key):
+        """
+        return a tuple (connection, reused)
+        """
+
+        with self._lock:
+            if  self._idle.get(key):
+                return self._idle[key].pop(), True
+
+        scheme, host, port = key
+
+        if  scheme == 'https':
+            return httplib.HTTPSConnection(host, port, timeout=self._timeout), False
+        else:
+            return httplib.HTTPConnection (host, port, timeout=self._timeout), False
+
+
+    # --------------------------------------------------------------------------
+    #
+    def put(self, key, conn):
+
+        with self._lock:
+
+            idle = self._idle.setdefault(key, list())
+
+            if  len(idle) < self._size:
+                idle.append(conn)
+                return
+
+        conn.close()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+
+        with self._lock:
+
+            for idle in self._idle.values():
+                for conn in idle:
+                    conn.close()
+
+            self._idle = dict()
+
+
+# ------------------------------------------------------------------------------
+#
+class HTTPClient(object):
+    """
+    All requests go through a ConnectionPool.  Response bodies are always
+    consumed completely, so that the connections can be reused.
+    """
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, pool=None, logger=None):
+
+        if  pool: self._pool = pool
+        else    : self._pool = ConnectionPool()
+
+        self._logger = logger
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _request(self, method, url, headers=None, accept=None):
+        """
+        Run a request, following redirects.  Returns a tuple (response,
+        release), where `release()` must be called once the response body has
+        been read.  Error responses raise, unless their status is listed in
+        `accept`.  A stale pooled connection is replaced once.
+        """
+
+        for _ in range(_MAX_REDIRECTS + 1):
+
+            key, path, hdrs = _split_url(url)
+            hdrs.update(headers or dict())
+
+            conn, reused = self._pool.get(key)
+
+            try:
+                conn.request(method, path, headers=hdrs)
+                resp = conn.getresponse()
+
+            except (httplib.HTTPException, socket.error) as e:
+
+                conn.close()
+                if  not reused:
+                    raise se.NoSuccess("%s %s failed: %s" % (method, url, e))
+
+                # the server closed the idle connection -- try a fresh one
+                conn, _ = self._pool.get(key)
+                try:
+                    conn.request(method, path, headers=hdrs)
+                    resp = conn.getresponse()
+                except (httplib.HTTPException, socket.error) as e:
+                    conn.close()
+                    raise se.NoSuccess("%s %s failed: %s" % (method, url, e))
+
+            def release(conn=conn, resp=resp, key=key):
+                if  resp.will_close: conn.close()
+                else               : self._pool.put(key, conn)
+
+            if  resp.status in _REDIRECTS:
+                location = resp.getheader('location')
+                resp.read()
+                release()
+                if  not location:
+                    raise se.NoSuccess("redirect without location for %s" % url)
+                url = urlparse.urljoin(str(url), location)
+                continue
+
+            if  accept and resp.status in accept:
+                resp.url = url
+                return resp, release
+
+            if  resp.status == 404:
+                resp.read()
+                release()
+                raise se.DoesNotExist("%s not found" % url)
+
+            if  resp.status in [401, 403]:
+                resp.read()
+                release()
+                raise se.PermissionDenied("%s: access denied (%s)" % (url, resp.status))
+
+            if  resp.status >= 400:
+                resp.read()
+                release()
+                raise se.NoSuccess("%s %s failed: %s %s"
+                                  % (method, url, resp.status, resp.reason))
+
+            resp.url = url
+            return resp, release
+
+        raise se.NoSuccess("too many redirects for %s" % url)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def stat(self, url):
+        """
+        Returns a dict with the final `url`, the `size` (or None if unknown),
+        whether the server supports `ranges`, and a `validator` (ETag or
+        Last-Modified) which identifies the resource version.
+        """
+
+        resp, release = self._request('HEAD', url)
+        resp.read()
+        release()
+
+        size = resp.getheader('content-length')
+        info = {'url'       : resp.url,
+                'size'      : int(size) if size is not None else None,
+                'ranges'    : 'bytes' in (resp.getheader('accept-ranges') or ''),
+                'validator' : resp.getheader('etag') or
+                              resp.getheader('last-modified')}
+
+        # some servers do not advertise range support -- probe it
+        if  not info['ranges'] and info['size']:
+            resp, release = self._request('GET', url, {'Range' : 'bytes=0-0'})
+            resp.read()
+            release()
+            info['ranges'] = (resp.status == 206)
+
+        return info
+
+
+    # --------------------------------------------------------------------------
+    #
+    def read_range(self, url, start, length, validator=None):
+        """
+        Read `length` bytes at offset `start` (or everything from `start` on,
+        for `length=None`).  Returns less data at the end of the resource.  If
+        the server ignores the range request, the complete body is read and
+        sliced.
+        """
+
+        if  length is None:
+            hdrs = {'Range' : 'bytes=%d-' % start}
+
+        elif length <= 0:
+            return ''
+
+        else:
+            hdrs = {'Range' : 'bytes=%d-%d' % (start, start + length - 1)}
+
+        if  validator:
+            hdrs['If-Range'] = validator
+
+        resp, release = self._request('GET', url, hdrs, accept=[416])
+        data = resp.read()
+        release()
+
+        # 416: range not satisfiable, i.e. beyond EOF
+        if  resp.status == 416:
+            return ''
+
+        if  resp.status == 206:
+            return data
+
+        if  self._logger:
+            self._logger.warn("server ignored range request for %s" % url)
+
+        if  length is None:
+            return data[start:]
+
+        return data[start:start + length]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _fetch(self, url, target, offset, length, validator, progress):
+        """
+        Fetch a range (or, for `length=None`, the complete body) into the
+        opened target file at `offset`.  `progress(n)` is called after each
+        chunk written.  Raises if the received data do not match the request.
+        """
+
+        hdrs = dict()
+        if  length is not None:
+            hdrs['Range'] = 'bytes=%d-%d' % (offset, offset + length - 1)
+            if  validator:
+                hdrs['If-Range'] = validator
+
+        resp, release = self._request('GET', url, hdrs)
+
+        try:
+            if  length is not None and resp.status != 206:
+                raise se.NoSuccess("%s changed, or range requests unsupported" % url)
+
+            expected = resp.getheader('content-length')
+            if  length is not None:
+                expected = length
+            elif expected is not None:
+                expected = int(expected)
+
+            received = 0
+            while True:
+                chunk = resp.read(_CHUNK_SIZE)
+                if  not chunk:
+                    break
+
+                target.write(offset + received, chunk)
+                received += len(chunk)
+                progress(len(chunk))
+
+            if  expected is not None and received != expected:
+                raise se.NoSuccess("short read on %s (%d != %d)"
+                                  % (url, received, expected))
+        finally:
+            release()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def download(self, url, target, max_segments=4, segment_size=16*1024*1024):
+        """
+        Download `url` into the local file `target`.  Large files are fetched
+        in up to `max_segments` parallel range requests, of at least
+        `segment_size` bytes each.  Data go into `<target>.part` first.  The
+        download state is kept in `<target>.part.json`, so that an interrupted
+        download is resumed on the next attempt, as long as the resource did
+        not change.  The final size is verified against the Content-Length.
+        """
+
+        info      = self.stat(url)
+        url       = info['url']
+        size      = info['size']
+        validator = info['validator']
+        part      = '%s.part'      % target
+        meta      = '%s.part.json' % target
+
+        if  size is not None and info['ranges']:
+            nsegs = max(1, min(max_segments, (size + segment_size - 1) // segment_size))
+            segs  = [[i * size // nsegs, (i + 1) * size // nsegs, 0]
+                     for i in range(nsegs)]
+        else:
+            segs  = None
+
+        state   = {'url' : url, 'size' : size, 'validator' : validator,
+                   'segments' : segs}
+        resumed = False
+
+        # resume?
+        if  segs and validator and os.path.exists(part) and os.path.exists(meta):
+            try:
+                with open(meta) as f:
+                    old = json.load(f)
+                if  old['url']       == url  and \
+                    old['size']      == size and \
+                    old['validator'] == validator:
+                    state   = old
+                    resumed = True
+                    if  self._logger:
+                        self._logger.info("resuming download of %s" % url)
+            except Exception as e:
+                if  self._logger:
+                    self._logger.warn("ignore download state %s: %s" % (meta, e))
+
+        if  not resumed:
+            with open(part, 'wb') as f:
+                if  size:
+                    f.truncate(size)
+
+        target_file = _PartFile(part)
+        lock        = threading.Lock()
+        counter     = [0]
+        errors      = list()
+
+        def _save():
+            # bytes are only recorded as done once they are on disk
+            target_file.flush()
+            with open(meta + '.tmp', 'w') as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(meta + '.tmp', meta)
+
+        try:
+            if  not state['segments']:
+                # single stream, no resume
+                self._fetch(url, target_file, 0, None, None, lambda n: None)
+
+            else:
+                def _worker(seg):
+
+                    def _progress(n):
+                        with lock:
+                            seg[2]     += n
+                            counter[0] += 1
+                            if  not counter[0] % _META_SAVE:
+                                _save()
+                    try:
+                        start, end, done = seg
+                        if  start + done < end:
+                            self._fetch(url, target_file, start + done,
+                                        end - start - done, validator, _progress)
+                    except Exception as e:
+                        errors.append(e)
+
+                threads = [threading.Thread(target=_worker, args=[seg])
+                           for seg in state['segments']]
+
+                for t in threads: t.start()
+                for t in threads: t.join()
+
+                if  errors:
+                    with lock:
+                        _save()
+                    raise errors[0]
+
+        finally:
+            target_file.close()
+
+        # verify size, and move the data in place
+        got = os.path.getsize(part)
+        if  size is not None and got != size:
+            raise se.NoSuccess("download of %s incomplete (%d != %d)"
+                              % (url, got, size))
+
+        os.rename(part, target)
+        if  os.path.exists(meta):
+            os.remove(meta)
+
+        return got
+
+
+    # --------------------------------------------------------------------------
+    #
+    def close(self):
+
+        self._pool.close()
+
+
+# ------------------------------------------------------------------------------
+#
+class BlockCache(object):
+    """
+    A least-recently-used cache of fixed size data blocks, indexed by block
+    number.  Holds at most `size` bytes (i.e. `size // block_size` blocks).
+    The last block of a file may be short.
+    """
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, size, block_size):
+
+        self.block_size = block_size
+
+        self._max    = max(1, size // block_size)
+        self._blocks = dict()
+        self._order  = list()   # least recently used first
+
+
+    # --------------------------------------------------------------------------
+    #
+    def get(self, idx):
+
+        data = self._blocks.get(idx)
+
+        if  data is not None:
+            self._order.remove(idx)
+            self._order.append(idx)
+
+        return data
+
+
+    # --------------------------------------------------------------------------
+    #
+    def put(self, idx, data):
+
+        if  idx in self._blocks:
+            self._order.remove(idx)
+
+        self._blocks[idx] = data
+        self._order.append(idx)
+
+        while len(self._order) > self._max:
+            del(self._blocks[self._order.pop(0)])
+
+
+    # --------------------------------------------------------------------------
+    #
+    def clear(self):
+
+        self._blocks = dict()
+        self._order  = list()
+
+
+# ------------------------------------------------------------------------------
+#
+class _PartFile(object):
+    """
+    thread safe positional writes into a local file
+    """
+
+    def __init__(self, path):
+
+        self._f    = open(path, 'r+b')
+        self._lock = threading.Lock()
+
+    def write(self, offset, data):
+
+        with self._lock:
+            self._f.seek(offset)
+            self._f.write(data)
+
+    def flush(self):
+        """
+        make sure that all data written so far are on disk
+        """
+
+        with self._lock:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    def close(self):
+
+        with self._lock:
+            self._f.close()
+
+
+# ------------------------------------------------------------------------------
+
@@ -8,25 +8,76 @@ __license__   = "MIT"
 """
 
 import os.path
-import urllib
 
 import saga.adaptors.base
 import saga.adaptors.cpi.filesystem
 import saga.utils.misc as sumisc
 
+import http_client
+
 
 from saga.filesystem.constants import *
 
 SYNC_CALL = saga.adaptors.cpi.decorators.SYNC_CALL
 ASYNC_CALL = saga.adaptors.cpi.decorators.ASYNC_CALL
 
+# granularity of ranged reads, and of the block cache
+_BLOCK_SIZE = 64 * 1024
+
 
 # --------------------------------------------------------------------
 # the adaptor name
 #
 _ADAPTOR_NAME          = "saga.adaptor.http_file"
 _ADAPTOR_SCHEMAS       = ["http", "https"]
-_ADAPTOR_OPTIONS       = []
+_ADAPTOR_OPTIONS       = [
+    {
+    'category'         : _ADAPTOR_NAME,
+    'name'             : 'max_segments',
+    'type'             : int,
+    'default'          : 4,
+    'documentation'    : '''Large files are downloaded in up to that many
+                          parallel HTTP range requests.''',
+    'env_variable'     : 'SAGA_HTTP_MAX_SEGMENTS'
+    },
+    {
+    'category'         : _ADAPTOR_NAME,
+    'name'             : 'segment_size',
+    'type'             : int,
+    'default'          : 16 * 1024 * 1024,
+    'documentation'    : '''Minimal size (in bytes) of a download segment.
+                          Files smaller than that are downloaded in a single
+                          request.''',
+    'env_variable'     : 'SAGA_HTTP_SEGMENT_SIZE'
+    },
+    {
+    'category'         : _ADAPTOR_NAME,
+    'name'             : 'pool_size',
+    'type'             : int,
+    'default'          : 4,
+    'documentation'    : '''Number of idle keep-alive connections kept open per
+                          host.''',
+    'env_variable'     : 'SAGA_HTTP_POOL_SIZE'
+    },
+    {
+    'category'         : _ADAPTOR_NAME,
+    'name'             : 'read_ahead',
+    'type'             : int,
+    'default'          : 256 * 1024,
+    'documentation'    : '''A read() which misses the block cache fetches at
+                          least that many bytes (from the file pointer on).''',
+    'env_variable'     : 'SAGA_HTTP_READ_AHEAD'
+    },
+    {
+    'category'         : _ADAPTOR_NAME,
+    'name'             : 'block_cache_size',
+    'type'             : int,
+    'default'          : 4 * 1024 * 1024,
+    'documentation'    : '''Size (in bytes) of the per-file cache of recently
+                          read blocks.''',
+    'env_variable'     : 'SAGA_HTTP_BLOCK_CACHE_SIZE'
+    }
+]
 
 # --------------------------------------------------------------------
 # the adaptor capabilities & supported attributes
@@ -43,7 +94,7 @@ _ADAPTOR_DOC           = {
     "name"             : _ADAPTOR_NAME,
     "cfg_options"      : _ADAPTOR_OPTIONS, 
     "capabilities"     : _ADAPTOR_CAPABILITIES,
-    "description"      : """The HTTP file adpator allows file transfer (copy) from remote resources to the local machine via the HTTP/HTTPS protocol, similar to cURL.""",
+    "description"      : """The HTTP file adpator allows file transfer (copy) from remote resources to the local machine via the HTTP/HTTPS protocol, similar to cURL.  Connections are kept alive and reused, large files are downloaded in parallel segments (HTTP range requests), and interrupted downloads are resumed.  Files can also be read (and seeked) without downloading them: reads are served via range requests, with read-ahead and a block cache.""",
     "example"          : "examples/files/http_file_copy.py",
     "schemas"          : {"http"   :"use the http protocol to access a remote file", 
                           "https"  :"use the https protocol to access a remote file"}
@@ -84,6 +135,18 @@ class Adaptor (saga.adaptors.base.Base):
 
         saga.adaptors.base.Base.__init__(self, _ADAPTOR_INFO, _ADAPTOR_OPTIONS)
 
+        self.opts         = self.get_config(_ADAPTOR_NAME)
+        self.max_segments = self.opts['max_segments'].get_value()
+        self.segment_size = self.opts['segment_size'].get_value()
+        self.pool_size    = self.opts['pool_size'   ].get_value()
+        self.read_ahead   = self.opts['read_ahead'  ].get_value()
+        self.cache_size   = self.opts['block_cache_size'].get_value()
+
+        # all file instances share the connection pool
+        self.client = http_client.HTTPClient(
+                          http_client.ConnectionPool(size=self.pool_size),
+                          logger=self._logger)
+
     # ----------------------------------------------------------------
     #
     def sanity_check(self):
@@ -159,8 +222,23 @@ class HTTPFile (saga.adaptors.cpi.filesystem.File):
         elif self.flags & saga.filesystem.READ:
             pass
 
+        self._offset = 0
+        self._info   = None
+        self._cache  = http_client.BlockCache(self._adaptor.cache_size,
+                                              _BLOCK_SIZE)
+
         self.valid = True
 
+    # ----------------------------------------------------------------
+    #
+    def _stat(self):
+        """ HEAD the file once, and keep the result """
+
+        if not self._info:
+            self._info = self._adaptor.client.stat(str(self.url))
+
+        return self._info
+
     # ----------------------------------------------------------------
     #
     def finalize(self, kill=False):
@@ -190,10 +268,10 @@ class HTTPFile (saga.adaptors.cpi.filesystem.File):
         #if sumisc.url_is_relative (src) : src = sumisc.url_make_absolute (cwdurl, src)
         #if sumisc.url_is_relative (tgt) : tgt = sumisc.url_make_absolute (cwdurl, tgt)
 
-        target = ""
-
         src_filename = os.path.basename(src.path)
         local_path = tgt.path
+        target = local_path
+
         if os.path.exists(tgt.path):
             if os.path.isfile(tgt.path):
                 # fail if overwtrite flag is not set, otherwise copy
@@ -211,10 +289,125 @@ class HTTPFile (saga.adaptors.cpi.filesystem.File):
                         raise saga.BadParameter("Local file '%s' exists." % target)
 
         try:
-            urllib.urlretrieve(str(src), target)
+            self._adaptor.client.download(str(src), target,
+                                          self._adaptor.max_segments,
+                                          self._adaptor.segment_size)
+        except saga.SagaException:
+            raise
         except Exception, e:
-            raise saga.BadParameter("Couldn't copy %s to %s: %s" %
-                                    (str(src), target, str(e)))
+            raise saga.NoSuccess("Couldn't copy %s to %s: %s" %
+                                 (str(src), target, str(e)))
+
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def get_size_self(self):
+
+        size = self._stat()['size']
+
+        if size is None:
+            raise saga.NoSuccess("server does not report a size for %s" % self.url)
+
+        return size
+
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def read(self, size=None):
+        """
+        Read up to `size` bytes from the current file pointer (or everything
+        up to EOF if `size` is not given), via HTTP range requests.  Data are
+        fetched in blocks of _BLOCK_SIZE, which are kept in an LRU cache.  On
+        a cache miss, at least `read_ahead` bytes are fetched.
+        """
+
+        if size is not None and size < 0:
+            raise saga.BadParameter("cannot read negative size (%s)" % size)
+
+        if size == 0:
+            return ''
+
+        info   = self._stat()
+        client = self._adaptor.client
+        offset = self._offset
+        end    = info['size']
+
+        if size is not None:
+            if end is None: end = offset + size
+            else          : end = min(end, offset + size)
+
+        if end is None:
+            # unknown size, read everything
+            out = client.read_range(info['url'], offset, None, info['validator'])
+            self._offset = offset + len(out)
+            return out
+
+        if end <= offset:
+            return ''
+
+        first  = offset  // _BLOCK_SIZE
+        last   = (end - 1) // _BLOCK_SIZE
+        ahead  = max(1, (self._adaptor.read_ahead + _BLOCK_SIZE - 1) // _BLOCK_SIZE)
+        blocks = dict()
+        idx    = first
+
+        while idx <= last:
+
+            data = self._cache.get(idx)
+            if data is not None:
+                blocks[idx] = data
+                idx += 1
+                continue
+
+            # fetch the run of missing blocks -- and read ahead if that run
+            # reaches the end of the requested range
+            stop = idx + 1
+            while stop <= last and self._cache.get(stop) is None:
+                stop += 1
+
+            if stop > last:
+                stop = max(stop, idx + ahead)
+
+            data = client.read_range(info['url'], idx * _BLOCK_SIZE,
+                                     (stop - idx) * _BLOCK_SIZE, info['validator'])
+
+            for i in range(stop - idx):
+                block = data[i * _BLOCK_SIZE:(i + 1) * _BLOCK_SIZE]
+                if not block:
+                    break
+                self._cache.put(idx + i, block)
+                blocks[idx + i] = block
+
+            if len(data) < (stop - idx) * _BLOCK_SIZE:
+                break  # EOF
+
+            idx = stop
+
+        data  = ''.join([blocks[i] for i in range(first, last + 1) if i in blocks])
+        start = offset - first * _BLOCK_SIZE
+        out   = data[start:start + end - offset]
+
+        self._offset = offset + len(out)
+        return out
+
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def seek(self, offset, whence):
+
+        if   whence == saga.filesystem.START   : base = 0
+        elif whence == saga.filesystem.CURRENT : base = self._offset
+        elif whence == saga.filesystem.END     : base = self.get_size_self()
+        else:
+            raise saga.BadParameter("invalid seek mode (%s)" % whence)
+
+        if base + offset < 0:
+            raise saga.BadParameter("cannot seek before start of file (%s)"
+                                   % (base + offset))
+
+        self._offset = base + offset
+
+        return self._offset
 
     # ----------------------------------------------------------------
     #
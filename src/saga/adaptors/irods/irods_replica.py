@@ -34,8 +34,13 @@ import sys
 import time
 import string
 import errno
+import pipes
+import fnmatch
+import urlparse
+import threading
 
 import saga.url
+import saga.task
 import saga.adaptors.base
 import saga.adaptors.cpi.replica
 import saga.utils.pty_shell
@@ -53,7 +58,37 @@ ASYNC_CALL = saga.adaptors.cpi.decorators.ASYNC_CALL
 
 _ADAPTOR_NAME          = 'saga.adaptor.replica.irods'
 _ADAPTOR_SCHEMAS       = ['irods']
-_ADAPTOR_OPTIONS       = []
+_ADAPTOR_OPTIONS       = [
+    {
+    'category'         : _ADAPTOR_NAME,
+    'name'             : 'catalog_ttl',
+    'type'             : float,
+    'default'          : 10.0,
+    'documentation'    : '''Lifetime (in seconds) of cached collection
+                          listings, which serve list(), and list_locations(),
+                          get_size() and is_file() on entries of already
+                          listed collections.  Listings are invalidated
+                          by the adaptor's own replicate, upload and remove
+                          operations -- changes by others become visible
+                          after the ttl.  '0' disables caching.''',
+    'env_variable'     : 'SAGA_IRODS_CATALOG_TTL'
+    },
+    {
+    'category'         : _ADAPTOR_NAME,
+    'name'             : 'transfer_threads',
+    'type'             : int,
+    'default'          : 0,
+    'documentation'    : '''Number of threads iput and irepl use per
+                          transfer (their '-N' option).  '0' leaves the
+                          choice to iRODS.''',
+    'env_variable'     : 'SAGA_IRODS_TRANSFER_THREADS'
+    }
+]
+
+# maximum length of a single icommand line (bulk operations over many
+# logical files are split into several commands) -- stay below the size of
+# the pty line buffer
+_MAX_CMD_LEN = 4000
 _ADAPTOR_CAPABILITIES  = {}
 _ADAPTOR_DOC           = {
     'name'             : _ADAPTOR_NAME,
@@ -160,6 +195,205 @@ class irods_resource_entry:
         self.group_members     = []
 
 
+# ----------------------------------------------------------------
+#
+def _irods_parse_listing (out) :
+    '''Parse the output of 'ils -L' into a list of irods_logical_entry
+       instances, in a single pass.  Replicas of a data object are listed
+       one per line -- they are merged into a single entry with multiple
+       locations.
+    '''
+
+    # ils -L output looks like this:
+    #
+    # /osg/home/azebro1:
+    #   azebro1           1 UFlorida-SSERCA_FTP            12 2012-11-14.09:55 & irods-test.txt
+    #         /data/cache/UFlorida-SSERCA_FTPplaceholder/home/azebro1/irods-test.txt    osgGridFtpGroup
+    #   C- /osg/home/azebro1/subdir
+    #
+    # The collection and physical path lines start with '/' and are ignored.
+
+    result = []
+    index  = {}
+
+    for line in out.split ("\n") :
+
+        item = line.strip ()
+
+        if not item or item.startswith ("/") :
+            continue
+
+        # if we have a directory here
+        if item.startswith ("C- ") :
+            entry              = irods_logical_entry ()
+            entry.name         = item[3:]
+            entry.is_directory = True
+            result.append (entry)
+            continue
+
+        # if we have a file here -- after splitting, the line looks like
+        #  0           1    2                      3     4                   5    6
+        # ['azebro1', '1', 'UFlorida-SSERCA_FTP', '12', '2012-11-14.09:55', '&', 'irods-test.txt']
+        # (1 is the replica number, 5 the replica status).  The name may
+        # contain white space.
+        elems = item.split (None, 6)
+        if len (elems) < 7 :
+            continue
+
+        name = elems[6]
+
+        if name in index :
+            # another replica of a known data object
+            index[name].locations.append (elems[2])
+            continue
+
+        entry           = irods_logical_entry ()
+        entry.owner     = elems[0]
+        entry.locations = [elems[2]]
+        entry.size      = elems[3]
+        entry.date      = elems[4]
+        entry.name      = name
+
+        index[name] = entry
+        result.append (entry)
+
+    return result
+
+
+# ----------------------------------------------------------------
+#
+def _irods_resource (url) :
+    '''Return the resource given as '?resource=name' query of the url, or
+       None.
+    '''
+
+    if not url :
+        return None
+
+    query = saga.Url (url).get_query ()
+    if not query :
+        return None
+
+    values = urlparse.parse_qs (query).get ('resource')
+    if not values :
+        return None
+
+    return values[0]
+
+
+# ----------------------------------------------------------------
+#
+def _irods_bulk (shell, cmd, paths, max_len=_MAX_CMD_LEN, failed=None) :
+    '''Run an icommand which accepts multiple logical paths (like irepl or
+       irm) over all given paths, with as few invocations as the command
+       line length allows.  If `failed` is a dict, failing invocations are
+       retried path by path, and the errors of the paths which still fail
+       are stored in it, instead of raising.
+    '''
+
+    chunks = []
+    chunk  = []
+    size   = len (cmd)
+
+    for path in paths :
+
+        arg = pipes.quote (path)
+
+        if chunk and size + len (arg) + 1 > max_len :
+            chunks.append (chunk)
+            chunk = []
+            size  = len (cmd)
+
+        chunk.append (path)
+        size += len (arg) + 1
+
+    if chunk :
+        chunks.append (chunk)
+
+    for chunk in chunks :
+
+        args = " ".join ([pipes.quote (path) for path in chunk])
+        returncode, out, _ = shell.run_sync ("%s %s" % (cmd, args))
+
+        if returncode == 0 :
+            continue
+
+        error = "%s failed, errorcode %s: %s" % (cmd, str(returncode), out)
+
+        if failed is None :
+            raise saga.NoSuccess (error)
+
+        # a single failing path fails the whole invocation: find out which
+        if len (chunk) == 1 :
+            failed[chunk[0]] = error
+        else :
+            for path in chunk :
+                _irods_bulk (shell, cmd, [path], max_len, failed)
+
+
+# ----------------------------------------------------------------
+#
+class _IRODSCatalog (object) :
+    '''A cache of collection listings with a time-to-live.  Listings are
+       indexed by entry name, so that lookups of single entries (to get the
+       size or locations of a logical file) do not need to scan the listing.
+    '''
+
+    def __init__ (self, ttl) :
+
+        self.ttl      = ttl
+        self._lock    = threading.Lock ()
+        self._entries = dict ()   # collection : [time, listing, index]
+        self._epoch   = 0
+
+
+    def get (self, collection, fetch) :
+        '''Return the listing and index of the collection, and fetch them
+           via fetch(collection) if they are not cached.
+        '''
+
+        now = time.time ()
+
+        with self._lock :
+            cached = self._entries.get (collection)
+            if cached and now - cached[0] < self.ttl :
+                return cached[1], cached[2]
+            epoch = self._epoch
+
+        listing = fetch (collection)
+        index   = dict ()
+        for entry in listing :
+            index[os.path.basename (entry.name)] = entry
+
+        with self._lock :
+            # don't cache listings which may have been invalidated meanwhile
+            if self.ttl and epoch == self._epoch :
+                self._entries[collection] = [now, listing, index]
+
+        return listing, index
+
+
+    def peek (self, collection) :
+        '''Return the index of the collection if it is cached (and not
+           expired), None otherwise.  Nothing is fetched.
+        '''
+
+        with self._lock :
+            cached = self._entries.get (collection)
+            if cached and time.time () - cached[0] < self.ttl :
+                return cached[2]
+
+        return None
+
+
+    def invalidate (self, collection) :
+
+        with self._lock :
+            self._epoch += 1
+            if collection in self._entries :
+                del (self._entries[collection])
+
+
 ###############################################################################
 # The adaptor class
 
@@ -178,6 +412,32 @@ class Adaptor (saga.adaptors.base.Base):
                                           _ADAPTOR_INFO,
                                           _ADAPTOR_OPTIONS)
 
+        self.opts        = self.get_config (_ADAPTOR_NAME)
+        self.catalog_ttl = self.opts['catalog_ttl'     ].get_value ()
+        self.threads     = self.opts['transfer_threads'].get_value ()
+        self._catalog    = _IRODSCatalog (self.catalog_ttl)
+
+        # the adaptor *singleton* creates a (single) instance of a bulk
+        # handler, which implements container_* bulk methods for logical
+        # files
+        self._bulk       = BulkLogicalFile (self)
+
+
+    # ----------------------------------------------------------------
+    #
+    #
+    def irods_opts (self, resource=None, flags=None) :
+        '''Common options for iput and irepl.'''
+
+        opts = ""
+
+        if resource                                  : opts += " -R %s" % resource
+        if self.threads                              : opts += " -N %d" % self.threads
+        if flags and flags & ns.OVERWRITE        : opts += " -f"
+        if flags and flags & ns.RECURSIVE        : opts += " -r"
+
+        return opts
+
 
     def sanity_check (self) :
         try:
@@ -220,75 +480,88 @@ class Adaptor (saga.adaptors.base.Base):
            commands with
         '''
 
-        result = []
         try:
-            cw = wrapper
-
             # execute the ils -L command
-            returncode, out, _ = cw.run_sync ("ils -L %s" % irods_dir)
+            returncode, out, _ = wrapper.run_sync ("ils -L %s" % irods_dir)
     
             # make sure we ran ok
             if returncode != 0:
                 raise saga.NoSuccess ("Could not open directory %s, errorcode %s: %s"\
-                                        % (irods_dir, str(cw_result.returncode),
-                                           out))
-    
-            # strip extra linebreaks from stdout, make a list from the linebreaks that
-            # remain, skip first entry which just tells us the current directory
-            for item in out.strip().split("\n"):
+                                        % (irods_dir, str(returncode), out))
     
-                # if we are listing a directory or remote resource file location i.e.
-                # [azebro1@gw68]$ ils -L /osg/home/azebro1
-                # /osg/home/azebro1:
-                #    azebro1           1 UFlorida-SSERCA_FTP            12 2012-11-14.09:55 & irods-test.txt
-                #          /data/cache/UFlorida-SSERCA_FTPplaceholder/home/azebro1/irods-test.txt    osgGridFtpGroup
-    
-                # then we want to ignore that entry (not using it for now)
-                if item.strip().startswith("/"):
-                    continue 
-                
-                # remove whitespace
-                item = item.strip()
-    
-                # entry for file or directory
-                dir_entry = irods_logical_entry()
-                
-                # if we have a directory here
-                if item.startswith("C- "):
-                    dir_entry.name = item[3:]
-                    dir_entry.is_directory = True
-    
-                # if we have a file here
-                else:
-                    # ils -L output looks like this after you split it:
-                    #  0           1    2                      3     4                   5    6
-                    # ['azebro1', '1', 'UFlorida-SSERCA_FTP', '12', '2012-11-14.09:55', '&', 'irods-test.txt']
-                    # not sure what 1 and 5 are ... 
-                    dir_entry.owner = item.split()[0]
-                    dir_entry.locations = [item.split()[2]]
-                    dir_entry.size = item.split()[3]
-                    dir_entry.date = item.split()[4]
-                    dir_entry.name = item.split()[6]
-    
-                result.append(dir_entry)
-    
-            # merge all entries on the list with duplicate filenames into a
-            # single entry with one filename and multiple resource locations
-            final_list = []
-            for item in result:
-                if item.name in [i.name for i in final_list]:
-                    # duplicate name, merge this entry with the previous one
-                    for final_list_item in final_list:
-                        if final_list_item.name == item.name:
-                            final_list_item.locations.append(item.locations[0])
-                else:
-                    final_list.append(item)
-            return final_list
+            return _irods_parse_listing (out)
     
         except Exception, e:
-            raise saga.NoSuccess ("Couldn't get directory listing: %s %s " % e)
-    
-        return result
+            raise saga.NoSuccess ("Couldn't get directory listing: %s " % e)
+
+
+    # ----------------------------------------------------------------
+    #
+    #
+    def irods_get_catalog (self, collection, wrapper) :
+        '''Returns the (possibly cached) listing of the collection, and an
+           index of its entries by name.
+        '''
+
+        if collection != '/' :
+            collection = collection.rstrip ('/')
+
+        return self._catalog.get (collection, 
+                lambda c : self.irods_get_directory_listing (c, wrapper))
+
+
+    # ----------------------------------------------------------------
+    #
+    #
+    def irods_stat (self, path, wrapper) :
+        '''Returns the irods_logical_entry for the given logical path.  It is
+           served from the catalog of its collection if that is cached already
+           -- otherwise only the path itself is queried (the collection is not
+           listed for a single entry).
+        '''
+
+        if path != '/' :
+            path = path.rstrip ('/')
+
+        index = self._catalog.peek (os.path.dirname (path))
+
+        if index is not None :
+            entry = index.get (os.path.basename (path))
+            if not entry :
+                raise saga.DoesNotExist ("%s does not exist" % path)
+            return entry
+
+        returncode, out, _ = wrapper.run_sync ("ils -L %s" % path)
+
+        if returncode != 0 :
+            raise saga.DoesNotExist ("%s does not exist: %s" % (path, out))
+
+        # for a collection, ils lists its content, headed by the collection
+        # name -- for a data object, the output contains its replica lines
+        for line in out.split ("\n") :
+            if line.strip () == "%s:" % path :
+                entry              = irods_logical_entry ()
+                entry.name         = path
+                entry.is_directory = True
+                return entry
+
+        for entry in _irods_parse_listing (out) :
+            if os.path.basename (entry.name) == os.path.basename (path) :
+                return entry
+
+        raise saga.DoesNotExist ("%s does not exist" % path)
+
+
+    # ----------------------------------------------------------------
+    #
+    #
+    def irods_invalidate (self, path) :
+        '''Drop cached listings after the given logical path changed.
+        '''
+
+        path = path.rstrip ('/') or '/'
+        self._catalog.invalidate (path)
+        self._catalog.invalidate (os.path.dirname (path))
 
 
     # ----------------------------------------------------------------
@@ -383,6 +656,107 @@ class Adaptor (saga.adaptors.base.Base):
         except Exception, e:
             raise saga.NoSuccess ("Couldn't get resource listing: %s " % (str(e)))
 
+###############################################################################
+#
+# bulk operations on logical files
+#
+class BulkLogicalFile (object) :
+    '''
+    Implements the container_* bulk methods for logical file tasks.  All
+    replicate tasks in a container which target the same resource are run
+    as a single irepl invocation, and the invocations for different resources
+    run concurrently, in the background.
+    '''
+
+    # ----------------------------------------------------------------
+    #
+    def __init__ (self, adaptor) :
+
+        self._adaptor = adaptor
+
+
+    # ----------------------------------------------------------------
+    #
+    def container_replicate (self, tasks) :
+
+        groups = dict ()
+        for task in tasks :
+            resource = _irods_resource (task._method_context['target'])
+            flags    = task._method_context['flags']
+            groups.setdefault ((resource, flags), []).append (task)
+            task._set_state (saga.task.RUNNING)
+
+        # the tasks' 'done' events are set by the threads -- see
+        # container_wait()
+        for (resource, flags), group in groups.iteritems () :
+            thread = threading.Thread (target=self._replicate,
+                                       args=[resource, flags, group])
+            thread.start ()
+
+
+    # ----------------------------------------------------------------
+    #
+    def _replicate (self, resource, flags, tasks) :
+
+        # all files of the group are replicated over the shell of one of them
+        shell = tasks[0]._adaptor.shell
+        paths = [task._adaptor._url.get_path () for task in tasks]
+        cmd   = "irepl%s" % self._adaptor.irods_opts (resource, flags)
+
+        # errors are collected per path, so that only the tasks of failing
+        # files fail
+        failed = dict ()
+        try :
+            _irods_bulk (shell, cmd, paths, failed=failed)
+
+        except Exception, ex :
+            failed = dict ([(path, str(ex)) for path in paths])
+
+        for path in set (paths) :
+            self._adaptor.irods_invalidate (path)
+
+        for task, path in zip (tasks, paths) :
+
+            if path in failed :
+                task._set_exception (saga.NoSuccess ("Couldn't replicate file. %s"
+                                                    % failed[path]))
+                task._set_state (saga.task.FAILED)
+            else :
+                task._set_state (saga.task.DONE)
+
+            task._method_context['done'].set ()
+
+
+    # ----------------------------------------------------------------
+    #
+    def container_wait (self, tasks, mode, timeout) :
+
+        # a negative timeout waits forever, a timeout of 0 only polls
+        if timeout < 0 :
+            for task in tasks :
+                task.wait ()
+            return
+
+        deadline = time.time () + timeout
+        for task in tasks :
+            task.wait (max (0.0, deadline - time.time ()))
+
+
+    # ----------------------------------------------------------------
+    #
+    def container_cancel (self, tasks, timeout) :
+
+        for task in tasks :
+            task.cancel ()
+
+
+    # ----------------------------------------------------------------
+    #
+    def container_get_states (self, tasks) :
+
+        return [task.get_state () for task in tasks]
+
+
 ###############################################################################
 #
 # logical_directory adaptor class
@@ -522,6 +896,7 @@ class IRODSDirectory (saga.adaptors.cpi.replica.LogicalDirectory) :
         try:
             self._logger.debug("Executing: irm -r %s" % complete_path)
             returncode, out, _ = self.shell.run_sync("irm -r %s" % complete_path)
+            self._adaptor.irods_invalidate (complete_path)
 
             if returncode != 0:
                 raise saga.NoSuccess ("Could not remove directory %s, errorcode %s: %s"\
@@ -544,36 +919,113 @@ class IRODSDirectory (saga.adaptors.cpi.replica.LogicalDirectory) :
     #
     @SYNC_CALL
     def list (self, npat, flags) :
-       #TODO: Make this use the irods_get_directory_listing
 
         complete_path = self._url.path
-        result = []
         
         self._logger.debug("Attempting to get directory listing for logical"
                            "path %s" % complete_path)
 
         try:
-            returncode, out, _ = self.shell.run_sync("ils %s" % complete_path)
-            
-            if returncode != 0:
-                raise Exception("Could not open directory")
-
-            # strip extra linebreaks from stdout, make a list w/ linebreaks,
-            # skip first entry which tells us the current directory
-            for item in out.strip().split("\n")[1:]:
-                item = item.strip()
-                if item.startswith("C- "):
-                    #result.append("dir " + item[3:])
-                    result.append(item[3:])
-                else:
-                    #result.append("file " +item)
-                    result.append(item)
+            listing, _ = self._adaptor.irods_get_catalog (complete_path, self.shell)
 
         except Exception, ex:
             raise saga.NoSuccess ("Couldn't list directory: %s " % (str(ex)))
 
+        result = [entry.name for entry in listing]
+
+        if npat :
+            result = [name for name in result
+                           if fnmatch.fnmatch (os.path.basename (name), npat)]
+
         return result
 
+
+    # ----------------------------------------------------------------
+    #
+    #
+    @SYNC_CALL
+    def replicate (self, tgts, target, flags) :
+        '''Replicates many logical files (or, with RECURSIVE, collections)
+           to the resource given in the target URL, with as few irepl
+           invocations as possible.
+        '''
+
+        base  = self._url.path.rstrip ('/')
+        paths = list ()
+        for tgt in tgts :
+            path = saga.Url (tgt).get_path ()
+            if not path.startswith ('/') :
+                path = "%s/%s" % (base, path)
+            paths.append (path)
+
+        resource = _irods_resource (target)
+        cmd      = "irepl%s" % self._adaptor.irods_opts (resource, flags)
+
+        self._logger.debug ("Attempting to replicate %d logical files to "
+                            "resource/resource group %s" % (len(paths), resource))
+
+        try :
+            _irods_bulk (self.shell, cmd, paths)
+
+        except Exception, ex :
+            raise saga.NoSuccess._log (self._logger, "Couldn't replicate files. %s" % ex)
+
+        finally :
+            for path in paths :
+                self._adaptor.irods_invalidate (path)
+
+
+    # ----------------------------------------------------------------
+    #
+    #
+    @SYNC_CALL
+    def upload (self, source, target, flags) :
+        '''Uploads a local directory tree into this logical directory, as
+           a single 'iput -r' (optionally to the resource given in the target
+           URL).
+        '''
+
+        local_path = saga.Url (source).get_path ()
+        resource   = _irods_resource (target)
+        opts       = self._adaptor.irods_opts (resource, flags)
+
+        if not '-r' in opts.split () :
+            opts += " -r"
+
+        cmd = "iput%s %s %s" % (opts, pipes.quote (local_path),
+                                      pipes.quote (self._url.path))
+
+        self._logger.debug ("Executing: %s" % cmd)
+
+        try :
+            returncode, out, _ = self.shell.run_sync (cmd)
+            self._adaptor.irods_invalidate (self._url.path)
+
+            if returncode != 0 :
+                raise saga.NoSuccess ("Could not upload %s, errorcode %s: %s" \
+                                   % (local_path, str(returncode), out))
+
+        except Exception, ex :
+            raise saga.NoSuccess._log (self._logger, "Couldn't upload directory: %s" % ex)
+
+
+    # ----------------------------------------------------------------
+    #
+    #
+    @SYNC_CALL
+    def is_file (self, tgt) :
+
+        path = saga.Url (tgt).get_path ()
+        if not path.startswith ('/') :
+            path = "%s/%s" % (self._url.path.rstrip ('/'), path)
+
+        try :
+            return not self._adaptor.irods_stat (path, self.shell).is_directory
+
+        except saga.DoesNotExist :
+            return False
+
+
 ######################################################################
 #
 # logical_file adaptor class
@@ -597,6 +1049,9 @@ class IRODSFile (saga.adaptors.cpi.replica.LogicalFile) :
 
         self.shell = saga.utils.pty_shell.PTYShell (saga.url.Url("ssh://localhost"))
 
+        # bulk operations on tasks are handled by the adaptor's bulk handler
+        self._container = self._adaptor._bulk
+
         # TODO: "stat" the file
 
     def __del__ (self):
@@ -713,8 +1168,7 @@ class IRODSFile (saga.adaptors.cpi.replica.LogicalFile) :
          path = self._url.get_path()
          self._logger.debug("Attempting to get a list of replica locations for %s"
                             % path)
-         listing = self._adaptor.irods_get_directory_listing(path, self.shell)
-         return listing[0].locations
+         return list (self._adaptor.irods_stat (path, self.shell).locations)
 
     # ----------------------------------------------------------------
     #
@@ -723,7 +1177,23 @@ class IRODSFile (saga.adaptors.cpi.replica.LogicalFile) :
     def get_size_self (self) :
          '''This method is called upon logicaldir.get_size()
          '''
-         return self.size
+         path = self._url.get_path()
+         return int (self._adaptor.irods_stat (path, self.shell).size)
+
+
+    # ----------------------------------------------------------------
+    #
+    #
+    @SYNC_CALL
+    def is_file_self (self) :
+         '''This method is called upon logicalfile.is_file()
+         '''
+         try :
+             path = self._url.get_path()
+             return not self._adaptor.irods_stat (path, self.shell).is_directory
+
+         except saga.DoesNotExist :
+             return False
 
 
     # ----------------------------------------------------------------
@@ -747,9 +1217,11 @@ class IRODSFile (saga.adaptors.cpi.replica.LogicalFile) :
         #path to file we are replicating on iRODS
         complete_path = self._url.get_path()        
 
-        #TODO: Verify Correctness in the way the resource is grabbed
-        query = saga.Url(target).get_query()
-        resource = query.split("=")[1]
+        resource = _irods_resource (target)
+        if not resource :
+            raise saga.BadParameter._log (self._logger, "No resource given in "
+                                          "%s (use '?resource=name')" % target)
+
         self._logger.debug("Attempting to replicate logical file %s to "
                            "resource/resource group %s" 
                            % (complete_path, resource))
@@ -759,10 +1231,11 @@ class IRODSFile (saga.adaptors.cpi.replica.LogicalFile) :
                                % (resource, complete_path) )
             returncode, out, _ = self.shell.run_sync("irepl -R %s %s" 
                                           % (resource, complete_path) )
+            self._adaptor.irods_invalidate (complete_path)
 
             if returncode != 0:
                 raise Exception("Could not replicate logical file %s to resource/resource group %s, errorcode %s: %s"\
-                                    % (complete_path, resource, str(cw_result.returncode),
+                                    % (complete_path, resource, str(returncode),
                                        out))
 
         except Exception, ex:
@@ -770,6 +1243,55 @@ class IRODSFile (saga.adaptors.cpi.replica.LogicalFile) :
         return
 
 
+    # ----------------------------------------------------------------
+    #
+    #
+    @ASYNC_CALL
+    def replicate_async (self, target, flags, ttype) :
+        '''Replicate tasks are run by the bulk handler, so that containers
+           of them can be replicated in bulk.
+        '''
+
+        c = { 'target' : target,
+              'flags'  : flags, 
+              'done'   : threading.Event () }
+
+        return saga.task.Task (self, 'replicate', c, ttype)
+
+
+    # ----------------------------------------------------------------
+    #
+    #
+    def task_run (self, task) :
+
+        # returns once the replication runs in the background
+        self._container.container_replicate ([task])
+
+
+    # ----------------------------------------------------------------
+    #
+    #
+    def task_wait (self, task, timeout) :
+
+        # only task_run() (via run()) sets the event
+        if task.get_state () == saga.task.NEW :
+            raise saga.IncorrectState ("cannot wait for a task which was "
+                                       "not started")
+
+        if timeout < 0 :
+            timeout = None
+
+        task._method_context['done'].wait (timeout)
+
+
+    # ----------------------------------------------------------------
+    #
+    #
+    def task_cancel (self, task) :
+
+        raise saga.NotImplemented._log (self._logger, "Cannot cancel replication")
+
+
     # ----------------------------------------------------------------
     #
     # TODO: This is COMPLETELY untested, as it is unsupported on the only iRODS
@@ -818,6 +1340,7 @@ class IRODSFile (saga.adaptors.cpi.replica.LogicalFile) :
 
         try:
             returncode, out, _ = self.shell.run_sync("irm %s" % complete_path)
+            self._adaptor.irods_invalidate (complete_path)
 
             if returncode != 0:
                 raise saga.NoSuccess ("Could not remove file %s, errorcode %s: %s"\
@@ -874,7 +1397,7 @@ class IRODSFile (saga.adaptors.cpi.replica.LogicalFile) :
                            destination_path)
 
             # the query holds our target resource
-            query = saga.Url(target).get_query()
+            resource = _irods_resource (target)
 
             # list of args we will generate
             arg_list = ""
@@ -885,19 +1408,19 @@ class IRODSFile (saga.adaptors.cpi.replica.LogicalFile) :
                     arg_list += "-f "
 
             # was no resource selected?
-            if query==None:
+            if not resource:
                 self._logger.debug("Attempting to upload to default resource")
                 returncode, out, _ = self.shell.run_sync("iput %s %s %s" %
                                          (arg_list, complete_path, destination_path))
 
             # resource was selected, have to parse it and supply to iput -R
             else:
-                #TODO: Verify correctness
-                resource = query.split("=")[1]
                 self._logger.debug("Attempting to upload to query-specified resource %s" % resource)
                 returncode, out, _ = self.shell.run_sync("iput -R %s %s %s %s" %
                                          (resource, arg_list, complete_path, destination_path))
 
+            self._adaptor.irods_invalidate (self._url.get_path())
+
             # check our result
             if returncode != 0:
                 raise saga.NoSuccess ("Could not upload file %s, errorcode %s: %s"\
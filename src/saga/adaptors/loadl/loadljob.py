@@ -16,6 +16,7 @@ import saga.adaptors.cpi.base
 import saga.adaptors.cpi.job
 
 from saga.adaptors.sge.sgejob import SgeKeyValueParser
+from saga.utils.job           import StateCoalescer
 
 import os
 import re
@@ -236,6 +237,10 @@ class LOADLJobService (saga.adaptors.cpi.job.Service):
 
         self._adaptor = adaptor
 
+        # merges concurrent llq calls into one
+        self._coalescer = StateCoalescer(self._bulk_llq, self._parse_bulk_llq,
+                                         logger=self._logger)
+
     # ----------------------------------------------------------------
     #
     def __del__(self):
@@ -684,6 +689,48 @@ class LOADLJobService (saga.adaptors.cpi.job.Service):
 
             return job_id
 
+    # ----------------------------------------------------------------
+    #
+    def _bulk_llq(self, pids):
+        """ StateCoalescer query hook: run llq for a list of job ids
+        """
+
+        # run the LoadLeveler 'llq' command to get some info about our jobs
+        ret, out, _ = self.shell.run_sync("%s -j %s -r %%id %%st %%dd %%cc %%jt %%c %%Xs" % \
+                                          (self._commands['llq']['path'], ' '.join(pids)))
+        # output is something like
+        # kisti.123.0!R!03/25/2014 13:47!!Serial!normal!kisti.kim
+        # OR
+        # llq: There is currently no job status to report.
+        if ret != 0 and not 'llq:' in out:
+            message = "Error retrieving job info via 'llq': %s" % out
+            log_error_and_raise(message, saga.NoSuccess, self._logger)
+
+        return out
+
+    # ----------------------------------------------------------------
+    #
+    def _parse_bulk_llq(self, out, pids):
+        """ StateCoalescer parse hook: map job ids to their llq output
+            fields (without the step id).  Jobs which are not in the queue
+            anymore are left out.
+        """
+
+        results = dict()
+        for line in out.split('\n'):
+
+            elems = line.strip().split('!')
+            if len(elems) < 2:
+                continue
+
+            # llq reports job steps ('<job id>.<step>')
+            for pid in pids:
+                if elems[0] == pid or elems[0].startswith(pid + '.'):
+                    results[pid] = elems[1:]
+                    break
+
+        return results
+
     # ----------------------------------------------------------------
     #
     def _retrieve_job(self, job_id, max_retries=10):
@@ -693,61 +740,48 @@ class LOADLJobService (saga.adaptors.cpi.job.Service):
         """
         rm, pid = self._adaptor.parse_id(job_id)
 
-        # run the LoadLeveler 'llq' command to get some info about our job
-        ret, out, _ = self.shell.run_sync("%s -j %s -r %%st %%dd %%cc %%jt %%c %%Xs" % \
-                                          (self._commands['llq']['path'], pid))
-        # output is something like
-        # R!03/25/2014 13:47!!Serial!normal!kisti.kim
-        # OR
-        # llq: There is currently no job status to report.
-        if ret != 0:
-            message = "Couldn't reconnect to job '%s': %s" % (job_id, out)
-            log_error_and_raise(message, saga.NoSuccess, self._logger)
+        # concurrent queries for other jobs are merged into one llq call
+        results = self._coalescer.get(pid)
+
+        # the job seems to exist on the backend. let's gather some data
+        job_info = {
+            'state':        saga.job.UNKNOWN,
+            'exec_hosts':   None,
+            'returncode':   None,
+            'create_time':  None,
+            'start_time':   None,
+            'end_time':     None,
+            'gone':         False
+        }
 
-        else:
-            # the job seems to exist on the backend. let's gather some data
-            job_info = {
-                'state':        saga.job.UNKNOWN,
-                'exec_hosts':   None,
-                'returncode':   None,
-                'create_time':  None,
-                'start_time':   None,
-                'end_time':     None,
-                'gone':         False
-            }
+        if results is None: # llq: There is currently no job status to report
+            job_info = None
+            retries = 0
+            delay = 1
+            while job_info is None and retries < max_retries:
+                job_info = self.__get_remote_job_info(pid)
+                #print "llq:", job_info
+                if job_info == None and retries > 0:
+                    message = "__get_remote_job_info get None, pid: %s and retries: %d" % (pid, retries)
+                    self._logger.debug(message)
+                    # Exponential back-off
+                    time.sleep(2**retries)
+                retries += 1
+
+            if job_info == None:
+                message = "__get_remote_job_info exceed %d times(s), pid: %s" % (max_retries, pid)
+                log_error_and_raise(message, saga.NoSuccess, self._logger)
+
+            self._logger.info("_retrieve_job: %r", job_info)
+        else: # job is still in the queue
+            self._logger.info("results: %r",results)
 
-            #lastStr=out.rstrip().split('\n')[-1]
-            lastStr=out.rstrip()
-            self._logger.debug(lastStr)
-            if lastStr.startswith('llq:'): # llq: There is currently no job status to report
-                job_info = None
-                retries = 0
-                delay = 1
-                while job_info is None and retries < max_retries:
-                    job_info = self.__get_remote_job_info(pid)
-                    #print "llq:", job_info
-                    if job_info == None and retries > 0:
-                        message = "__get_remote_job_info get None, pid: %s and retries: %d" % (pid, retries)
-                        self._logger.debug(message)
-                        # Exponential back-off
-                        time.sleep(2**retries)
-                    retries += 1
-
-                if job_info == None:
-                    message = "__get_remote_job_info exceed %d times(s), pid: %s" % (max_retries, pid)
-                    log_error_and_raise(message, saga.NoSuccess, self._logger)
-
-                self._logger.info("_retrieve_job: %r", job_info)
-            else: # job is still in the queue
-                results = lastStr.split('!')
-                self._logger.info("results: %r",results)
-
-                job_info['state'] = _ll_to_saga_jobstate(results[0])
-                job_info['returncode'] = -1 # still running
-                job_info['start_time'] = results[1]
-                #job_info['exec_hosts'] = results[5]
-
-            return job_info
+            job_info['state'] = _ll_to_saga_jobstate(results[0])
+            job_info['returncode'] = -1 # still running
+            job_info['start_time'] = results[1]
+            #job_info['exec_hosts'] = results[5]
+
+        return job_info
 
     # ----------------------------------------------------------------
     #
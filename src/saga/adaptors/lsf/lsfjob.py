@@ -17,6 +17,7 @@ import saga.adaptors.base
 import saga.adaptors.cpi.job
 
 from saga.job.constants import *
+from saga.utils.job     import StateCoalescer
 
 import re
 import os 
@@ -59,28 +60,38 @@ class _job_state_monitor(threading.Thread):
                 # do bulk updates here! we don't want to pull information
                 # job by job. that would be too inefficient!
                 jobs = self.js.jobs
-                job_keys = jobs.keys()
 
-                for job in job_keys:
-                    # if the job hasn't been started, we can't update its
-                    # state. we can tell if a job has been started if it
-                    # has a job id
-                    if  jobs[job].get ('job_id', None) is not None:
-                        # we only need to monitor jobs that are not in a
-                        # terminal state, so we can skip the ones that are 
-                        # either done, failed or canceled
-                        state = jobs[job]['state']
-                        if state not in [saga.job.DONE, saga.job.FAILED, saga.job.CANCELED]:
-
-                            job_info = self.js._job_get_info(job)
-                            self.logger.info("Job monitoring thread updating Job %s (state: %s)" % (job, job_info['state']))
-
-                            if job_info['state'] != state:
-                                # fire job state callback if 'state' has changed
-                                job._api()._attributes_i_set('state', job_info['state'], job._api()._UP, True)
-
-                            # update job info
-                            self.js.jobs[job] = job_info
+                # if the job hasn't been started, we can't update its
+                # state. we can tell if a job has been started if it
+                # has a job id.  We only need to monitor jobs that are
+                # not in a terminal state, so we can skip the ones that
+                # are either done, failed or canceled (or gone)
+                job_objs = [job for job in jobs.keys()
+                            if  jobs[job].get ('job_id', None) is not None
+                            and not jobs[job].get ('gone')
+                            and jobs[job]['state'] not in [saga.job.DONE,
+                                                           saga.job.FAILED,
+                                                           saga.job.CANCELED]]
+                pids     = [self.js._adaptor.parse_id(job._id)[1]
+                            for job in job_objs]
+
+                # one bjobs call for all jobs
+                results  = dict()
+                if pids:
+                    results = self.js._coalescer.get_many(pids)
+
+                for job, pid in zip(job_objs, pids):
+
+                    state    = jobs[job]['state']
+                    job_info = self.js._update_job_info(jobs[job], results.get(pid))
+                    self.logger.info("Job monitoring thread updating Job %s (state: %s)" % (job, job_info['state']))
+
+                    if job_info['state'] != state:
+                        # fire job state callback if 'state' has changed
+                        job._api()._attributes_i_set('state', job_info['state'], job._api()._UP, True)
+
+                    # update job info
+                    self.js.jobs[job] = job_info
 
                 time.sleep(MONITOR_UPDATE_INTERVAL)
             except Exception as e:
@@ -389,6 +400,10 @@ class LSFJobService (saga.adaptors.cpi.job.Service):
         self.shell   = None
         self.jobs    = dict()
 
+        # merges concurrent bjobs calls into one
+        self._coalescer = StateCoalescer(self._bulk_bjobs, self._parse_bulk_bjobs,
+                                         logger=self._logger)
+
         # the monitoring thread - one per service instance
         self.mt = _job_state_monitor(job_service=self)
         self.mt.start()
@@ -636,6 +651,28 @@ class LSFJobService (saga.adaptors.cpi.job.Service):
         if prev_info['gone'] is True:
             return prev_info
 
+        rm, pid = self._adaptor.parse_id(job_obj._id)
+
+        # run the LSF 'bjobs' command to get some infos about our job
+        # the result of bjobs <id> looks like this:
+        #  
+        # JOBID   USER    STAT  QUEUE      FROM_HOST   EXEC_HOST   JOB_NAME   SUBMIT_TIME
+        # 901545  oweidne DONE  regular    yslogin5-ib ys3833-ib   *FILENAME  Nov 11 12:06 
+        # 
+        # If we add the -nodeader flag, the first row is ommited 
+
+        #
+        # Concurrent queries for other jobs are merged into one bjobs call.
+        return self._update_job_info(prev_info, self._coalescer.get(pid))
+
+    # ----------------------------------------------------------------
+    #
+    def _update_job_info(self, prev_info, results):
+        """ derive new job info from the previous job info and the parsed
+            bjobs output columns for the job (None if bjobs did not report
+            the job)
+        """
+
         # curr. info will contain the new job info collect. it starts off
         # as a copy of prev_info (don't use deepcopy because there is an API 
         # object in the dict -> recursion)
@@ -649,44 +686,61 @@ class LSFJobService (saga.adaptors.cpi.job.Service):
         curr_info['end_time'   ] = prev_info.get ('end_time'   )
         curr_info['gone'       ] = prev_info.get ('gone'       )
 
-        rm, pid = self._adaptor.parse_id(job_obj._id)
+        if results is None:
+            # Let's see if the previous job state was running or pending. in
+            # that case, the job is gone now, which can either mean DONE,
+            # or FAILED. the only thing we can do is set it to 'DONE'
+            curr_info['gone'] = True
+            # we can also set the end time
+            self._logger.warning("Previously running job has disappeared. This probably means that the backend doesn't store informations about finished jobs. Setting state to 'DONE'.")
 
-        # run the LSF 'bjobs' command to get some infos about our job
-        # the result of bjobs <id> looks like this:
-        #  
-        # JOBID   USER    STAT  QUEUE      FROM_HOST   EXEC_HOST   JOB_NAME   SUBMIT_TIME
-        # 901545  oweidne DONE  regular    yslogin5-ib ys3833-ib   *FILENAME  Nov 11 12:06 
-        # 
-        # If we add the -nodeader flag, the first row is ommited 
-
-        ret, out, _ = self.shell.run_sync("%s -noheader %s" % (self._commands['bjobs']['path'], pid))
-
-        if ret != 0:
-            if ("Illegal job ID" in out):
-                # Let's see if the previous job state was running or pending. in
-                # that case, the job is gone now, which can either mean DONE,
-                # or FAILED. the only thing we can do is set it to 'DONE'
-                curr_info['gone'] = True
-                # we can also set the end time
-                self._logger.warning("Previously running job has disappeared. This probably means that the backend doesn't store informations about finished jobs. Setting state to 'DONE'.")
-
-                if prev_info['state'] in [saga.job.RUNNING, saga.job.PENDING]:
-                    curr_info['state'] = saga.job.DONE
-                else:
-                    curr_info['state'] = saga.job.FAILED
+            if prev_info['state'] in [saga.job.RUNNING, saga.job.PENDING]:
+                curr_info['state'] = saga.job.DONE
             else:
-                # something went wrong
-                message = "Error retrieving job info via 'bjobs': %s" % out
-                log_error_and_raise(message, saga.NoSuccess, self._logger)
+                curr_info['state'] = saga.job.FAILED
         else:
             # parse the result
-            results = out.split()
             curr_info['state'] = _lsf_to_saga_jobstate(results[2])
             curr_info['exec_hosts'] = results[5]
 
         # return the new job info dict
         return curr_info
 
+    # ----------------------------------------------------------------
+    #
+    def _bulk_bjobs(self, pids):
+        """ StateCoalescer query hook: run bjobs for a list of job ids
+        """
+
+        ret, out, _ = self.shell.run_sync("%s -noheader %s 2>&1"
+                                          % (self._commands['bjobs']['path'],
+                                             ' '.join(pids)))
+
+        # bjobs fails if any of the jobs is unknown, but still reports all
+        # others
+        if ret != 0 and "Illegal job ID" not in out \
+                    and "is not found"   not in out:
+            # something went wrong
+            message = "Error retrieving job info via 'bjobs': %s" % out
+            log_error_and_raise(message, saga.NoSuccess, self._logger)
+
+        return out
+
+    # ----------------------------------------------------------------
+    #
+    def _parse_bulk_bjobs(self, out, pids):
+        """ StateCoalescer parse hook: map job ids to their bjobs output
+            columns.  Unknown jobs are left out.
+        """
+
+        results = dict()
+        for line in out.split('\n'):
+            elems = line.split()
+            if len(elems) > 5 and elems[0] in pids:
+                results[elems[0]] = elems
+
+        return results
+
     # ----------------------------------------------------------------
     #
     def _job_get_state(self, job_obj):
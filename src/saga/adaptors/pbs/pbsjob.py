@@ -17,6 +17,7 @@ import saga.adaptors.base
 import saga.adaptors.cpi.job
 
 from saga.job.constants import *
+from saga.utils.job     import StateCoalescer
 
 import re
 import os 
@@ -59,30 +60,31 @@ class _job_state_monitor(threading.Thread):
         while not self._stop.is_set ():
 
             try:
-                # FIXME: do bulk updates here! we don't want to pull information
-                # job by job. that would be too inefficient!
-                jobs = self.js.jobs
+                # pull information for all jobs at once
+                jobs    = self.js.jobs
+                job_ids = [job_id for job_id in jobs.keys()
+                           if jobs[job_id]['state'] not in [saga.job.DONE,
+                                                            saga.job.FAILED,
+                                                            saga.job.CANCELED]]
+                pids    = [self.js._adaptor.parse_id(job_id)[1]
+                           for job_id in job_ids]
 
-                for job_id in jobs.keys() :
+                if pids:
+                    results = self.js._coalescer.get_many(pids)
 
-                    job_info = jobs[job_id]
+                for job_id, pid in zip(job_ids, pids):
 
-                    # we only need to monitor jobs that are not in a
-                    # terminal state, so we can skip the ones that are 
-                    # either done, failed or canceled
-                    if  job_info['state'] not in [saga.job.DONE, saga.job.FAILED, saga.job.CANCELED] :
+                    job_info  = jobs[job_id]
+                    old_state = job_info['state']
 
-                        new_job_info = self.js._job_get_info(job_id, reconnect=False)
-                        self.logger.info ("Job monitoring thread updating Job %s (state: %s)" \
-                                       % (job_id, new_job_info['state']))
+                    self.js._update_job_info(job_info, results.get(pid))
+                    self.logger.info ("Job monitoring thread updating Job %s (state: %s)" \
+                                   % (job_id, job_info['state']))
 
-                        # fire job state callback if 'state' has changed
-                        if  new_job_info['state'] != job_info['state']:
-                            job_obj = job_info['obj']
-                            job_obj._attributes_i_set('state', new_job_info['state'], job_obj._UP, True)
-
-                        # update job info
-                        jobs[job_id] = new_job_info
+                    # fire job state callback if 'state' has changed
+                    if  job_info['state'] != old_state:
+                        job_obj = job_info['obj']
+                        job_obj._attributes_i_set('state', job_info['state'], job_obj._UP, True)
 
             except Exception as e:
                 import traceback
@@ -507,6 +509,10 @@ class PBSJobService (saga.adaptors.cpi.job.Service):
         self.jobs    = dict()
         self.gres    = None
 
+        # merges concurrent qstat calls into one
+        self._coalescer = StateCoalescer(self._bulk_qstat, self._parse_bulk_qstat,
+                                         logger=self._logger)
+
         # the monitoring thread - one per service instance
         self.mt = _job_state_monitor(job_service=self)
         self.mt.start()
@@ -815,109 +821,166 @@ class PBSJobService (saga.adaptors.cpi.job.Service):
 
         rm, pid = self._adaptor.parse_id(job_id)
 
-        # run the PBS 'qstat' command to get some infos about our job
+        if reconnect:
+            results = self._parse_bulk_qstat(self._bulk_qstat([pid]), [pid])
+            if pid not in results:
+                message = "Couldn't reconnect to job '%s'" % job_id
+                log_error_and_raise(message, saga.NoSuccess, self._logger)
+            return self._update_job_info(job_info, results[pid])
+
+        # concurrent queries for other jobs are merged into one qstat call
+        return self._update_job_info(job_info, self._coalescer.get(pid))
+
+
+    # ----------------------------------------------------------------
+    #
+    def _bulk_qstat(self, pids):
+        """ StateCoalescer query hook: run qstat for a list of job ids
+        """
+
         # TODO: create a PBSPRO/TORQUE flag once
         if 'PBSPro_1' in self._commands['qstat']['version']:
             qstat_flag = '-fx'
         else:
             qstat_flag ='-f1'
-            
-        ret, out, _ = self.shell.run_sync("unset GREP_OPTIONS; %s %s %s | "
-                "grep -E -i '(job_state)|(exec_host)|(exit_status)|"
+
+        ret, out, _ = self.shell.run_sync("unset GREP_OPTIONS; %s %s %s 2>&1 | "
+                "grep -E -i '(Job Id)|(job_state)|(exec_host)|(exit_status)|"
                  "(ctime)|(start_time)|(stime)|(mtime)'"
-                % (self._commands['qstat']['path'], qstat_flag, pid))
+                % (self._commands['qstat']['path'], qstat_flag, ' '.join(pids)))
 
-        if ret != 0:
+        # qstat fails if any of the jobs is unknown -- but then we still get
+        # info about all others.  If we don't see any job, something else
+        # went wrong.
+        if ret != 0 and 'Job Id' not in out:
+            message = "Error retrieving job info via 'qstat': %s" % out
+            log_error_and_raise(message, saga.NoSuccess, self._logger)
 
-            if reconnect:
-                message = "Couldn't reconnect to job '%s': %s" % (job_id, out)
-                log_error_and_raise(message, saga.NoSuccess, self._logger)
+        return out
 
-            if ("Unknown Job Id" in out):
-                # Let's see if the last known job state was running or pending. in
-                # that case, the job is gone now, which can either mean DONE,
-                # or FAILED. the only thing we can do is set it to 'DONE'
-                job_info['gone'] = True
-                # TODO: we can also set the end time?
-                self._logger.warning("Previously running job has disappeared. "
-                        "This probably means that the backend doesn't store "
-                        "information about finished jobs. Setting state to 'DONE'.")
-
-                if job_info['state'] in [saga.job.RUNNING, saga.job.PENDING]:
-                    job_info['state'] = saga.job.DONE
-                else:
-                    # TODO: This is an uneducated guess?
-                    job_info['state'] = saga.job.FAILED
+
+    # ----------------------------------------------------------------
+    #
+    def _parse_bulk_qstat(self, out, pids):
+        """ StateCoalescer parse hook: split the qstat output into the output
+            lines for the individual jobs.  Unknown jobs are left out.
+        """
+
+        # qstat may report the job ids with a different (fully qualified)
+        # server name, so we match on the numerical part only
+        numbers = dict([(pid.split('.')[0], pid) for pid in pids])
+        results = dict()
+        current = None
+
+        for line in out.split('\n'):
+
+            if 'Unknown Job Id' in line:
+                current = None
+
+            elif 'Job Id:' in line:
+                number  = line.split(':', 1)[1].strip().split('.')[0]
+                current = numbers.get(number)
+                if current:
+                    results[current] = list()
+
+            elif current:
+                results[current].append(line)
+
+        return results
+
+
+    # ----------------------------------------------------------------
+    #
+    def _update_job_info(self, job_info, lines):
+        """ update a job info dict with the qstat output lines for that job.
+            If there are no lines, the job is considered gone.
+        """
+
+        if lines is None:
+
+            if job_info['gone']:
+                return job_info
+
+            # Let's see if the last known job state was running or pending. in
+            # that case, the job is gone now, which can either mean DONE,
+            # or FAILED. the only thing we can do is set it to 'DONE'
+            job_info['gone'] = True
+            # TODO: we can also set the end time?
+            self._logger.warning("Previously running job has disappeared. "
+                    "This probably means that the backend doesn't store "
+                    "information about finished jobs. Setting state to 'DONE'.")
+
+            if job_info['state'] in [saga.job.RUNNING, saga.job.PENDING]:
+                job_info['state'] = saga.job.DONE
             else:
-                # something went wrong
-                message = "Error retrieving job info via 'qstat': %s" % out
-                log_error_and_raise(message, saga.NoSuccess, self._logger)
-        else:
+                # TODO: This is an uneducated guess?
+                job_info['state'] = saga.job.FAILED
+
+            return job_info
+
+        # The job seems to exist on the backend. let's process some data.
+        return self._parse_qstat(lines, job_info)
 
-            # The job seems to exist on the backend. let's process some data.
-
-            # TODO: make the parsing "contextual", in the sense that it takes
-            #       the state into account.
-
-            # parse the egrep result. this should look something like this:
-            #     job_state = C
-            #     exec_host = i72/0
-            #     exit_status = 0
-            results = out.split('\n')
-            for line in results:
-                if len(line.split('=')) == 2:
-                    key, val = line.split('=')
-                    key = key.strip()
-                    val = val.strip()
-
-                    # The ubiquitous job state
-                    if key in ['job_state']: # PBS Pro and TORQUE
-                        job_info['state'] = _pbs_to_saga_jobstate(val)
-
-                    # Hosts where the job ran
-                    elif key in ['exec_host']: # PBS Pro and TORQUE
-                        job_info['exec_hosts'] = val.split('+')  # format i73/7+i73/6+...
-
-                    # Exit code of the job
-                    elif key in ['exit_status', # TORQUE
-                                 'Exit_status' # PBS Pro
-                                ]:
-                        job_info['returncode'] = int(val)
-
-                    # Time job got created in the queue
-                    elif key in ['ctime']: # PBS Pro and TORQUE
-                        job_info['create_time'] = val
-
-                    # Time job started to run
-                    elif key in ['start_time', # TORQUE
-                                 'stime'       # PBS Pro
-                                ]:
-                        job_info['start_time'] = val
-
-                    # Time job ended.
-                    #
-                    # PBS Pro doesn't have an "end time" field.
-                    # It has an "resources_used.walltime" though,
-                    # which could be added up to the start time.
-                    # We will not do that arithmetic now though.
-                    #
-                    # Alternatively, we can use mtime, as the latest
-                    # modification time will generally also be the end time.
-                    #
-                    # TORQUE has an "comp_time" (completion? time) field,
-                    # that is generally the same as mtime at the finish.
-                    #
-                    # For the time being we will use mtime as end time for
-                    # both TORQUE and PBS Pro.
-                    #
-                    if key in ['mtime']: # PBS Pro and TORQUE
-                        job_info['end_time'] = val
-
-        # return the updated job info
-        return job_info
 
+    # ----------------------------------------------------------------
+    #
     def _parse_qstat(self, haystack, job_info):
 
+        # TODO: make the parsing "contextual", in the sense that it takes
+        #       the state into account.
+
+        # parse the egrep result. this should look something like this:
+        #     job_state = C
+        #     exec_host = i72/0
+        #     exit_status = 0
+        for line in haystack:
+            if len(line.split('=')) == 2:
+                key, val = line.split('=')
+                key = key.strip()
+                val = val.strip()
+
+                # The ubiquitous job state
+                if key in ['job_state']: # PBS Pro and TORQUE
+                    job_info['state'] = _pbs_to_saga_jobstate(val)
+
+                # Hosts where the job ran
+                elif key in ['exec_host']: # PBS Pro and TORQUE
+                    job_info['exec_hosts'] = val.split('+')  # format i73/7+i73/6+...
+
+                # Exit code of the job
+                elif key in ['exit_status', # TORQUE
+                             'Exit_status' # PBS Pro
+                            ]:
+                    job_info['returncode'] = int(val)
+
+                # Time job got created in the queue
+                elif key in ['ctime']: # PBS Pro and TORQUE
+                    job_info['create_time'] = val
+
+                # Time job started to run
+                elif key in ['start_time', # TORQUE
+                             'stime'       # PBS Pro
+                            ]:
+                    job_info['start_time'] = val
+
+                # Time job ended.
+                #
+                # PBS Pro doesn't have an "end time" field.
+                # It has an "resources_used.walltime" though,
+                # which could be added up to the start time.
+                # We will not do that arithmetic now though.
+                #
+                # Alternatively, we can use mtime, as the latest
+                # modification time will generally also be the end time.
+                #
+                # TORQUE has an "comp_time" (completion? time) field,
+                # that is generally the same as mtime at the finish.
+                #
+                # For the time being we will use mtime as end time for
+                # both TORQUE and PBS Pro.
+                #
+                if key in ['mtime']: # PBS Pro and TORQUE
+                    job_info['end_time'] = val
 
         # return the new job info dict
         return job_info
@@ -26,7 +26,62 @@ ASYNC_CALL = saga.adaptors.cpi.decorators.ASYNC_CALL
 
 _ADAPTOR_NAME          = 'saga.adaptors.advert.redis'
 _ADAPTOR_SCHEMAS       = ['redis']
-_ADAPTOR_OPTIONS       = []
+_ADAPTOR_OPTIONS       = [
+    {
+    'category'         : _ADAPTOR_NAME,
+    'name'             : 'cache_ttl',
+    'type'             : float,
+    'default'          : 60.0,
+    'documentation'    : '''Lifetime (in seconds) of cached advert entries.
+                          The cache is kept coherent via the redis event
+                          channel, so entries changed by other clients are
+                          invalidated right away.  '0' disables caching.''',
+    'env_variable'     : 'SAGA_REDIS_CACHE_TTL'
+    },
+    {
+    'category'         : _ADAPTOR_NAME,
+    'name'             : 'cache_size',
+    'type'             : int,
+    'default'          : 10000,
+    'documentation'    : '''Maximum number of cached redis keys.  The least
+                          recently used keys are evicted first.''',
+    'env_variable'     : 'SAGA_REDIS_CACHE_SIZE'
+    },
+    {
+    'category'         : _ADAPTOR_NAME,
+    'name'             : 'cache_bytes',
+    'type'             : int,
+    'default'          : 64 * 1024 * 1024,
+    'documentation'    : '''Maximum (approximate) amount of cached data, in
+                          bytes.''',
+    'env_variable'     : 'SAGA_REDIS_CACHE_BYTES'
+    },
+    {
+    'category'         : _ADAPTOR_NAME,
+    'name'             : 'pool_size',
+    'type'             : int,
+    'default'          : 10,
+    'documentation'    : '''Maximum number of connections to a redis server.
+                          Threads wait for a free connection if all are
+                          busy.''',
+    'env_variable'     : 'SAGA_REDIS_POOL_SIZE'
+    },
+    {
+    'category'         : _ADAPTOR_NAME,
+    'name'             : 'expiry_events',
+    'type'             : bool,
+    'default'          : False,
+    'valid_options'    : [True, False],
+    'documentation'    : '''Enable keyspace events for expired keys on the
+                          redis server (CONFIG SET notify-keyspace-events).
+                          Those are needed to remove expired adverts from
+                          indexes.  The setting affects all clients of the
+                          server, so it is off by default -- the server can
+                          also be configured with 'notify-keyspace-events Ex'
+                          instead.''',
+    'env_variable'     : 'SAGA_REDIS_EXPIRY_EVENTS'
+    }
+]
 _ADAPTOR_CAPABILITIES  = {}
 
 _ADAPTOR_DOC           = {
@@ -76,6 +131,13 @@ class Adaptor (saga.adaptors.base.Base):
         self._bulk  = BulkDirectory ()
         self._redis = {}
 
+        self.opts      = self.get_config (_ADAPTOR_NAME)
+        self.cache_ttl   = self.opts['cache_ttl'  ].get_value ()
+        self.cache_size  = self.opts['cache_size' ].get_value ()
+        self.cache_bytes = self.opts['cache_bytes'].get_value ()
+        self.pool_size   = self.opts['pool_size'  ].get_value ()
+        self.expiry_events = self.opts['expiry_events'].get_value ()
+
 
     # ----------------------------------------------------------------
     #
@@ -103,7 +165,12 @@ class Adaptor (saga.adaptors.base.Base):
                 hash = "redis://%s:%d"        %  (                host, port)
        
         if not hash in self._redis :
-            self._redis[hash] = rns.redis_ns_server (url)
+            self._redis[hash] = rns.redis_ns_server (url,
+                                                     cache_ttl   = self.cache_ttl,
+                                                     cache_size  = self.cache_size,
+                                                     cache_bytes = self.cache_bytes,
+                                                     pool_size   = self.pool_size,
+                                                     expiry_events = self.expiry_events)
 
         return self._redis[hash]
 
@@ -247,6 +314,19 @@ class RedisDirectory (saga.adaptors.cpi.advert.Directory) :
             raise e
 
 
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def set_attributes (self, attrs) :
+
+        try :
+            self._nsdir.set_attributes (attrs)
+
+        except Exception as e :
+            self._logger.error ("set_attributes failed: %s" % e)
+            raise e
+
+
     # ----------------------------------------------------------------
     #
     @SYNC_CALL
@@ -274,6 +354,54 @@ class RedisDirectory (saga.adaptors.cpi.advert.Directory) :
         return self._url
 
 
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def batch (self) :
+
+        return self._r.batch ()
+
+
+    # ----------------------------------------------------------------
+    #
+    def _tgt_entry (self, tgt) :
+
+        url = sumisc.url_make_absolute (self._url, tgt)
+        return rns.redis_ns_entry.open (self._r, url.path, 0)
+
+
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def set_ttl_self (self, ttl) :
+
+        self._nsdir.set_ttl (ttl)
+
+
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def get_ttl_self (self) :
+
+        return self._nsdir.get_ttl ()
+
+
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def set_ttl (self, tgt, ttl) :
+
+        self._tgt_entry (tgt).set_ttl (ttl)
+
+
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def get_ttl (self, tgt) :
+
+        return self._tgt_entry (tgt).get_ttl ()
+
+
     # ----------------------------------------------------------------
     #
     @SYNC_CALL
@@ -305,29 +433,60 @@ class RedisDirectory (saga.adaptors.cpi.advert.Directory) :
 
         elif flags == saga.advert.RECURSIVE :
 
-            # ------------------------------------------------------------------
-            def get_kids (path) :
+            ret = self._nsdir.list_recursive ()
 
-                d    = saga.advert.Directory (path)
-                kids = d.list ()
 
-                for kid in kids :
+        else :
+            raise se.BadParameter ("list() only supports the RECURSIVE flag")
 
-                    kid_url      = self._url
-                    kid_url.path = kid
 
-                    if  d.is_dir (kid_url) :
-                        get_kids (kid_url)
+        return ret
 
-                    ret.append (kid)
-            # ------------------------------------------------------------------
 
-            get_kids (self._url)
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def find (self, npat, flags) :
 
+        return self.find_adverts (npat, None, None, flags)
 
-        else :
-            raise se.BadParameter ("list() only supports the RECURSIVE flag")
 
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def find_adverts (self, name_pattern, attr_pattern, obj_type, flags) :
+
+        if  obj_type :
+            raise se.BadParameter ("obj_type for find() not supported")
+
+        if  flags not in [0, saga.advert.RECURSIVE] :
+            raise se.BadParameter ("find() only supports the RECURSIVE flag")
+
+        # attribute patterns are given as 'key=val' (or just 'key'), separated
+        # by commas -- all of them must match
+        attrs = []
+        if  attr_pattern :
+            for term in attr_pattern.split (',') :
+                term = term.strip ()
+                if  not term :
+                    continue
+                if  '=' in term :
+                    key, val = term.split ('=', 1)
+                    attrs.append ([key.strip (), val.strip ()])
+                else :
+                    attrs.append ([term, None])
+
+        if  name_pattern == '*' :
+            name_pattern = None
+
+        paths = self._nsdir.find (name_pattern, attrs,
+                                  recursive=(flags == saga.advert.RECURSIVE))
+
+        ret = []
+        for path in paths :
+            url      = saga.url.Url (self._url)
+            url.path = path
+            ret.append (url)
 
         return ret
 
@@ -481,6 +640,14 @@ class RedisEntry (saga.adaptors.cpi.advert.Entry) :
         return self._nsentry.set_key (key, val)
 
 
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def set_attributes (self, attrs) :
+
+        return self._nsentry.set_attributes (attrs)
+
+
     # ----------------------------------------------------------------
     #
     @SYNC_CALL
@@ -500,6 +667,22 @@ class RedisEntry (saga.adaptors.cpi.advert.Entry) :
         return self._nsentry.manage_callback (key, id, cb, self.get_api ())
 
 
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def set_ttl (self, ttl) :
+
+        self._nsentry.set_ttl (ttl)
+
+
+    # ----------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def get_ttl (self) :
+
+        return self._nsentry.get_ttl ()
+
+
     # ----------------------------------------------------------------
     #
     @SYNC_CALL
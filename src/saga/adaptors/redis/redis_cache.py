@@ -1,27 +1,84 @@
-
 __author__    = "Andre Merzky"
 __copyright__ = "Copyright 2012-2013, The SAGA Project"
 __license__   = "MIT"
 
 
 import time
-
+import weakref
 import threading
-import redis_ordered_dict    as rod
+import collections
+
+CACHE_DEFAULT_SIZE  = 10000
+CACHE_DEFAULT_BYTES = 64 * 1024 * 1024
+CACHE_DEFAULT_TTL   = 1.0    # 1 second
+CACHE_PURGE_DELAY   = 1.0    # check for expired entries every second
+
+# fields of a cache entry (a linked list node)
+PREV = 0
+NEXT = 1
+KEY  = 2
+VAL  = 3
+TTL  = 4
+SIZE = 5
+
+
+# --------------------------------------------------------------------
+#
+def _sizeof (value) :
+    """
+    A rough estimate of the memory used by a cached value -- we cache strings,
+    and dicts, sets and lists of strings.
+    """
+
+    if isinstance (value, basestring) :
+        return len (value)
+
+    if isinstance (value, dict) :
+        return sum ([len (str(k)) + len (str(v)) for k, v in value.iteritems ()])
+
+    if isinstance (value, (set, list, tuple)) :
+        return sum ([len (str(v)) for v in value])
+
+    return len (str(value))
+
+
+# --------------------------------------------------------------------
+#
+def _purge (ref) :
+    """
+    Background thread which removes expired cache entries.  It only holds
+    a weak reference to the cache, and ends when the cache is gone.
+    """
+
+    while True :
+
+        cache = ref ()
+        if not cache :
+            return
+
+        cache.purge ()
+        delay = cache.purge_delay
+        del (cache)
 
-CACHE_DEFAULT_SIZE = 10000
-CACHE_DEFAULT_TTL  = 1.0    # 1 second
+        time.sleep (delay)
 
-VAL = 'val'
-TTL = 'ttl'
 
 ######################################################################
 #
 class Cache :
+    """
+    A least-recently-used cache with time-to-live for its entries.  Entries
+    are kept in a doubly linked list (most recently used at the tail), and in
+    a dict which maps keys to list nodes, so that lookups, promotions and
+    evictions are O(1).  The cache holds at most `size` entries and (roughly)
+    `max_bytes` bytes of data.  Expired entries are purged by a background
+    thread.
+    """
 
     # ----------------------------------------------------------------
     #
-    def __init__ (self, logger, size=CACHE_DEFAULT_SIZE, ttl=CACHE_DEFAULT_TTL) :
+    def __init__ (self, logger, size=CACHE_DEFAULT_SIZE, ttl=CACHE_DEFAULT_TTL,
+                  max_bytes=CACHE_DEFAULT_BYTES) :
 
         if int (size) < 1 :
             raise AttributeError ('size < 1 or not a number')
@@ -29,28 +86,83 @@ class Cache :
         if int (ttl) < 0 :
             raise AttributeError ('ttl < 0 or not a number')
 
-        self.size   = size
-        self.ttl    = ttl
-        self.dict   = rod.OrderedDict ()
-        self.lock   = threading.RLock ()
-        self.logger = logger
-        self.hit    = 0
-        self.miss   = 0
+        if int (max_bytes) < 1 :
+            raise AttributeError ('max_bytes < 1 or not a number')
 
-        # start a thread which, with low priority, cleans out the dict now and
-        # then (pops items until a live one is found
+        self.size        = size
+        self.max_bytes   = max_bytes
+        self.ttl         = ttl
+        self.lock        = threading.RLock ()
+        self.logger      = logger
+
+        self.dict        = dict ()
+        self.root        = [None, None, None, None, None, 0]  # list sentinel
+        self.root[PREV]  = self.root
+        self.root[NEXT]  = self.root
+        self.bytes       = 0
+
+        # nodes in order of expiry (as the ttl is the same for all entries,
+        # that is the order in which they were set)
+        self.expiry      = collections.deque ()
+
+        self.hit         = 0
+        self.miss        = 0
+        self.evicted     = 0
+        self.expired     = 0
+
+        # the epoch is increased on every invalidation.  Values fetched from the
+        # backend are only cached if no invalidation happened while they were
+        # fetched -- see set().
+        self.epoch       = 0
+
+        # a thread which, now and then, cleans out expired entries
+        self.purge_delay = CACHE_PURGE_DELAY
+        self.purger      = threading.Thread (target=_purge,
+                                             args=[weakref.ref (self)])
+        self.purger.setDaemon (True)
+        self.purger.start ()
+
+
+    # ----------------------------------------------------------------
+    #
+    def _unlink (self, node) :
+
+        node[PREV][NEXT] = node[NEXT]
+        node[NEXT][PREV] = node[PREV]
+
+
+    # ----------------------------------------------------------------
+    #
+    def _append (self, node) :
+
+        last       = self.root[PREV]
+        node[PREV] = last
+        node[NEXT] = self.root
+        last[NEXT] = node
+        self.root[PREV] = node
 
 
     # ----------------------------------------------------------------
     #
-    def _dump (self) :
-        print " ---------------------------------------------- "
-        print " CACHE STATISTICS : "
-        print " size: %5d" % len(self.dict)
-        print " hit : %5d" % self.hit 
-        print " miss: %5d" % self.miss
-        print self.dict.keys()
-        print " ---------------------------------------------- "
+    def _remove (self, node) :
+
+        self._unlink (node)
+        del (self.dict[node[KEY]])
+        self.bytes -= node[SIZE]
+        node[VAL]   = None    # the expiry queue may still refer to the node
+
+
+    # ----------------------------------------------------------------
+    #
+    def get_metrics (self) :
+
+        with self.lock :
+            return {'entries'   : len (self.dict),
+                    'bytes'     : self.bytes,
+                    'hits'      : self.hit,
+                    'misses'    : self.miss,
+                    'evictions' : self.evicted,
+                    'expired'   : self.expired}
 
 
     # ----------------------------------------------------------------
@@ -62,19 +174,22 @@ class Cache :
         with self.lock:
 
             # check if we have a live entry
-            if key in self.dict :
+            node = self.dict.get (key)
 
-                now = time.time ()
+            if node :
 
-                if self.ttl and self.dict[key][TTL] > now :
-                    # if yes, cache hit!
+                if self.ttl and node[TTL] > time.time () :
+                    # if yes, cache hit!  Mark as most recently used, and
                     # return data -- doh!
+                    self._unlink (node)
+                    self._append (node)
                     self.hit += 1
-                    return self.dict[key][VAL]
+                    return node[VAL]
 
                 else :
                     # entry timed out
-                    del self.dict[key]
+                    self._remove (node)
+                    self.expired += 1
 
             # cache entry not found, or timed out
             self.miss += 1
@@ -83,17 +198,30 @@ class Cache :
 
     # ----------------------------------------------------------------
     #
-    def set (self, key, value) :
+    def set (self, key, value, epoch=None) :
 
         with self.lock :
 
-            # remove superfluous(?) entries
-            while len (self.dict) >= self.size :
-                self.dict.popitem (last=False)
+            # some entry got invalidated since the value was fetched -- the
+            # value may thus be stale, and is not cached
+            if epoch is not None and epoch != self.epoch :
+                return
+
+            if key in self.dict :
+                self._remove (self.dict[key])
+
+            node = [None, None, key, value, time.time () + self.ttl, _sizeof (value)]
 
-            self.dict[key]      = {}
-            self.dict[key][VAL] = value
-            self.dict[key][TTL] = time.time () + self.ttl
+            self._append (node)
+            self.dict[key] = node
+            self.bytes    += node[SIZE]
+            self.expiry.append (node)
+
+            # evict least recently used entries
+            while len (self.dict) > self.size or \
+                  (self.bytes > self.max_bytes and len (self.dict) > 1) :
+                self._remove (self.root[NEXT])
+                self.evicted += 1
 
 
     # ----------------------------------------------------------------
@@ -101,11 +229,56 @@ class Cache :
     def delete (self, key) :
 
         with self.lock :
-            del self.dict[key]
+            self._remove (self.dict[key])
+
+
+    # ----------------------------------------------------------------
+    #
+    def invalidate (self, key) :
+
+        with self.lock :
+            self.epoch += 1
+            if key in self.dict :
+                self._remove (self.dict[key])
+
+
+    # ----------------------------------------------------------------
+    #
+    def clear (self) :
+
+        with self.lock :
+            self.epoch      += 1
+            self.dict        = dict ()
+            self.root[PREV]  = self.root
+            self.root[NEXT]  = self.root
+            self.bytes       = 0
+            self.expiry      = collections.deque ()
 
 
     # ----------------------------------------------------------------
+    #
+    def purge (self) :
+        """
+        Remove all expired entries.  This only touches expired nodes: nodes
+        which have been replaced or removed meanwhile are skipped.
+        """
+
+        now = time.time ()
+
+        with self.lock :
 
+            while self.expiry :
 
+                node = self.expiry[0]
+                if self.ttl and node[TTL] > now :
+                    break
 
+                self.expiry.popleft ()
+
+                if self.dict.get (node[KEY]) is node :
+                    self._remove (node)
+                    self.expired += 1
+
+
+    # ----------------------------------------------------------------
 
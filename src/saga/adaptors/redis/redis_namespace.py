@@ -34,6 +34,9 @@ The redis key layout is like the following::
     /vals:/etc/passwd:val_1  : [/keys/etc/passwd, ...]
     /vals:/etc/passwd:val_2  : [/keys/etc/passwd, ...]
 
+    # the index sets an entry is listed in (for cleanup on expiry)
+    /idx:/etc/passwd         : [keys:key_1, vals:val_1, ...]
+
 all wildcard lookup versions will be slow -- only solution (iiuc) would be to
 blow the indexes to cover for wildcard expansion - which is always incomplete
 anyway...
@@ -47,10 +50,12 @@ TODO:
 
 """
 
-import re
 import os
 import time
+import json
 import string
+import fnmatch
+import threading
 import redis
 
 import radical.utils         as ru
@@ -77,9 +82,13 @@ DATA   = 'data'
 KIDS   = 'kids'
 KEYS   = 'keys'
 VALS   = 'vals'
+IDX    = 'idx'
 
 MON    = 'saga-advert-events'
 
+POOL_DEFAULT_SIZE = 10
+EXP    = '__keyevent@%d__:expired'   # keyspace notifications for expired keys
+
 # --------------------------------------------------------------------
 #
 # for some reason, POSIX allows two leading slashes, but we need path names to
@@ -93,9 +102,48 @@ def redis_ns_name (path) :
     return os.path.split (path)[1]
 
 
+# --------------------------------------------------------------------
+#
+def _is_glob (pattern) :
+
+    for c in '*?[' :
+        if c in pattern :
+            return True
+
+    return False
+
+
+def _attrs_match (data, attrs) :
+    """
+    check if the attribute dict matches all given [key, val] patterns
+    """
+
+    for key, val in attrs :
+
+        keys = [k for k in data if fnmatch.fnmatchcase (k, key)]
+
+        if  val is not None :
+            keys = [k for k in keys if fnmatch.fnmatchcase (str(data[k]), val)]
+
+        if  not keys :
+            return False
+
+    return True
+
+
 # --------------------------------------------------------------------
 #
 class redis_ns_monitor (ru.Thread) :
+    """
+    Watches the subscribed event channels:
+
+      - the global MON channel carries 'EVENT path [args]' notifications about
+        all changes, and is used to keep the cache coherent (it is only
+        subscribed to if caching is enabled);
+      - the per-path channels (MON:<path>) carry the attribute updates of that
+        path, and are only subscribed to for paths with registered callbacks;
+      - the keyspace notification channel reports expired entries.
+    """
 
     # ----------------------------------------------------------------
     #
@@ -105,9 +153,6 @@ class redis_ns_monitor (ru.Thread) :
         self.pub    = pub
         self.logger = r.logger
 
-        self.pat = {}
-        self.pat['ATTRIBUTE'] = re.compile ('\s*\[(?P<key>[^=]+)=(?P<val>.+)]\s*')
-
         rut.Thread.__init__ (self, self.work)
         self.setDaemon (True)
 
@@ -118,69 +163,104 @@ class redis_ns_monitor (ru.Thread) :
 
         try :
         
-            callbacks = self.r.callbacks
-            sub       = self.pub.listen ()
+            sub = self.pub.listen ()
 
             while sub :
 
-                info = sub.next ()
-                data = info['data']
+                info    = sub.next ()
+                data    = info['data']
+                channel = info['channel']
 
                 if not type (data) == type ("") :
                     self.logger.warn ("ignoring event : %s"  %  data)
                     continue
 
-                # FIXME: need proper regex parsing
-                elems = data.split ()
+                # an entry expired: clean up what redis did not expire itself
+                if channel == self.r.expired :
+                    if data.startswith (NODE+':') :
+                        self.r.remove_expired (data[len(NODE)+1:])
+                    continue
+
+                # attribute updates for a path we have callbacks for
+                if channel.startswith (MON+':') :
+                    self._notify (channel[len(MON)+1:], data)
+                    continue
+
+                # events are formatted like 'EVENT path [args]', where args
+                # may contain white space
+                elems = data.split (None, 2)
                 if not len (elems) == 3 :
                     self.logger.warn ("ignoring event args : %s"  %  data)
                     continue
 
-
                 self.logger.debug ("sub %s"  %  data)
                 event = elems[0]
                 path  = elems[1]
-                args  = elems[2:]
 
-                if path in callbacks :
-                    
-                    if event == 'ATTRIBUTE' :
+                # all writers publish their changes -- so we can keep the
+                # cache coherent by invalidating exactly the changed entries
+                if event == 'ATTRIBUTE' :
+                    self.r.cache.invalidate (NODE+':'+path)
+                    self.r.cache.invalidate (DATA+':'+path)
 
-                        for arg in args :
-                            
-                            # args are formatted like '[key=val]'
-                            match = self.pat[event].match (string.join (args, ' '))
+                elif event == 'CREATE' :
+                    # path is the parent dir
+                    self.r.cache.invalidate (KIDS+':'+path)
 
-                            if  not match :
-                                self.logger.warn ("event parse error for %s" % args)
-                                continue
+                elif event == 'REMOVE' :
+                    self.r.cache.invalidate (NODE+':'+path)
+                    self.r.cache.invalidate (DATA+':'+path)
+                    self.r.cache.invalidate (KIDS+':'+path)
+                    self.r.cache.invalidate (KIDS+':'+redis_ns_parent (path))
 
-                            # FIXME: error check
-                            key     = match.group ('key')
-                            val     = match.group ('val')
+                else :
+                    self.logger.warn ("unknown event type %s" % event)
 
-                            if key in callbacks[path] :
-                                for idx in callbacks[path][key] :
+        except Exception as e :
+            self.logger.critical ("redis monitoring thread crashed - disable callback handling (%s)" % str(e))
 
-                                    cb  = callbacks[path][key][idx][0]
-                                    obj = callbacks[path][key][idx][1]
+            # without invalidation events, the cache cannot be trusted anymore
+            self.r.cache.ttl = 0
+            self.r.cache.clear ()
+            return
 
-                                    obj.set_attribute (key, val, obj._UP)
 
-                    if event == 'ATTRIBUTES' :
-                        self.logger.warn ("unknown event type %s" % event)
-                        pass
+    # ----------------------------------------------------------------
+    #
+    def _notify (self, path, data) :
+        """
+        Attribute updates are published as a json dict of all updated
+        attributes.  Push the new values to the API objects which have
+        callbacks registered for them.
+        """
 
-        except Exception as e :
-            self.logger.critical ("redis monitoring thread crashed - disable callback handling (%s)") % str(e)
+        try :
+            attrs = json.loads (data)
+        except ValueError :
+            self.logger.warn ("event parse error for %s: %s" % (path, data))
             return
 
+        # don't call into the API objects while holding the lock
+        todo = []
+        with self.r.cb_lock :
+            callbacks = self.r.callbacks.get (path, {})
+            for key, val in attrs.iteritems () :
+                for cb, obj in callbacks.get (key, {}).values () :
+                    todo.append ([obj, key, val])
+
+        for obj, key, val in todo :
+            obj.set_attribute (key, val, obj._UP)
+
 
 # --------------------------------------------------------------------
 #
 class redis_ns_server (redis.Redis) :
 
-    def __init__ (self, url) :
+    def __init__ (self, url, cache_ttl=redis_cache.CACHE_DEFAULT_TTL,
+                             cache_size=redis_cache.CACHE_DEFAULT_SIZE,
+                             cache_bytes=redis_cache.CACHE_DEFAULT_BYTES,
+                             pool_size=POOL_DEFAULT_SIZE,
+                             expiry_events=False) :
 
         if url.scheme != 'redis' :
             raise BadParameter ("scheme in url is not supported (%s != redis://...)" %  url)
@@ -197,22 +277,31 @@ class redis_ns_server (redis.Redis) :
         if url.username : self.username = url.username
         if url.password : self.password = url.password
 
-        # create redis client 
-        t1 = time.time ()
-        redis.Redis.__init__   (self, 
-                                host      = self.host,
-                                port      = self.port,
-                                db        = self.db,
-                                password  = self.password,
-                                 errors    = self.errors)
-        t2 = time.time ()
+        # create redis client.  All entries of this server share it, and
+        # concurrent threads get their own connections from the pool (and
+        # wait for one if all `pool_size` connections are busy).
+        self.pool = redis.BlockingConnectionPool (
+                                max_connections = pool_size,
+                                host            = self.host,
+                                port            = self.port,
+                                db              = self.db,
+                                password        = self.password,
+                                encoding_errors = self.errors)
+        redis.Redis.__init__   (self, connection_pool=self.pool)
+
+        # batches are per thread
+        self._local = threading.local ()
 
         # add a logger 
         self.logger = ru.Logger('radical.saga')
 
-        # create a cache dict and attach to redis client instance.  Cache
-        # lifetime is set to 10 times the redis-connect latency.
-        self.cache = redis_cache.Cache (logger=self.logger, ttl=((t2-t1)*10))
+        # create a cache dict and attach to redis client instance.  The cache
+        # is kept coherent by the monitor thread, which invalidates entries
+        # changed by any client -- so the cache lifetime can be long.
+        self.cache = redis_cache.Cache (logger    = self.logger,
+                                        ttl       = cache_ttl,
+                                        size      = cache_size,
+                                        max_bytes = cache_bytes)
 
         # create a second client to manage the (blocking) 
         # pubsub communication for event notifications
@@ -222,12 +311,25 @@ class redis_ns_server (redis.Redis) :
                                 password  = self.password,
                                 errors    = self.errors)
 
-        # set up pubsub endpoint, and start a thread to monitor channels
+        # entry TTLs are mapped to key expiry -- we need to learn about expired
+        # entries to clean up the indexes they are listed in.  The server
+        # config is shared with other applications, so we only change it if
+        # asked to.
+        self._check_expiry_events (expiry_events)
+        self.expired = EXP % self.db
+
+        # set up pubsub endpoint, and start a thread to monitor channels.  The
+        # global event channel is only needed to keep the cache coherent --
+        # attribute updates for callbacks are received on per-path channels,
+        # which are subscribed to as callbacks get registered.
         self.callbacks = {}
+        self.cb_lock   = threading.RLock ()
+        self.channels  = [self.expired]
+        if cache_ttl :
+            self.channels.append (MON)
+
         self.pub = self.r2.pubsub ()
-        self.pub.subscribe (MON)
-        # FIXME: create one pubsub channel per path (for paths which have
-        #        callbacks registered)
+        self.pub.subscribe (*self.channels)
 
         self.monitor = redis_ns_monitor (self, self.pub)
         self.monitor.start ()
@@ -237,7 +339,240 @@ class redis_ns_server (redis.Redis) :
     def __del__ (self) :
 
         if self.pub :
-            self.pub.unsubscribe (MON)
+            self.pub.unsubscribe (*self.channels)
+
+
+    # ----------------------------------------------------------------
+    #
+    def batch (self) :
+        """
+        Returns a context manager which groups the operations of all entries
+        in the calling thread into a single pipeline -- see redis_ns_batch.
+        """
+
+        return redis_ns_batch (self)
+
+
+    # ----------------------------------------------------------------
+    #
+    def get_batch (self) :
+
+        return getattr (self._local, 'batch', None)
+
+
+    # ----------------------------------------------------------------
+    #
+    def subscribe_path (self, path) :
+
+        self.logger.debug ("redis_ns_server.subscribe %s" % path)
+        self.pub.subscribe (MON+':'+path)
+
+
+    # ----------------------------------------------------------------
+    #
+    def unsubscribe_path (self, path) :
+
+        self.logger.debug ("redis_ns_server.unsubscribe %s" % path)
+        self.pub.unsubscribe (MON+':'+path)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _check_expiry_events (self, enable) :
+        """
+        Check if the server publishes keyspace events for expired keys
+        (notify-keyspace-events needs to contain 'E' and 'x', or 'A'), and
+        if `enable` is set, change the server config accordingly.
+        """
+
+        if not enable :
+            self.logger.info ("expired adverts are only removed from indexes "
+                              "if the redis server publishes expiry events "
+                              "(notify-keyspace-events 'Ex')")
+
+        try :
+            cfg   = self.config_get ('notify-keyspace-events')
+            flags = cfg.get ('notify-keyspace-events', '')
+
+            new = flags
+            if 'E' not in new                     : new += 'E'
+            if 'x' not in new and 'A' not in new  : new += 'x'
+
+            if new == flags :
+                return
+
+            if enable :
+                self.config_set ('notify-keyspace-events', new)
+            else :
+                self.logger.warn ("redis server does not publish expiry "
+                                  "events -- expired adverts will not be "
+                                  "removed from indexes")
+
+        except redis.ResponseError as e :
+            self.logger.warn ("cannot check expiry events -- expired adverts "
+                              "may not be removed from indexes (%s)" % e)
+
+
+    # ----------------------------------------------------------------
+    #
+    def remove_expired (self, path, force=False) :
+        """
+        Remove the remains of an expired entry: its data, its index entries,
+        its listing in the parent dir, and, for directories, all entries below
+        it.  All clients receive the expiry event, so this may run
+        concurrently -- but all operations are idempotent.  Unless `force` is
+        set, nothing is done if the entry has been recreated meanwhile.
+        """
+
+        self.logger.debug ("redis_ns_server.remove_expired %s" % path)
+
+        p = self.pipeline (transaction=False)
+        p.exists   (NODE+':'+path)
+        p.smembers (IDX +':'+path)
+        p.smembers (KIDS+':'+path)
+        exists, idx, kids = p.execute ()
+
+        if exists and not force :
+            return
+
+        for kid in kids :
+            self.remove_expired (kid, force=True)
+
+        p = self.pipeline ()
+        for name in idx :
+            p.srem (name, path)
+
+        if path != '/' :
+            p.srem (KIDS+':'+redis_ns_parent (path), path)
+
+        p.delete (NODE+':'+path, DATA+':'+path, KIDS+':'+path, IDX+':'+path)
+        p.execute ()
+
+        self.cache.invalidate (NODE+':'+path)
+        self.cache.invalidate (DATA+':'+path)
+        self.cache.invalidate (KIDS+':'+path)
+        self.cache.invalidate (KIDS+':'+redis_ns_parent (path))
+
+        # entries below an expired dir are deleted, not expired, so others
+        # need to be told
+        if force :
+            self.publish (MON, "REMOVE %s [%s]" % (path, redis_ns_name (path)))
+
+
+# --------------------------------------------------------------------
+#
+class redis_ns_batch (object) :
+    """
+    Within a batch context, attribute updates of all entries are queued in
+    a single pipeline, which is sent when the context is left::
+
+        with server.batch () as b :
+            b.prefetch (entries)              # one round trip for all reads
+            for e in entries :
+                e.set_key ('state', 'done')   # queued
+                                              # one round trip for all writes
+
+    Reads which miss the cache flush the pipeline, so they see the updates
+    queued before them, and travel in the same round trip.  Batches nest --
+    only the outermost one sends the pipeline.
+    """
+
+    # ----------------------------------------------------------------
+    #
+    def __init__ (self, r) :
+
+        self.r     = r
+        self.pipe  = None
+        self.hooks = []
+        self.outer = None
+
+
+    # ----------------------------------------------------------------
+    #
+    def __enter__ (self) :
+
+        self.outer = self.r.get_batch ()
+
+        if self.outer :
+            # nested batch: use the outer one
+            return self.outer
+
+        self.pipe = self.r.pipeline ()
+        self.r._local.batch = self
+        return self
+
+
+    # ----------------------------------------------------------------
+    #
+    def __exit__ (self, exc_type, exc_value, traceback) :
+
+        if self.outer :
+            return False
+
+        self.r._local.batch = None
+
+        if exc_type :
+            # don't send half of the updates.  The entries have already seen
+            # them though, so the cached state cannot be trusted anymore.
+            self.pipe.reset ()
+            self.hooks = []
+            self.r.cache.clear ()
+            return False
+
+        self.flush ()
+        return False
+
+
+    # ----------------------------------------------------------------
+    #
+    def on_flush (self, hook) :
+
+        self.hooks.append (hook)
+
+
+    # ----------------------------------------------------------------
+    #
+    def flush (self) :
+        """
+        Send all queued operations, and return their results.
+        """
+
+        hooks      = self.hooks
+        self.hooks = []
+
+        if not len (self.pipe) :
+            return []
+
+        ret = self.pipe.execute ()
+
+        for hook in hooks :
+            hook ()
+
+        return ret
+
+
+    # ----------------------------------------------------------------
+    #
+    def prefetch (self, entries) :
+        """
+        Refresh the state of all given entries which are not cached, in one
+        round trip.
+        """
+
+        epoch   = self.r.cache.epoch
+        missing = [e for e in entries if not e._fetch_cached ()]
+
+        if not missing :
+            return
+
+        n = len (self.pipe)
+        for e in missing :
+            e._fetch_ops (self.pipe)
+
+        values = self.flush ()[n:]
+
+        for i, e in enumerate (missing) :
+            e._fetch_done (values[3*i:3*i+3], epoch)
 
 
 # --------------------------------------------------------------------
@@ -432,6 +767,7 @@ class redis_ns_entry :
             val = self.data[key]
             p.sadd (KEYS+':'+str(key), path)
             p.sadd (VALS+':'+str(val), path)
+            p.sadd (IDX +':'+path, KEYS+':'+str(key), VALS+':'+str(val))
     
     
         # FIXME: eval vals
@@ -479,12 +815,177 @@ class redis_ns_entry :
         return self.kids
 
 
+    # ----------------------------------------------------------------
+    #
+    def list_recursive (self) :
+        """
+        List all entries below this directory.  The tree is traversed level by
+        level, with one pipelined round trip per level: the kids of all nodes
+        on a level are fetched via SMEMBERS (the KIDS set of non-dir entries is
+        simply empty).
+        """
+
+        if  not self.node[TYPE] == DIR :
+            raise IncorrectState ("'list()' is only supported on directories")
+
+        self.logger.debug ("redis_ns_entry.list_recursive %s" % self.path)
+
+        ret   = []
+        seen  = set ([self.path])
+        level = [self.path]
+
+        while level :
+
+            p = self.r.pipeline (transaction=False)
+            for path in level :
+                p.smembers (KIDS+':'+path)
+
+            level = []
+            for kids in p.execute () :
+                for kid in kids :
+                    if  kid not in seen :
+                        seen.add   (kid)
+                        ret.append (kid)
+                        level.append (kid)
+
+        return ret
+
+
+    # ----------------------------------------------------------------
+    #
+    def _index_sets (self, index, pattern) :
+        """
+        Return the names of the index sets matching the given pattern -- for
+        wildcard patterns, the matching index sets are looked up on the
+        server.
+        """
+
+        if  not _is_glob (pattern) :
+            return [index+':'+pattern]
+
+        return list (self.r.scan_iter (match=index+':'+pattern))
+
+
+    # ----------------------------------------------------------------
+    #
+    def find (self, name_pattern=None, attrs=None, recursive=False) :
+        """
+        Find entries below this directory whose names match `name_pattern`,
+        and which have attributes matching all of the `attrs` patterns, given
+        as a list of `[key, val]` pairs (`val` may be `None` if the key only
+        needs to exist).  Names, keys and values can contain shell wildcards.
+
+        Attribute queries are answered from the KEYS: and VALS: indexes:
+        the candidate set is computed server side (SINTER for exact terms,
+        SUNION over the matching index sets for wildcard terms), and only the
+        candidates' data are fetched for verification.  Without attribute
+        patterns, the KIDS: sets are searched.
+        """
+
+        if  not self.node[TYPE] == DIR :
+            raise IncorrectState ("'find()' is only supported on directories")
+
+        self.logger.debug ("redis_ns_entry.find %s: %s %s" \
+                        % (self.path, name_pattern, attrs))
+
+        if  attrs :
+
+            exact  = []   # index sets to intersect
+            groups = []   # index sets to unite, per wildcard term
+
+            for key, val in attrs :
+                for index, pattern in [[KEYS, key], [VALS, val]] :
+                    if  pattern is None :
+                        continue
+                    if  _is_glob (pattern) :
+                        groups.append (self._index_sets (index, pattern))
+                    else :
+                        exact.append  (index+':'+pattern)
+
+            # a wildcard term without any matching index set has no matches
+            if  [] in groups :
+                return []
+
+            p = self.r.pipeline (transaction=False)
+            if  exact  : p.sinter (exact)
+            for group in groups :
+                p.sunion (group)
+
+            sets  = p.execute ()
+            found = set (sets[0])
+            for s in sets[1:] :
+                found &= s
+
+            # only keep candidates in the searched part of the tree
+            if  recursive :
+                prefix = self.path.rstrip ('/') + '/'
+                found  = [path for path in found if path.startswith (prefix)]
+            else :
+                found  = [path for path in found
+                               if redis_ns_parent (path) == self.path]
+
+            # the VALS: index does not know what key a value belongs to, and
+            # index entries may be stale -- so check the candidates' data
+            p = self.r.pipeline (transaction=False)
+            for path in found :
+                p.hgetall (DATA+':'+path)
+
+            ret = []
+            for path, data in zip (found, p.execute ()) :
+                if  _attrs_match (data, attrs) :
+                    ret.append (path)
+
+        elif recursive :
+            ret = self.list_recursive ()
+
+        else :
+            ret = list (self.list ())
+
+        if  name_pattern :
+            ret = [path for path in ret
+                        if fnmatch.fnmatchcase (redis_ns_name (path), name_pattern)]
+
+        return sorted (ret)
+
+
     # ----------------------------------------------------------------
     #
     def fetch (self) :
 
         self.logger.debug ("redis_ns_entry.fetch %s" % self.path)
 
+        if self._fetch_cached () :
+            return
+
+        # some cache ops failed, so we need to properly fetch data.  We simply
+        # fetch all of it.  Values are only cached if no invalidation arrives
+        # meanwhile.
+        epoch = self.cache.epoch
+        batch = self.r.get_batch ()
+
+        try :
+            if batch :
+                # this flushes all operations queued in the batch so far
+                n = len (batch.pipe)
+                self._fetch_ops (batch.pipe)
+                values = batch.flush ()[n:]
+
+            else :
+                p = self.r.pipeline ()
+                self._fetch_ops (p)
+                values = p.execute ()
+
+        except Exception as e :
+            self.valid = False
+            raise IncorrectState ("backend entry is gone or corrupted: %s" % str(e))
+
+        self._fetch_done (values, epoch)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _fetch_cached (self) :
+
         path = self.path
 
         try :
@@ -495,48 +996,47 @@ class redis_ns_entry :
                 self.kids = self.cache.get (KIDS+':'+path)
 
             self.valid = True
-            return
+            return True
 
         except Exception :
-            # some cache ops failed, so we need to properly fetch data.  We simply
-            # fetch all of it
-            pass
+            return False
 
 
-        try :
-            p = self.r.pipeline ()
-            p.hgetall  (NODE+':'+path)
-            p.hgetall  (DATA+':'+path)
-            p.smembers (KIDS+':'+path)
-            values = p.execute ()
-        
-            if len (values) != 3 :
-                self.valid = False
-                return
+    # ----------------------------------------------------------------
+    #
+    def _fetch_ops (self, p) :
 
-            self.valid = True
+        p.hgetall  (NODE+':'+self.path)
+        p.hgetall  (DATA+':'+self.path)
+        p.smembers (KIDS+':'+self.path)
 
-            # FIXME: check val types
-            self.node = values[0]
-            self.data = values[1]
-            self.kids = values[2] # will be 'None' for non-DIR entries
 
-            if len (self.node) == 0 :
-                self.valid = False
-                raise IncorrectState ("backend entry seems to be gone or corrupted")
+    # ----------------------------------------------------------------
+    #
+    def _fetch_done (self, values, epoch) :
 
-            # cache our newly found entries
-            self.cache.set (NODE+':'+path, self.node)
-            self.cache.set (DATA+':'+path, self.data)
-            self.cache.set (KIDS+':'+path, self.kids)
+        path = self.path
 
-            # fetched from redis ok
-            self.valid = True
+        if len (values) != 3 :
+            self.valid = False
+            raise IncorrectState ("backend entry %s is gone or corrupted" % path)
 
-        except Exception as e :
+        # FIXME: check val types
+        self.node = values[0]
+        self.data = values[1]
+        self.kids = values[2] # will be 'None' for non-DIR entries
+
+        if len (self.node) == 0 :
             self.valid = False
-            raise IncorrectState ("backend entry is gone or corrupted: %s" % str(e))
+            raise IncorrectState ("backend entry %s seems to be gone or corrupted" % path)
 
+        # cache our newly found entries
+        self.cache.set (NODE+':'+path, self.node, epoch)
+        self.cache.set (DATA+':'+path, self.data, epoch)
+        self.cache.set (KIDS+':'+path, self.kids, epoch)
+
+        # fetched from redis ok
+        self.valid = True
 
 
     # ----------------------------------------------------------------
@@ -575,88 +1075,182 @@ class redis_ns_entry :
         if not key in self.data :
             raise BadParameter ("no such attribute (%s)" %  key)
 
-        val = self.data[key]
+        return self.data[key]
 
-        if key == 'foo' and val == 'stop' :
-            self.cache._dump ()
 
-        return val
+    # ----------------------------------------------------------------
+    #
+    def set_key (self, key, val) :
+
+        self.set_attributes ({key : val})
 
 
     # ----------------------------------------------------------------
     #
-    def set_key (self, key, val) :
+    def set_attributes (self, attrs) :
+        """
+        Set a number of attributes at once.  The update of the data and the
+        indexes, and the event notifications, are all sent in a single
+        pipeline.
+        """
     
         path = self.path
-        self.logger.debug ("set_key %s: %s" % (path, key))
+        self.logger.debug ("set_attributes %s: %s" % (path, attrs.keys ()))
+
+        # the updated data are only cached if no invalidation arrived
+        # meanwhile (see fetch())
+        epoch = self.cache.epoch
     
         self.fetch () # refresh cache/state as needed
 
         # FIXME: we only fetch() for the indexes - we should optimize that again
         # by moving index consolidation into a separate thread (p.srem below)
 
-        if key in self.data and self.data[key] == val :
+        old     = dict (self.data)
+        changed = dict ()
+        for key, val in attrs.iteritems () :
+            if key not in old or old[key] != val :
+                changed[key] = val
+
+        # within a batch, the operations are queued in the batch pipeline
+        batch = self.r.get_batch ()
+        if batch : p = batch.pipe
+        else     : p = self.r.pipeline ()
+
+        if changed :
+
+            new = dict (old)
+            new.update (changed)
+
+            # need to set the keys, and update the key/val indexes
+            # FIXME: add guard
+            p.hmset  (NODE+':'+path, {'mtime': time.time()})
+            p.hmset  (DATA+':'+path, changed)
+
+            # delete old invalid index entries -- we keep the key index
+            # entries around.  An old value index entry is still valid if
+            # another key has the same value.
+            for key in changed :
+                if key in old :
+                    if old[key] not in new.values () :
+                        p.srem (VALS+':'+str(old[key]), path)
+                        p.srem (IDX +':'+path, VALS+':'+str(old[key]))
+                else :
+                    # new key: add new key index entry
+                    p.sadd (KEYS+':'+str(key), path)
+                    p.sadd (IDX +':'+path, KEYS+':'+str(key))
+
+                # always add new value index entry
+                p.sadd (VALS+':'+str(changed[key]), path)
+                p.sadd (IDX +':'+path, VALS+':'+str(changed[key]))
+
+            # let others invalidate their caches
+            p.publish (MON, "ATTRIBUTE %s [%s]" % (path, string.join (changed.keys (), ',')))
+
+        # notify callbacks about key creation/update -- even if nothing changed
+        self.logger.debug ("PUB ATTRIBUTE %s %s"  %  (path, attrs))
+        p.publish (MON+':'+path, json.dumps (attrs))
+    
+        if batch :
+            # later updates in the batch need to see this one
+            self.data.update (changed)
+            # the batch may stay open for a while: invalidations which arrive
+            # until it is flushed keep the data out of the cache
+            batch.on_flush (lambda : self.cache.set (DATA+':'+path, self.data, epoch))
 
-            # nothing changed - so just trigger the set event
-            self.logger.debug ("Pub ATTRIBUTE %s [%s=%s]"  %  (path, key, val))
-            self.r.publish   (MON, "ATTRIBUTE %s [%s=%s]"  %  (path, key, val))
+        else :
+            # FIXME: eval return types / values
+            p.execute ()
 
-            # nothing else to do
-            return
+            # update cache
+            if changed :
+                self.data.update (changed)
+                self.cache.set (DATA+':'+path, self.data, epoch)
+
+
+    # ----------------------------------------------------------------
+    #
+    def set_ttl (self, ttl) :
+        """
+        Let the entry expire after `ttl` seconds -- a negative ttl means that
+        the entry never expires.  The entry's keys are expired by redis; the
+        remaining cleanup (indexes, parent listing, entries below a directory)
+        is done by the monitor thread on the expiry event.  A directory's
+        KIDS set is kept until then, so that its subtree can be found.
+        """
+
+        path = self.path
+        self.logger.debug ("redis_ns_entry.set_ttl %s: %s" % (path, ttl))
+
+        self.fetch ()
 
+        keys = [NODE+':'+path, DATA+':'+path]
+        if not self.is_dir () :
+            keys.append (KIDS+':'+path)
 
-        # need to set the key, and update the key/val indexes
         p = self.r.pipeline ()
-        # FIXME: add guard
-        p.hmset  (NODE+':'+path, {'mtime': time.time()})
-        p.hmset  (DATA+':'+path, {key    : val})
-    
-        # delete old invalid index entry
-        if key in self.data :
-            # we keep the key index entry around
-            p.srem (VALS+':'+str(self.data[key]), path)
-        else :
-            # new key: add new key index entry
-            p.sadd (KEYS+':'+str(key), path)
-    
-        # always add new value index entry
-        p.sadd (VALS+':'+str(val), path)
-    
-        # FIXME: eval return types / values
-        vals = p.execute ()
-    
-        # issue notification about key creation/update
-        self.logger.debug ("PUB ATTRIBUTE %s [%s=%s]"  %  (path, key, val))
-        self.r.publish   (MON, "ATTRIBUTE %s [%s=%s]"  %  (path, key, val))
-    
-        # update cache
-        self.data[key] = val
-        self.cache.set (DATA+':'+path, self.data)
+        for key in keys :
+            if  ttl < 0 : p.persist (key)
+            else        : p.pexpire (key, int (ttl * 1000))
+        p.execute ()
+
+
+    # ----------------------------------------------------------------
+    #
+    def get_ttl (self) :
+        """
+        Return the remaining lifetime of the entry in seconds, or -1.0 if the
+        entry does not expire.
+        """
+
+        ttl = self.r.pttl (NODE+':'+self.path)
+
+        if  ttl is None or ttl == -1 :
+            return -1.0
+
+        if  ttl < 0 :
+            self.valid = False
+            raise DoesNotExist ("entry %s is gone" % self.path)
+
+        return ttl / 1000.0
 
 
     # ----------------------------------------------------------------
     #
     def manage_callback (self, key, id, cb, obj) :
-        # FIXME: this needs a shared lock with the monitor thread!
     
         self.logger.debug ("redis_ns_entry.manage__callback %s : %s" % (self.path, key))
+
+        path = self.path
+
+        with self.r.cb_lock :
+
+            if not path in self.callbacks :
+                self.callbacks[path] = {}
+                self.r.subscribe_path (path)
+
+            if not key in self.callbacks[path] :
+                self.callbacks[path][key] = {}
     
-        if not self.path in self.callbacks :
-            self.callbacks[self.path] = {}
-            if not key in self.callbacks[self.path] :
-                self.callbacks[self.path][key] = {}
-    
-        if id == None :
-            del self.callbacks[self.path][key]
-    
-        if cb :
-            self.callbacks[self.path][key][id] = [cb, obj]
-        else :
-            # cb == None: remove that callback
-            # FIXME: if we have no callbacks for key, remove [key]
-            # FIXME: if we have no keys for path, remove [path]
-            # FIXME: if we remove a [path], unsubscribe for its notifications
-            del self.callbacks[self.path][key][id]
+            if id == None :
+                # remove all callbacks for that key
+                del self.callbacks[path][key]
+
+            elif cb :
+                self.callbacks[path][key][id] = [cb, obj]
+
+            else :
+                # cb == None: remove that callback
+                if id in self.callbacks[path][key] :
+                    del self.callbacks[path][key][id]
+
+                if not self.callbacks[path][key] :
+                    del self.callbacks[path][key]
+
+            # no callbacks left for the path: no need for its notifications
+            if not self.callbacks[path] :
+                del self.callbacks[path]
+                self.r.unsubscribe_path (path)
 
   
 
@@ -22,6 +22,7 @@ import time
 from cgi import parse_qs
 from StringIO import StringIO
 from datetime import datetime
+from xml.etree import ElementTree
 
 SYNC_CALL = saga.adaptors.cpi.decorators.SYNC_CALL
 ASYNC_CALL = saga.adaptors.cpi.decorators.ASYNC_CALL
@@ -103,11 +104,105 @@ def log_error_and_raise(message, exception, logger):
     logger.error(message)
     raise exception(message)
 
+# --------------------------------------------------------------------
+#
+def _sge_time(t):
+    """
+    Converts the time stamps found in 'qstat -xml' output
+    (2013-06-24T17:24:50) and in the accounting file (seconds or, for newer
+    SGE versions, milliseconds since epoch) into the format used by qacct and
+    the remote job info files (Mon Jun 24 17:24:50 2013).  Returns None if
+    the time stamp cannot be parsed.
+    """
+
+    try:
+        if t.isdigit():
+            t = int(t)
+            if not t:
+                return None
+            if t > 10**11:
+                t = t / 1000
+            dt = datetime.fromtimestamp(t)
+        else:
+            dt = datetime.strptime(t[:19], "%Y-%m-%dT%H:%M:%S")
+        return dt.strftime("%a %b %d %H:%M:%S %Y")
+    except:
+        return None
+
+# --------------------------------------------------------------------
+#
+def _parse_qstat_xml(xml):
+    """
+    Parses the output of 'qstat -xml' and returns a dictionary which maps SGE
+    job ids to dictionaries with the keys 'state', 'name', 'queue',
+    'create_time' and 'start_time'.
+    """
+
+    jobs = dict()
+    root = ElementTree.fromstring(xml)
+
+    for job in root.iter('job_list'):
+
+        pid = job.findtext('JB_job_number')
+        if not pid:
+            continue
+
+        jobs[pid.strip()] = {
+            'state'       : (job.findtext('state') or '').strip(),
+            'name'        : job.findtext('JB_name'),
+            'queue'       : job.findtext('queue_name'),
+            'create_time' : _sge_time(job.findtext('JB_submission_time') or ''),
+            'start_time'  : _sge_time(job.findtext('JAT_start_time') or '')}
+
+    return jobs
+
+# --------------------------------------------------------------------
+#
+def _parse_accounting(data, pids):
+    """
+    Parses lines of an SGE accounting file, and returns a dictionary which maps
+    the given SGE job ids to job info dictionaries.  Records of other jobs are
+    ignored.  The fields used are (see accounting(5)):
+
+        0 qname, 1 hostname, 4 job_name, 5 job_number, 8 submission_time,
+        9 start_time, 10 end_time, 11 failed, 12 exit_status
+    """
+
+    infos = dict()
+
+    for line in data.split('\n'):
+
+        if not line or line.startswith('#'):
+            continue
+
+        elems = line.split(':')
+        if len(elems) < 13 or elems[5] not in pids:
+            continue
+
+        infos[elems[5]] = dict(
+            state=saga.job.DONE if elems[11] == "0" else saga.job.FAILED,
+            name=elems[4],
+            exec_hosts=elems[1],
+            returncode=int(elems[12]) if elems[12].lstrip('-').isdigit() else -1,
+            create_time=_sge_time(elems[8]),
+            start_time=_sge_time(elems[9]),
+            end_time=_sge_time(elems[10]),
+            gone=False)
+
+    return infos
+
 # --------------------------------------------------------------------
 # some private defs
 #
 _PTY_TIMEOUT = 2.0
 
+# bulk state queries are not repeated within this time (seconds)
+_BULK_CACHE_TIMEOUT = 5.0
+
+# jobs which left the queue, but for which no accounting record or job info
+# file shows up, are given up after this many bulk queries
+_BULK_MAX_MISSES = 10
+
 # --------------------------------------------------------------------
 # the adaptor name
 #
@@ -144,6 +239,19 @@ _ADAPTOR_OPTIONS       = [
                           filesystem on the target resource.  This parameter
                           specified what location should be used.''',
     'env_variable'     : None
+    },
+    {
+    'category'         : 'saga.adaptor.sgejob',
+    'name'             : 'bulk_query',
+    'type'             : bool,
+    'default'          : False,
+    'valid_options'    : [True, False],
+    'documentation'    : '''Update the states of all jobs known to a job
+                          service at once, with a single 'qstat -xml' call per
+                          interval, and read final job information from the
+                          accounting file incrementally, instead of running
+                          qstat and qacct per job.''',
+    'env_variable'     : 'SAGA_SGE_BULK_QUERY'
     }
 ]
 # --------------------------------------------------------------------
@@ -235,6 +343,7 @@ class Adaptor (saga.adaptors.base.Base):
         self.purge_on_start = self.opts['purge_on_start'].get_value()
         self.purge_older_than = self.opts['purge_older_than'].get_value()
         self.base_workdir = self.opts['base_workdir'].get_value()
+        self.bulk_query = self.opts['bulk_query'].get_value()
 
     # ----------------------------------------------------------------
     #
@@ -294,6 +403,12 @@ class SGEJobService (saga.adaptors.cpi.job.Service):
         self.accounting = False
         self.temp_path = self._adaptor.base_workdir
 
+        # state for bulk queries
+        self._bulk_ts    = 0.0   # time of the last bulk query
+        self._acct_file  = None  # path of the accounting file, if readable
+        self._acct_offset = 0    # number of bytes read from that file
+        self._misses      = dict()  # pid: number of bulk queries missing it
+
 
         rm_scheme = rm_url.scheme
         pty_url   = surl.Url (rm_url)
@@ -437,6 +552,20 @@ class SGEJobService (saga.adaptors.cpi.job.Service):
         self.accounting = "reporting_params" in qres and "accounting=true" in qres["reporting_params"]
         self._logger.info("Accounting is %sabled" % ("en" if self.accounting else "dis"))
 
+        # for bulk queries, we read new accounting records from the accounting
+        # file directly, starting at its current end
+        if self.accounting and self._adaptor.bulk_query:
+            acct = "$SGE_ROOT/${SGE_CELL:-default}/common/accounting"
+            ret, out, _ = self.shell.run_sync("test -r %s && echo %s && wc -c < %s"
+                                              % (acct, acct, acct))
+            lines = out.strip().split('\n')
+            if ret == 0 and len(lines) == 2:
+                self._acct_file   = lines[0].strip()
+                self._acct_offset = int(lines[1].strip())
+                self._logger.info("Using accounting file %s" % self._acct_file)
+            else:
+                self._logger.info("Accounting file not readable, using qacct")
+
         # purge temporary files
         if self._adaptor.purge_on_start:
             cmd = "find " + self.temp_path + \
@@ -971,6 +1100,11 @@ class SGEJobService (saga.adaptors.cpi.job.Service):
         if prev_info["state"] in [saga.job.CANCELED, saga.job.FAILED, saga.job.DONE]:
             return prev_info
 
+        # update all jobs at once
+        if self._adaptor.bulk_query:
+            self._job_get_info_bulk()
+            return self.jobs[job_id]
+
         # retrieve updated job information
         curr_info = self._retrieve_job(job_id)
         if curr_info is None:
@@ -981,6 +1115,143 @@ class SGEJobService (saga.adaptors.cpi.job.Service):
         self.jobs[job_id] = curr_info
         return curr_info
 
+    # ----------------------------------------------------------------
+    #
+    def _job_get_info_bulk(self):
+        """ update the job info of all known jobs which are not final yet:
+            a single 'qstat -xml' call covers all queued and running jobs.  For
+            jobs which left the queue, the info is taken from new records in
+            the accounting file (if readable), then from the remote job info
+            files (with a single call).  Jobs found in neither are checked
+            again in the next bulk query (accounting records can lag behind),
+            and are only given up after _BULK_MAX_MISSES queries.
+        """
+
+        # don't query again within the cache timeout
+        if time.time() - self._bulk_ts < _BULK_CACHE_TIMEOUT:
+            return
+
+        pids = dict()
+        for job_id, info in self.jobs.iteritems():
+            if not info['gone'] and info['state'] not in [saga.job.CANCELED,
+                                                          saga.job.FAILED,
+                                                          saga.job.DONE]:
+                pids[self._adaptor.parse_id(job_id)[1]] = job_id
+
+        if not pids:
+            return
+
+        ret, out, _ = self.shell.run_sync("%s -xml -u `whoami`"
+                                          % self._commands['qstat']['path'])
+        if ret != 0:
+            message = "Error running 'qstat -xml': %s" % out
+            log_error_and_raise(message, saga.NoSuccess, self._logger)
+
+        try:
+            queued = _parse_qstat_xml(out.strip())
+        except Exception as e:
+            message = "Unexpected 'qstat -xml' results: %s (%s)" % (e, out)
+            log_error_and_raise(message, saga.NoSuccess, self._logger)
+
+        missing = list()
+        for pid, job_id in pids.iteritems():
+
+            if pid not in queued:
+                missing.append(pid)
+                continue
+
+            q    = queued[pid]
+            info = self.jobs[job_id]
+
+            info['state'] = self.__sge_to_saga_jobstate(q['state'])
+            info['name']  = q['name'] or info['name']
+
+            if q['create_time']:
+                info['create_time'] = q['create_time']
+
+            if q['start_time'] and q['state'] not in ['qw', 'hqw', 'Eqw']:
+                info['start_time']  = q['start_time']
+
+            if q['queue'] and '@' in q['queue']:
+                info['exec_hosts']  = q['queue'].split('@', 1)[1].strip()
+
+        # jobs which left the queue: check new accounting records first
+        if missing and self._acct_file:
+
+            ret, out, _ = self.shell.run_sync("tail -c +%d %s"
+                                              % (self._acct_offset + 1, self._acct_file))
+            if ret == 0:
+                # only consume complete lines
+                out = out.replace('\r\n', '\n')
+                out = out[:out.rfind('\n') + 1]
+                self._acct_offset += len(out)
+
+                for pid, info in _parse_accounting(out, missing).iteritems():
+                    self.jobs[pids[pid]].update(info)
+                    missing.remove(pid)
+
+        # then the job info files written by the job scripts.  Every line is
+        # prefixed with the job id, so no separator is needed between files.
+        if missing:
+
+            cmd = "for f in %s; do sed -e \"s/^/$f:/\" %s/$f 2>/dev/null; done" \
+                % (' '.join(missing), self.temp_path)
+            ret, out, _ = self.shell.run_sync(cmd)
+
+            files = dict()
+            for line in out.split('\n'):
+                pid, _, data = line.partition(':')
+                files.setdefault(pid.strip(), list()).append(data)
+
+            for pid in list(missing):
+
+                if pid not in files:
+                    continue
+
+                qres = SgeKeyValueParser('\n'.join(files[pid]), key_suffix=":").as_dict()
+
+                if 'exit_status' not in qres and 'signal' not in qres:
+                    continue
+
+                info = self.jobs[pids[pid]]
+                info['state']       = saga.job.CANCELED if 'signal' in qres \
+                                 else saga.job.DONE
+                info['returncode']  = int(qres.get("exit_status", -1))
+                info['exec_hosts']  = qres.get("hostname", info['exec_hosts'])
+                info['start_time']  = qres.get("start_time", info['start_time'])
+                info['end_time']    = qres.get("end_time")
+                missing.remove(pid)
+
+        # forget about jobs which showed up again (or are not watched anymore)
+        for pid in self._misses.keys():
+            if pid not in pids or pid not in missing:
+                del(self._misses[pid])
+
+        # the rest is checked again next time -- no per-job queries (which
+        # would wait for lagging accounting records) here.  Only jobs missing
+        # for too long get a last (single) qacct check.
+        for pid in missing:
+
+            self._misses[pid] = self._misses.get(pid, 0) + 1
+            if self._misses[pid] < _BULK_MAX_MISSES:
+                continue
+
+            del(self._misses[pid])
+
+            info = None
+            if self.accounting:
+                info = self.__job_info_from_accounting(pid, max_retries=1)
+
+            if info:
+                self.jobs[pids[pid]] = info
+            else:
+                self._logger.warning("lost job %s" % pid)
+                self.jobs[pids[pid]]['state'] = saga.job.UNKNOWN
+                self.jobs[pids[pid]]['gone']  = True
+
+        self._bulk_ts = time.time()
+
+
     # ----------------------------------------------------------------
     #
     def _job_get_state(self, job_id):
@@ -13,12 +13,27 @@ import saga.adaptors.base
 import saga.adaptors.cpi.filesystem
 
 import os
+import time
+import uuid
+import Queue
 import errno
+import binascii
+import threading
 
 
 SYNC_CALL  = saga.adaptors.cpi.decorators.SYNC_CALL
 ASYNC_CALL = saga.adaptors.cpi.decorators.ASYNC_CALL
 
+# ranged file I/O: remote reads and writes are done via `dd` on blocks of
+# _BLOCK_SIZE bytes.  Reads fetch at least _READ_AHEAD bytes into a local
+# buffer.  Writes of up to _WRITE_INLINE bytes are pasted into the shell, larger
+# ones are staged to a remote temp file first.  Batched commands are kept below
+# _CMD_MAX characters, to stay clear of pty line limits.
+_BLOCK_SIZE   = 4096
+_READ_AHEAD   = 64 * 1024
+_WRITE_INLINE = 256
+_CMD_MAX      = 2048
+
 
 # ------------------------------------------------------------------------------
 # the adaptor name
@@ -26,6 +41,53 @@ ASYNC_CALL = saga.adaptors.cpi.decorators.ASYNC_CALL
 _ADAPTOR_NAME          = "saga.adaptor.shell_file"
 _ADAPTOR_SCHEMAS       = ["file", "local", "sftp", "gsisftp", "ssh", "gsissh"]
 _ADAPTOR_OPTIONS       = [
+    {
+    'category'         : 'saga.adaptor.shell_file',
+    'name'             : 'tree_copy_mode',
+    'type'             : str,
+    'default'          : 'tar',
+    'valid_options'    : ['tar', 'stage'],
+    'documentation'    : '''Recursive directory copies between hosts are either
+                          streamed as a single tar archive over the ssh
+                          connection ('tar'), or staged file by file via the
+                          configured copy mode of the shell ('stage').''',
+    'env_variable'     : 'SAGA_SHELL_FILE_TREE_COPY_MODE'
+    },
+    {
+    'category'         : 'saga.adaptor.shell_file',
+    'name'             : 'tree_copy_compression',
+    'type'             : str,
+    'default'          : 'none',
+    'valid_options'    : ['none', 'gzip', 'bzip2', 'xz'],
+    'documentation'    : '''Compression used for tar streamed directory copies.
+                          Compression pays off on slow links only.''',
+    'env_variable'     : 'SAGA_SHELL_FILE_TREE_COPY_COMPRESSION'
+    },
+    {
+    'category'         : 'saga.adaptor.shell_file',
+    'name'             : 'copy_concurrency',
+    'type'             : int,
+    'default'          : 4,
+    'documentation'    : '''Default number of concurrent transfers for
+                          Directory.copy_many().  Each transfer uses its own
+                          leased shell, so this should not exceed the
+                          connection pool size.''',
+    'env_variable'     : 'SAGA_SHELL_FILE_COPY_CONCURRENCY'
+    },
+    {
+    'category'         : 'saga.adaptor.shell_file',
+    'name'             : 'stat_cache_ttl',
+    'type'             : float,
+    'default'          : 5.0,
+    'documentation'    : '''Directory listings fetch type, size and mtime of all
+                          entries, and keep them for that many seconds, to
+                          answer is_dir(), is_entry(), is_link(), exists() and
+                          get_size() calls without extra round trips.  The
+                          cache is invalidated by the adaptor's own
+                          modifications, but not by external ones.  Set to 0
+                          to disable the cache.''',
+    'env_variable'     : 'SAGA_SHELL_FILE_STAT_CACHE_TTL'
+    }
   # {
   # 'category'         : 'saga.adaptor.shell_file',
   # 'name'             : 'enable_notifications',
@@ -162,6 +224,51 @@ def _mkdir_p(path):
                             % (path, e))
 
 
+# ------------------------------------------------------------------------------
+#
+# escape data as octal printf sequences, so that binary data can be pasted
+# through the shell's pty
+#
+def _octal_escape(data):
+
+    return ''.join(['\\%03o' % ord(c) for c in data])
+
+
+# ------------------------------------------------------------------------------
+#
+# parse the output of ShellDirectory._list_stat() -- lines of 'type size mtime
+# name' -- into a dict {name : (type, size, mtime)}.  Unknown sizes and mtimes
+# ('-') become `None`.
+#
+def _parse_list_stat(out):
+
+    entries = dict()
+    for line in out.split('\n'):
+
+        elems = line.rstrip('\r').split(None, 3)
+        if  len(elems) != 4:
+            continue
+
+        etype, size, mtime, name = elems
+
+        if  etype not in ['f', 'd', 'l']:
+            etype = 'o'
+
+        try:
+            size = int(size)
+        except ValueError:
+            size = None
+
+        try:
+            mtime = float(mtime)
+        except ValueError:
+            mtime = None
+
+        entries[name] = (etype, size, mtime)
+
+    return entries
+
+
 ###############################################################################
 # The adaptor class
 
@@ -181,6 +288,15 @@ class Adaptor(saga.adaptors.base.Base):
 
         self.opts  = self.get_config(_ADAPTOR_NAME)
 
+        self.tree_copy_mode        = self.opts['tree_copy_mode'       ].get_value()
+        self.tree_copy_compression = self.opts['tree_copy_compression'].get_value()
+        self.copy_concurrency      = self.opts['copy_concurrency'     ].get_value()
+        self.stat_cache_ttl        = self.opts['stat_cache_ttl'       ].get_value()
+
+        # stat cache: {(lease_tgt, dir path) : (timestamp, {name : info})}
+        self._stat_cache           = dict()
+        self._stat_lock            = threading.Lock()
+
 
     # --------------------------------------------------------------------------
     #
@@ -206,6 +322,84 @@ class Adaptor(saga.adaptors.base.Base):
         return lease_tgt
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _stat_key(self, url):
+
+        path = os.path.normpath(url.path or '/')
+        return (str(self.get_lease_target(url)), path)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def stat_cache_set(self, dir_url, entries):
+        """
+        cache the stat info of all entries of a directory, as returned by
+        ShellDirectory._list_stat()
+        """
+
+        if  not self.stat_cache_ttl:
+            return
+
+        with self._stat_lock:
+            self._stat_cache[self._stat_key(dir_url)] = (time.time(), entries)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def stat_cache_get(self, url):
+        """
+        return the cached stat info (type, size, mtime) of the given (absolute)
+        URL, `False` if a fresh listing of its parent dir is cached but does not
+        contain the entry, or `None` if nothing is known.
+        """
+
+        if  not self.stat_cache_ttl:
+            return None
+
+        key  = self._stat_key(url)
+        name = os.path.basename(key[1])
+
+        if  not name:
+            return None
+
+        with self._stat_lock:
+
+            dir_key = (key[0], os.path.dirname(key[1]))
+
+            if  dir_key not in self._stat_cache:
+                return None
+
+            stamp, entries = self._stat_cache[dir_key]
+
+            if  time.time() - stamp > self.stat_cache_ttl:
+                del self._stat_cache[dir_key]
+                return None
+
+            return entries.get(name, False)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def stat_cache_invalidate(self, url):
+        """
+        drop all cached listings which can be affected by a modification of the
+        given (absolute) URL: the parent dir, and the URL's subtree.
+        """
+
+        key    = self._stat_key(url)
+        parent = (key[0], os.path.dirname(key[1]))
+        prefix = key[1].rstrip('/') + '/'
+
+        with self._stat_lock:
+
+            for k in self._stat_cache.keys():
+                if  k == parent or \
+                    k == key    or \
+                    (k[0] == key[0] and k[1].startswith(prefix)):
+                    del self._stat_cache[k]
+
+
 ###############################################################################
 #
 class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
@@ -314,6 +508,71 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
             return cmd_shell.run_sync("%s cd %s && %s" % (pre_cmd, location.path, command))
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _abs_url(self, tgt_in):
+
+        tgt = saga.Url(tgt_in)  # deep copy
+
+        if  sumisc.url_is_relative(tgt):
+            tgt = sumisc.url_make_absolute(self.url, tgt)
+
+        return tgt
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _stat(self, tgt_in):
+        """
+        return cached stat info for tgt_in (see Adaptor.stat_cache_get())
+        """
+
+        return self._adaptor.stat_cache_get(self._abs_url(tgt_in))
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _invalidate(self, tgt_in):
+
+        self._adaptor.stat_cache_invalidate(self._abs_url(tgt_in))
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _list_stat(self, dir_url):
+        """
+        Fetch type ('f', 'd', 'l' or 'o' for other), size and mtime of all
+        entries of the given directory in a single shell command, and cache the
+        result.  We use GNU find if we can -- otherwise a plain shell loop
+        reports type and size, but no mtime.
+        """
+
+        cmd = " if find . -maxdepth 0 -printf '' >/dev/null 2>&1; then "          \
+              "  find . -mindepth 1 -maxdepth 1 -printf '%y %s %T@ %P\\n'; "       \
+              "else "                                                             \
+              "  for f in * .[!.]* ..?*; do "                                     \
+              "    if   test -h \"$f\"; then t=l; "                               \
+              "    elif test -d \"$f\"; then t=d; "                               \
+              "    elif test -f \"$f\"; then t=f; "                               \
+              "    elif test -e \"$f\"; then t=o; "                               \
+              "    else continue; fi; "                                           \
+              "    s=0; test $t = f && s=`wc -c < \"$f\"`; "                      \
+              "    echo \"$t $s - $f\"; "                                         \
+              "  done; "                                                          \
+              "fi\n"
+
+        ret, out, err = self._command(cmd, location=dir_url)
+        if  ret:
+            raise saga.NoSuccess("failed to list %s: (%s)(%s)"
+                               % (dir_url, ret, out))
+
+        entries = _parse_list_stat(out)
+
+        self._adaptor.stat_cache_set(dir_url, entries)
+
+        return entries
+
+
     # --------------------------------------------------------------------------
     #
     def initialize(self):
@@ -462,9 +721,16 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
         # FIXME: eval flags
 
         if  npat is None:
-            npat = "."
-        else:
-            npat = '-d %s' % npat
+
+            # list the dir with stat info (which also fills the stat cache).
+            # Like 'ls', we hide dot files.
+            entries = self._list_stat(self.url)
+            names   = sorted([n for n in entries if not n.startswith('.')])
+
+            self.entries = [saga.Url(n) for n in names]
+            return self.entries
+
+        npat = '-d %s' % npat
 
         ret, out, _ = self._command(" /bin/ls -C1 %s\n" % npat)
 
@@ -495,6 +761,42 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
         return self.copy(self.url, tgt, flags)
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _stage_to_remote(self, shell, src, tgt, flags, rec_flag):
+        """
+        stage a local file or directory to the remote host of the given shell.
+        Recursive directory copies are streamed as tar archive if so configured.
+        """
+
+        if  flags & saga.filesystem.RECURSIVE         and \
+            self._adaptor.tree_copy_mode == 'tar'     and \
+            os.path.isdir(src):
+            return shell.stage_tree_to_remote(src, tgt,
+                                         self._adaptor.tree_copy_compression)
+
+        return shell.stage_to_remote(src, tgt, rec_flag)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _stage_from_remote(self, shell, src, tgt, flags, rec_flag):
+        """
+        stage a file or directory from the remote host of the given shell.
+        Recursive directory copies are streamed as tar archive if so configured.
+        """
+
+        if  flags & saga.filesystem.RECURSIVE         and \
+            self._adaptor.tree_copy_mode == 'tar':
+
+            ret, _, _ = shell.run_sync(" test -d '%s'" % src)
+            if  not ret:
+                return shell.stage_tree_from_remote(src, tgt,
+                                         self._adaptor.tree_copy_compression)
+
+        return shell.stage_from_remote(src, tgt, rec_flag)
+
+
     # --------------------------------------------------------------------------
     #
     @SYNC_CALL
@@ -517,6 +819,8 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
 
         files_copied = list()
 
+        self._adaptor.stat_cache_invalidate(tgt)
+
         # if cwd, src and tgt point to the same host, we just run a shell cp
         # command on that host
         if  sumisc.url_is_compatible(cwdurl, src) and \
@@ -555,8 +859,8 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
                     lease_tgt = self._adaptor.get_lease_target(self.url)
                     with self.lm.lease(lease_tgt, self.shell_creator, self.url) \
                         as copy_shell:
-                        files_copied = copy_shell.stage_to_remote(src.path,
-                                                       tgt.path, rec_flag)
+                        files_copied = self._stage_to_remote(copy_shell, src.path,
+                                                     tgt.path, flags, rec_flag)
 
                 elif sumisc.url_is_local(tgt)          and \
                      sumisc.url_is_compatible(cwdurl, src):
@@ -565,8 +869,8 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
                     lease_tgt = self._adaptor.get_lease_target(self.url)
                     with self.lm.lease(lease_tgt, self.shell_creator, self.url)\
                         as copy_shell:
-                        files_copied = copy_shell.stage_from_remote(src.path, 
-                                                           tgt.path, rec_flag)
+                        files_copied = self._stage_from_remote(copy_shell, src.path,
+                                                       tgt.path, flags, rec_flag)
 
                 else:
                     # print "from remote to other remote -- fail"
@@ -594,8 +898,8 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
                     lease_tgt = self._adaptor.get_lease_target(tgt)
                     with self.lm.lease(lease_tgt, self.shell_creator, tgt) \
                         as copy_shell:
-                        files_copied = copy_shell.stage_to_remote(src.path, 
-                                                         tgt.path, rec_flag)
+                        files_copied = self._stage_to_remote(copy_shell, src.path,
+                                                     tgt.path, flags, rec_flag)
 
                 elif sumisc.url_is_local(tgt):
 
@@ -608,8 +912,8 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
                     lease_tgt = self._adaptor.get_lease_target(tgt)
                     with self.lm.lease(lease_tgt, self.shell_creator, tgt) \
                         as copy_shell:
-                        files_copied = copy_shell.stage_from_remote(src.path,
-                                                           tgt.path, rec_flag)
+                        files_copied = self._stage_from_remote(copy_shell, src.path,
+                                                       tgt.path, flags, rec_flag)
 
                 else:
 
@@ -618,10 +922,110 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
                     raise saga.BadParameter("copy from %s to %s is unsupported"
                                            % (src, tgt))
 
+        self._adaptor.stat_cache_invalidate(tgt)
+
         if  _from_task:
             _from_task._set_metric('files_copied', files_copied)
 
 
+    # --------------------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def copy_many(self, copies, flags, concurrency=None, _from_task=None):
+        """
+        Run a set of copies over up to `concurrency` leased shells.  The copies
+        are ordered by (src, tgt) host pair, so that consecutive copies of
+        a worker thread tend to reuse the same leased shells.
+        """
+
+        self._is_valid()
+
+        if  not concurrency:
+            concurrency = self._adaptor.copy_concurrency
+
+        if  concurrency < 1:
+            raise saga.BadParameter("invalid copy concurrency (%s)" % concurrency)
+
+        cwdurl = saga.Url(self.url)  # deep copy
+        groups = dict()
+        order  = list()
+
+        for idx, (src, tgt) in enumerate(copies):
+
+            src = saga.Url(src)
+            tgt = saga.Url(tgt)
+
+            if  sumisc.url_is_relative(src): src = sumisc.url_make_absolute(cwdurl, src)
+            if  sumisc.url_is_relative(tgt): tgt = sumisc.url_make_absolute(cwdurl, tgt)
+
+            key = (str(self._adaptor.get_lease_target(src)),
+                   str(self._adaptor.get_lease_target(tgt)))
+
+            if  key not in groups:
+                groups[key] = list()
+                order.append(key)
+
+            groups[key].append(idx)
+
+        work = Queue.Queue()
+        for key in order:
+            for idx in groups[key]:
+                work.put(idx)
+
+        results = [None] * len(copies)
+
+        def _worker():
+
+            while True:
+
+                try:
+                    idx = work.get_nowait()
+                except Queue.Empty:
+                    return
+
+                src, tgt = copies[idx]
+                start    = time.time()
+
+                try:
+                    self.copy(src, tgt, flags)
+                    error = None
+
+                except Exception as e:
+                    self._logger.warn("copy %s -> %s failed: %s" % (src, tgt, e))
+                    error = e
+
+                results[idx] = {'src'   : src,
+                                'tgt'   : tgt,
+                                'ok'    : error is None,
+                                'error' : error,
+                                'time'  : time.time() - start}
+
+        start   = time.time()
+        threads = [threading.Thread(target=_worker)
+                   for _ in range(min(concurrency, len(copies)))]
+
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        duration = time.time() - start
+        copied   = len([r for r in results if r['ok']])
+        ret      = {'results' : results,
+                    'copied'  : copied,
+                    'failed'  : len(results) - copied,
+                    'groups'  : len(groups),
+                    'time'    : duration,
+                    'rate'    : copied / duration if duration else 0.0}
+
+        self._logger.info("copy_many: %(copied)d copied, %(failed)d failed, "
+                          "%(time).2fs (%(rate).1f/s)" % ret)
+
+        if  _from_task:
+            _from_task._set_metric('files_copied',
+                                   [r['src'] for r in results if r['ok']])
+
+        return ret
+
+
     # --------------------------------------------------------------------------
     #
     @SYNC_CALL
@@ -659,8 +1063,10 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
             sumisc.url_is_compatible(cwdurl, tgt):
 
             # print "shell ln"
+            self._invalidate(tgt)
             ret, out, err = self._command(" ln -s '%s' '%s'\n" 
                                          % (src.path, tgt.path))
+            self._invalidate(tgt)
             if  ret:
                 raise saga.NoSuccess("link (%s -> %s) failed (%s): %s [%s]"
                                     % (src, tgt, ret, out, err))
@@ -729,7 +1135,9 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
 
         if  sumisc.url_is_compatible(cwdurl, tgt):
 
+            self._invalidate(tgt)
             ret, out, err = self._command(" rm -f %s '%s'\n" % (rec_flag, tgt.path))
+            self._invalidate(tgt)
             if ret:
                 raise saga.NoSuccess("remove (%s) failed (%s): %s [%s]"
                                     % (tgt, ret, out, err))
@@ -764,8 +1172,10 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
         if flags & saga.filesystem.CREATE_PARENTS:
             opt = "-p"
 
+        self._invalidate(tgt)
         ret, out, err = self._command(" %s mkdir %s '%s'"
                       % (chk, opt, path), make_location=True)
+        self._invalidate(tgt)
 
         if 'RS_EXISTS' in out:
             raise saga.AlreadyExists("make_dir target (%s) exists" % tgt_in)
@@ -791,16 +1201,28 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
 
         self._is_valid()
 
+        info = self._stat(tgt_in)
+        if  info and info[0] == 'f' and info[1] is not None:
+            return info[1]
+
+        # like the cache (and ShellFile.get_size_self()), report exact bytes
+        # for files, and only fall back to 'du' for directories
         tgt = saga.Url(tgt_in)   # deep copy
-        ret, out, err = self._command(" du -ks '%s' | xargs | cut -f 1 -d ' '\n"
-                                     % tgt.path)
+        ret, out, err = self._command(" if test -d '%s'; then "
+                                      "  s=`du -ks '%s' | cut -f 1` && echo d $s; "
+                                      "else "
+                                      "  s=`wc -c < '%s'` && echo f $s; "
+                                      "fi\n" % (tgt.path, tgt.path, tgt.path))
         if  ret:
             raise saga.NoSuccess("get size for (%s) failed (%s): %s [%s]"
                                % (tgt, ret, out, err))
 
         size = None
         try:
-            size = int(out) * 1024  # see '-k' option to 'du'
+            etype, size = out.split()
+            size = int(size)
+            if  etype == 'd':
+                size *= 1024  # see '-k' option to 'du'
         except Exception as e:
             raise saga.NoSuccess("could not get file size: %s (%s)" % (out, e))
 
@@ -824,6 +1246,14 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
 
         self._is_valid()
 
+        info = self._stat(tgt_in)
+        if  info is False:
+            return False
+
+        # links need to be resolved
+        if  info and info[0] != 'l':
+            return True
+
         tgt = saga.Url(tgt_in)    # deep copy
 
         ret, out, _ = self._command(" test -e '%s'" % tgt.path)
@@ -848,6 +1278,10 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
 
         self._is_valid()
 
+        info = self._stat(tgt_in)
+        if  info is not None:
+            return bool(info) and info[0] == 'd'
+
         tgt  = saga.Url(tgt_in)   # deep copy
         path = tgt.path
         if not path:
@@ -876,6 +1310,10 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
 
         self._is_valid()
 
+        info = self._stat(tgt_in)
+        if  info is not None:
+            return bool(info) and info[0] == 'f'
+
         tgt = saga.Url(tgt_in)  # deep copy
 
         ret, out, _ = self._command(" test -f '%s' && test ! -h '%s'" 
@@ -902,6 +1340,10 @@ class ShellDirectory(saga.adaptors.cpi.filesystem.Directory):
 
         self._is_valid()
 
+        info = self._stat(tgt_in)
+        if  info is not None:
+            return bool(info) and info[0] == 'l'
+
         tgt = saga.Url(tgt_in)   # deep copy
 
         ret, out, _ = self._command(" test -h '%s'" % tgt.path)
@@ -1104,6 +1546,17 @@ class ShellFile(saga.adaptors.cpi.filesystem.File):
 
         self._logger.info("file initialized (%s)(%s)" % (ret, out))
 
+        if  self.flags & (saga.filesystem.CREATE | saga.filesystem.CREATE_PARENTS):
+            self._adaptor.stat_cache_invalidate(self.url)
+
+        # file pointer (None if at an unknown EOF after append), and read-ahead
+        # buffer.  As long as the file is 'pristine' (no seek, read or write
+        # yet), write() replaces the file content.
+        self._offset   = 0
+        self._buf      = ''
+        self._buf_off  = 0
+        self._pristine = True
+
         self.valid = True
 
 
@@ -1168,6 +1621,7 @@ class ShellFile(saga.adaptors.cpi.filesystem.File):
             # print "shell cp"
             ret, out, _ = self._run_sync(" cp %s '%s' '%s'\n"
                                         % (rec_flag, src.path, tgt.path))
+            self._adaptor.stat_cache_invalidate(tgt)
             if  ret:
                 raise saga.NoSuccess("copy (%s -> %s) failed (%s): (%s)"
                                     % (src, tgt, ret, out))
@@ -1275,6 +1729,7 @@ class ShellFile(saga.adaptors.cpi.filesystem.File):
 
             # print "shell ln"
             ret, out, err = self._run_sync(" ln -s '%s' '%s'\n" % (src.path, tgt.path))
+            self._adaptor.stat_cache_invalidate(tgt)
             if  ret:
                 raise saga.NoSuccess("link (%s -> %s) failed (%s): %s [%s]"
                                    % (src, tgt, ret, out, err))
@@ -1300,64 +1755,337 @@ class ShellFile(saga.adaptors.cpi.filesystem.File):
         self.initialize()
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _get_offset(self):
+        """
+        return the file pointer, and resolve it if it was left at EOF by an
+        append
+        """
+
+        if  self._offset is None:
+            self._offset = self.get_size_self()
+
+        return self._offset
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _read_ranges(self, ranges):
+        """
+        Read a list of (offset, length) ranges from the remote file, and return
+        a list of strings.  A length of `None` reads up to EOF.  All ranges are
+        read with as few shell round trips as possible: each range is read by
+        `dd` on block boundaries, and converted by `od` so that binary data
+        survives the pty.
+        """
+
+        path    = self.url.path
+        results = list()
+        cmds    = list()
+        firsts  = list()
+
+        def _flush():
+
+            if  not cmds:
+                return
+
+            ret, out, _ = self._run_sync(" test -r '%s' && { %s; }\n"
+                                        % (path, '; '.join(cmds)))
+            if  ret:
+                raise saga.NoSuccess("read from (%s) failed (%s): (%s)"
+                                   % (self.url, ret, out))
+
+            # each range is terminated by a ':' line
+            parts = out.split(':')[:-1]
+            if  len(parts) != len(cmds):
+                raise saga.NoSuccess("read from (%s) failed: incomplete (%s)"
+                                   % (self.url, out))
+
+            for part, (offset, length), first in zip(parts, ranges[len(results):], firsts):
+
+                try:
+                    data = binascii.unhexlify(''.join(part.split()))
+                except Exception as e:
+                    raise saga.NoSuccess("read from (%s) failed: %s" % (self.url, e))
+
+                data = data[offset - first * _BLOCK_SIZE:]
+                if  length is not None:
+                    data = data[:length]
+
+                results.append(data)
+
+            del cmds[:]
+            del firsts[:]
+
+
+        for offset, length in ranges:
+
+            first = offset // _BLOCK_SIZE
+            count = ""
+
+            if  length is not None:
+                last  = (offset + length + _BLOCK_SIZE - 1) // _BLOCK_SIZE
+                count = " count=%d" % (last - first)
+
+            cmd = "dd if='%s' bs=%d skip=%d%s 2>/dev/null | od -An -v -tx1; echo ':'" \
+                % (path, _BLOCK_SIZE, first, count)
+
+            if  cmds and len(cmd) * (len(cmds) + 1) > _CMD_MAX:
+                _flush()
+
+            cmds.append(cmd)
+            firsts.append(first)
+
+        _flush()
+
+        return results
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _write_ranges(self, writes):
+        """
+        Write a list of (offset, data) tuples into the remote file.  An offset
+        of `None` appends to the file.  `dd` can only seek in units of its block
+        size, so data are extended to start on a block boundary, by prepending
+        what the file currently holds before `offset` (or zeros beyond EOF).
+        Small writes are pasted into the shell, and batched into as few round
+        trips as possible -- large writes are staged to a temp file next to the
+        target first.
+        """
+
+        path  = self.url.path
+        cmds  = list()
+        tmps  = list()
+
+        # fetch the block heads of all unaligned writes in one go
+        heads = [(offset // _BLOCK_SIZE * _BLOCK_SIZE, offset % _BLOCK_SIZE)
+                 for offset, _ in writes
+                 if  offset is not None and offset % _BLOCK_SIZE]
+        heads = dict(zip(heads, self._read_ranges(heads)))
+
+        lease_tgt = self._adaptor.get_lease_target(self.cwdurl)
+
+        for offset, data in writes:
+
+            if  isinstance(data, unicode):
+                data = data.encode('utf-8')
+
+            if  offset is None:
+                sink = " >> '%s'" % path
+
+            else:
+                start = offset // _BLOCK_SIZE * _BLOCK_SIZE
+                if  offset != start:
+                    head = heads[(start, offset - start)]
+                    data = head + '\0' * (offset - start - len(head)) + data
+
+                sink = " | dd of='%s' bs=%d seek=%d conv=notrunc 2>/dev/null" \
+                     % (path, _BLOCK_SIZE, start // _BLOCK_SIZE)
+
+            if  len(data) <= _WRITE_INLINE:
+                cmd = "printf '%s'%s" % (_octal_escape(data), sink)
+
+            else:
+                tmp = "%s/.%s.%s.saga" % (sumisc.url_get_dirname(self.url),
+                                         os.path.basename(path), uuid.uuid4().hex)
+                with self.lm.lease(lease_tgt, self.shell_creator, self.cwdurl) as shell:
+                    shell.write_to_remote(data, tmp)
+
+                tmps.append(tmp)
+                cmd = "cat '%s'%s" % (tmp, sink)
+
+            cmds.append(cmd)
+
+        # run the writes in batches, and clean out the temp files
+        while cmds:
+
+            batch = [cmds.pop(0)]
+            while cmds and len(' && '.join(batch + cmds[:1])) < _CMD_MAX:
+                batch.append(cmds.pop(0))
+
+            cmd = " { %s; }" % ' && '.join(batch)
+            if  tmps and not cmds:
+                cmd += "; ret=$?; rm -f %s; test $ret = 0" \
+                     % ' '.join(["'%s'" % tmp for tmp in tmps])
+
+            ret, out, _ = self._run_sync(cmd + "\n")
+            if  ret:
+                if  tmps:
+                    self._run_sync(" rm -f %s\n" % ' '.join(["'%s'" % tmp for tmp in tmps]))
+                raise saga.NoSuccess("write to (%s) failed (%s): (%s)"
+                                   % (self.url, ret, out))
+
+
     # --------------------------------------------------------------------------
     #
     @SYNC_CALL
     def write(self, string, flags=None):
         """
-        This call is intended to write a string to a local or remote file.
-        Since write() uses file staging calls, it cannot be used to randomly
-        write certain parts of a file (i.e. seek()). Together with read(),
-        it was designed to manipulate template files and write them back to
-        the remote directory. Be aware, that writing large files will
-        be very slow compared to native read(2) and write(2) calls.
+        Write a string to the file, at the current file pointer.  As long as
+        the file was not otherwise accessed (seek, read, write), the first
+        write replaces the complete file content -- this supports the common use
+        case of writing (template) files in one go.  With the APPEND flag, the
+        data are appended to the file.  Only the written range is transferred
+        to the remote side.
         """
+
         self._is_valid()
+
         if  flags is None:
             flags = self.flags
         else:
             self.flags = flags
 
-        tgt = saga.Url(self.url)  # deep copy, is absolute
+        if  isinstance(string, unicode):
+            string = string.encode('utf-8')
 
-        # FIXME: AM: this is stupid and wrong
-        if  flags == saga.filesystem.APPEND:
-            string = self.read() + string
+        # any write invalidates the read-ahead buffer
+        self._buf     = ''
+        self._buf_off = 0
 
-        # FIXME: eval flags
+        if  flags & saga.filesystem.APPEND:
+            self._write_ranges([[None, string]])
+            self._offset = None
 
-        lease_tgt = self._adaptor.get_lease_target(self.cwdurl)
+        elif self._pristine:
+            lease_tgt = self._adaptor.get_lease_target(self.cwdurl)
+            with self.lm.lease(lease_tgt, self.shell_creator, self.cwdurl) as shell:
+                shell.write_to_remote(string, self.url.path)
+            self._offset = len(string)
+
+        else:
+            offset = self._get_offset()
+            self._write_ranges([[offset, string]])
+            self._offset = offset + len(string)
+
+        self._pristine = False
+        self._adaptor.stat_cache_invalidate(self.url)
+
+        return len(string)
 
-        with self.lm.lease(lease_tgt, self.shell_creator, self.cwdurl) as shell:
-            shell.write_to_remote(string, tgt.path)
 
     # --------------------------------------------------------------------------
     #
     @SYNC_CALL
-    def read(self,size=None):
+    def read(self, size=None):
         """
-        This call is intended to read a string wit length size from a local
-        or remote file.	Since read() uses file staging calls, it cannot be
-        used to randomly read certain parts of a file (i.e. seek()).
-        Together with write(), it was designed to manipulate template files
-        and write them back to the remote directory. Be aware, that reading
-        large files will be very slow compared to native read(2) and write(2)
-        calls.
+        Read up to `size` bytes from the current file pointer (or everything
+        up to EOF if `size` is not given).  Reads are served from a local
+        read-ahead buffer where possible -- otherwise, at least _READ_AHEAD
+        bytes are fetched from the remote file, starting at the file pointer.
+        Reading a complete file from its start uses the shell's copy channel.
         """
 
         self._is_valid()
 
-        lease_tgt = self._adaptor.get_lease_target(self.cwdurl)
-        tgt       = saga.Url(self.url)  # deep copy, is absolute
+        if  size is not None and size < 0:
+            raise saga.BadParameter("cannot read negative size (%s)" % size)
 
-        with self.lm.lease(lease_tgt, self.shell_creator, self.cwdurl) as shell:
-            out = shell.read_from_remote(tgt.path)
+        if  size == 0:
+            return ''
 
-        if size is None:
+        offset = self._get_offset()
+
+        if  size is None and not offset:
+            lease_tgt = self._adaptor.get_lease_target(self.cwdurl)
+            with self.lm.lease(lease_tgt, self.shell_creator, self.cwdurl) as shell:
+                out = shell.read_from_remote(self.url.path)
+
+            self._offset   = len(out)
+            self._pristine = False
             return out
+
+        buf_end = self._buf_off + len(self._buf)
+
+        if  size is None                or \
+            offset < self._buf_off      or \
+            offset + size > buf_end     :
+
+            # buffer miss: refill it from the file pointer onwards
+            length = None
+            if  size is not None:
+                length = max(size, _READ_AHEAD)
+
+            self._buf     = self._read_ranges([[offset, length]])[0]
+            self._buf_off = offset
+
+        start = offset - self._buf_off
+        if  size is None: out = self._buf[start:]
+        else            : out = self._buf[start:start + size]
+
+        self._offset   = offset + len(out)
+        self._pristine = False
+
+        return out
+
+
+    # --------------------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def seek(self, offset, whence):
+
+        self._is_valid()
+
+        if   whence == saga.filesystem.START   : base = 0
+        elif whence == saga.filesystem.CURRENT : base = self._get_offset()
+        elif whence == saga.filesystem.END     : base = self.get_size_self()
         else:
-            return out[0:size - 1]
+            raise saga.BadParameter("invalid seek mode (%s)" % whence)
+
+        if  base + offset < 0:
+            raise saga.BadParameter("cannot seek before start of file (%s)"
+                                   % (base + offset))
+
+        self._offset   = base + offset
+        self._pristine = False
+
+        return self._offset
+
+
+    # --------------------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def read_v(self, iovecs):
+        """
+        Read a list of (offset, length) ranges, in as few round trips as
+        possible.  The file pointer is not changed.
+        """
+
+        self._is_valid()
+
+        for offset, length in iovecs:
+            if  offset < 0 or length < 0:
+                raise saga.BadParameter("invalid read range (%s, %s)"
+                                       % (offset, length))
+
+        return self._read_ranges([[offset, length] for offset, length in iovecs])
+
+
+    # --------------------------------------------------------------------------
+    #
+    @SYNC_CALL
+    def write_v(self, data):
+        """
+        Write a list of (offset, data) tuples, in as few round trips as
+        possible.  The file pointer is not changed.
+        """
+
+        self._is_valid()
+
+        for offset, _ in data:
+            if  offset < 0:
+                raise saga.BadParameter("invalid write offset (%s)" % offset)
+
+        self._buf      = ''
+        self._buf_off  = 0
+        self._pristine = False
+
+        self._write_ranges(data)
+        self._adaptor.stat_cache_invalidate(self.url)
 
+        return [len(buf) for _, buf in data]
 
 
     # --------------------------------------------------------------------------
@@ -1377,6 +2105,7 @@ class ShellFile(saga.adaptors.cpi.filesystem.File):
             rec_flag  += "-r "
 
         ret, out, _ = self._run_sync(" rm -f %s '%s'\n" % (rec_flag, tgt.path))
+        self._adaptor.stat_cache_invalidate(tgt)
         if  ret:
             raise saga.NoSuccess("remove (%s) failed (%s): (%s)"
                                % (tgt, ret, out))
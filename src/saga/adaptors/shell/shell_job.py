@@ -16,6 +16,7 @@ from   saga.utils.job     import TransferDirectives
 
 import re
 import time
+import Queue
 import threading
 
 import shell_wrapper
@@ -121,6 +122,130 @@ class _job_state_monitor (threading.Thread) :
             self.logger.error ("Cancel job monitoring for %s" % self.rm)
 
 
+# ------------------------------------------------------------------------------
+#
+class _staging_pipeline (object) :
+    """
+    A small pool of worker threads which run file staging operations, so that
+    those do not block the job service shell.  Each worker owns a dedicated
+    copy channel (a PTYShell to the job service's resource), which is created
+    on first use.  Tasks are callables `func(shell)`; once a task completed,
+    its `callback(error)` is invoked in the worker thread, with `error` being
+    `None` on success.
+    """
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__ (self, js, size, logger) :
+
+        self.js      = js
+        self.size    = size
+        self.logger  = logger
+        self.queue   = Queue.Queue ()
+        self.workers = list()
+        self.shells  = list()
+        self.lock    = threading.Lock ()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def submit (self, func, callback=None) :
+
+        with self.lock :
+
+            # start workers as needed
+            if  len(self.workers) < self.size :
+                worker = threading.Thread (target=self._work)
+                worker.setDaemon (True)
+                worker.start ()
+                self.workers.append (worker)
+
+        self.queue.put ([func, callback])
+
+
+    # --------------------------------------------------------------------------
+    #
+    def run (self, func) :
+        """ run a task on the pipeline, and wait for its completion """
+
+        done   = threading.Event ()
+        result = list()
+
+        def _callback (error) :
+            result.append (error)
+            done.set ()
+
+        self.submit (func, _callback)
+        done.wait ()
+
+        if  result[0] :
+            raise result[0]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def finalize (self) :
+        """
+        Let the workers complete all queued tasks, then close their shells.
+        """
+
+        with self.lock :
+            workers      = self.workers
+            self.workers = list()
+
+        for _ in workers :
+            self.queue.put (None)
+
+        # a callback may finalize the service from within a worker
+        for worker in workers :
+            if  worker != threading.current_thread () :
+                worker.join ()
+
+        with self.lock :
+            for shell in self.shells :
+                shell.finalize (kill_pty=True)
+            self.shells = list()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _work (self) :
+
+        shell = None
+
+        while True :
+
+            task = self.queue.get ()
+
+            if  task is None :
+                return
+
+            func, callback = task
+            error          = None
+
+            try :
+                if  not shell :
+                    shell = saga.utils.pty_shell.PTYShell (self.js.rm,
+                                                           self.js.get_session (),
+                                                           self.logger,
+                                                           opts=self.js.opts)
+                    shell.submitter = self.js.shell.submitter
+                    with self.lock :
+                        self.shells.append (shell)
+
+                func (shell)
+
+            except Exception as e :
+                self.logger.error ("staging failed: %s" % e)
+                error = e
+
+            if  callback :
+                try :
+                    callback (error)
+                except Exception as e :
+                    self.logger.error ("staging callback failed: %s" % e)
+
+
 # --------------------------------------------------------------------
 #
 # strip white space from a string, and hex-decode the remaining characters.
@@ -184,6 +309,24 @@ _ADAPTOR_OPTIONS       = [
                           filesystem on the target resource.  This parameter
                           specified what location should be used.''',
     'env_variable'     : None
+    },
+    {
+    'category'         : 'saga.adaptor.shell_job',
+    'name'             : 'staging_concurrency',
+    'type'             : int,
+    'default'          : 2,
+    'documentation'    : '''Number of concurrent file staging operations per
+                          job service instance.  Each of those uses its own
+                          copy channel, i.e. an additional shell process and
+                          network connection, so that data staging does not
+                          block job submission and management.  Input data for
+                          bulk submissions are staged concurrently, and jobs
+                          are submitted as soon as their input data are
+                          staged.  Output data are staged when the job is
+                          done -- the job enters DONE state once that
+                          completed.  '0' stages all data synchronously over
+                          the job service connection.''',
+    'env_variable'     : None
     }
 ]
 
@@ -373,6 +516,7 @@ class Adaptor (saga.adaptors.base.Base):
         self.notifications  = self.opts['enable_notifications'].get_value ()
         self.purge_on_start = self.opts['purge_on_start'      ].get_value ()
         self.base_workdir   = self.opts['base_workdir'        ].get_value ()
+        self.staging_conc   = self.opts['staging_concurrency' ].get_value ()
 
 
     # ----------------------------------------------------------------
@@ -430,11 +574,8 @@ class Adaptor (saga.adaptors.base.Base):
                 raise saga.BadParameter('FileTransfer append (<</>>) not supported')
 
             if  td.in_overwrite:
-                for (local, remote) in td.in_overwrite:
-                    source = local
-                    target = remote
-                    self._logger.info("Transferring file %s to %s" % (source, target))
-                    shell.stage_to_remote(source, target)
+                self._logger.info("Transferring %d files" % len(td.in_overwrite))
+                shell.stage_to_remote_many(td.in_overwrite)
 
 
     # ----------------------------------------------------------------
@@ -451,11 +592,10 @@ class Adaptor (saga.adaptors.base.Base):
                 raise saga.BadParameter('FileTransfer append (<</>>) not supported')
 
             if  td.out_overwrite:
-                for (local, remote) in td.out_overwrite_dict.iteritems():
-                    source = remote
-                    target = local
-                    self._logger.info("Transferring file %s to %s" % (source, target))
-                    shell.stage_from_remote(source, target)
+                pairs = [[remote, local] for (local, remote)
+                                         in td.out_overwrite_dict.iteritems()]
+                self._logger.info("Transferring %d files" % len(pairs))
+                shell.stage_from_remote_many(pairs)
 
 
 ###############################################################################
@@ -497,6 +637,13 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
         self.session = session
         self.jobs    = dict()
         self.njobs   = 0
+        self.monitor = None
+        self.stager  = None
+
+        if  self._adaptor.staging_conc > 0 :
+            self.stager = _staging_pipeline (js     = self,
+                                             size   = self._adaptor.staging_conc,
+                                             logger = self._logger)
 
         # Use `_set_session` method of the base class to set the session object.
         # `_set_session` and `get_session` methods are provided by `CPIBase`.
@@ -513,6 +660,9 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
                                                       self._logger, opts=self.opts)
         self.channel = saga.utils.pty_shell.PTYShell (self.rm, self.get_session(), 
                                                       self._logger, opts=self.opts)
+
+        # transfers of this service are scheduled as one submitter
+        self.shell.submitter = self.get_api ()
         self.initialize ()
 
         # the monitoring thread - one per service instance.  We wait for
@@ -547,6 +697,10 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
             self.monitor.finalize()
             # we don't care about join, really
 
+        if  self.stager :
+            self.stager.finalize()
+            self.stager = None
+
 
     # ----------------------------------------------------------------
     #
@@ -687,14 +841,30 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
 
         return cmd
 
+    # ----------------------------------------------------------------
+    #
+    #
+    def _stage_input (self, jd) :
+        """ stage input data, on a copy channel if possible """
+
+        if  not jd or jd.file_transfer is None :
+            return
+
+        if  self.stager :
+            self.stager.run (lambda shell : self._adaptor.stage_input (shell, jd))
+        else :
+            self._adaptor.stage_input (self.shell, jd)
+
+
     # ----------------------------------------------------------------
     #
     #
     def _job_run (self, jd) :
         """ runs a job on the wrapper via pty, and returns the job id """
 
-        # stage data, then run job
-        self._adaptor.stage_input (self.shell, jd)
+        # stage data, then run job.  Staging happens on a copy channel, so
+        # other threads can use the job service meanwhile
+        self._stage_input (jd)
 
         # create command to run
         cmd = self._jd2cmd (jd)
@@ -1031,6 +1201,10 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
         From all the job descriptions in the container, build a bulk, and submit
         as async.  The read whaterver the wrapper returns, and sort through the
         messages, assigning job IDs etc.
+
+        If a staging pipeline is available, input data for all jobs are staged
+        concurrently, and jobs are submitted (in bulks) as soon as their input
+        data are in place -- so that data staging overlaps with job execution.
         """
 
         # FIXME: this just assumes that all tasks are job creation tasks --
@@ -1038,20 +1212,68 @@ class ShellJobService (saga.adaptors.cpi.job.Service) :
 
         self._logger.debug ("container run: %s"  %  str(jobs))
 
+        if  not self.stager :
+            for job in jobs :
+                self._adaptor.stage_input (self.shell, job.description)
+            self._bulk_run (jobs)
+            return
+
+        # ------------------------------------------------------------
+        # jobs w/o input staging are ready right away, all others are queued
+        # once staged
+        ready  = Queue.Queue ()
+        staged = list()
+
+        for job in jobs :
+            if  job.description.file_transfer is None :
+                ready.put ([job, None])
+            else :
+                staged.append (job)
+
+        for job in staged :
+            def _stage (shell, job=job) :
+                self._adaptor.stage_input (shell, job.description)
+            def _ready (error, job=job) :
+                ready.put ([job, error])
+            self.stager.submit (_stage, _ready)
+
+        todo = len(jobs)
+        while todo :
+
+            # wait for one job to become ready, then collect all others which
+            # are ready at this point, and submit them in one bulk
+            batch = [ready.get ()]
+            try :
+                while True :
+                    batch.append (ready.get_nowait ())
+            except Queue.Empty :
+                pass
+
+            todo -= len(batch)
+            bulk  = list()
+
+            for job, error in batch :
+                if  error :
+                    job._adaptor._set_state (saga.job.FAILED)
+                    job._adaptor._exception = error
+                else :
+                    bulk.append (job)
+
+            if  bulk :
+                self._bulk_run (bulk)
+
+
+    # ----------------------------------------------------------------
+    #
+    def _bulk_run (self, jobs) :
+        """ submit a list of jobs as one bulk operation """
+
         bulk = "BULK\n"
 
         for job in jobs :
             cmd   = self._jd2cmd (job.description)
             bulk += "RUN %s\n" % cmd
 
-        # ------------------------------------------------------------
-        # stage input data
-        # FIXME: this is now blocking the run() method.  Ideally, this activity
-        # should be passed to a data manager thread/process/service.
-        for job in jobs :
-            self._adaptor.stage_input (self.shell, job.description)
-        # ------------------------------------------------------------
-
         bulk += "BULK_RUN\n"
         self.shell.run_async (bulk)
 
@@ -1341,6 +1563,7 @@ class ShellJob (saga.adaptors.cpi.job.Job) :
             self._name            = self.jd.name
             self._started         = None
             self._finished        = None
+            self._staging         = False
 
             self._set_state (saga.job.NEW)
 
@@ -1358,6 +1581,7 @@ class ShellJob (saga.adaptors.cpi.job.Job) :
             self._name            = None
             self._started         = None
             self._finished        = None
+            self._staging         = False
 
         else :
             # don't know what to do...
@@ -1381,10 +1605,19 @@ class ShellJob (saga.adaptors.cpi.job.Job) :
         old_state = self._state
 
         if  state == saga.job.DONE and \
-            old_state not in [saga.job.DONE, saga.job.FAILED, saga.job.CANCELED] :
+            old_state not in [saga.job.DONE, saga.job.FAILED, saga.job.CANCELED] and \
+            self.jd and self.jd.file_transfer is not None :
+
+            if  self.js.stager :
+                # stage output data on a copy channel -- the job enters DONE
+                # state once that completed.
+                if  not self._staging :
+                    self._staging = True
+                    self.js.stager.submit (
+                            lambda shell : self._adaptor.stage_output (shell, self.jd),
+                            self._output_staged)
+                return
 
-            # stage output data
-            # FIXME: _update_state blocks until data are staged.  That should not happen.
             self._adaptor.stage_output (self.js.shell, self.jd)
         
         # files are staged -- update state, and report to application
@@ -1392,6 +1625,19 @@ class ShellJob (saga.adaptors.cpi.job.Job) :
         self._api ()._attributes_i_set ('state', self._state, self._api ()._UP)
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _output_staged (self, error) :
+
+        if  error :
+            self._exception = error
+            self._state     = saga.job.FAILED
+        else :
+            self._state     = saga.job.DONE
+
+        self._api ()._attributes_i_set ('state', self._state, self._api ()._UP)
+
+
     # ----------------------------------------------------------------
     #
     @SYNC_CALL
@@ -1431,6 +1677,11 @@ class ShellJob (saga.adaptors.cpi.job.Job) :
 
         old_state = self._state
 
+        # DONE notifications trigger output staging
+        if  state == saga.job.DONE and old_state != state :
+            self._update_state (state)
+            return self._state
+
         # on state changes, trigger notifications
         if  old_state != state :
             self._state  = state
@@ -14,6 +14,8 @@ import saga.utils.pty_shell
 import saga.adaptors.base
 import saga.adaptors.cpi.job
 
+from saga.utils.job import StateCoalescer
+
 import re
 import os
 import math
@@ -271,6 +273,10 @@ class SLURMJobService (saga.adaptors.cpi.job.Service) :
                           'scontrol': None,
                           'scancel' : None}
 
+        # merges concurrent job state queries into one squeue/sacct call
+        self._coalescer = StateCoalescer(self._bulk_squeue, self._parse_bulk_squeue,
+                                         logger=self._logger)
+
     # --------------------------------------------------------------------------
     #
     def __del__ (self) :
@@ -634,6 +640,57 @@ class SLURMJobService (saga.adaptors.cpi.job.Service) :
         else                                 : return saga.job.UNKNOWN
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _bulk_squeue(self, pids):
+        """
+        StateCoalescer query hook: get the states of a list of jobs from
+        squeue, and from the slurm accounting data for jobs which squeue does
+        not know (anymore)
+        """
+
+        ids = ','.join(pids)
+
+        # squeue fails if any of the jobs is unknown, and sacct may not be
+        # enabled -- jobs not found in either are left out by the parse hook.
+        ret, out, _ = self.shell.run_sync(
+            'squeue -h -o "%%i|%%T" -j %s 2>/dev/null; '
+            'sacct --format=JobID,State --parsable2 --noheader --jobs=%s 2>/dev/null'
+            % (ids, ids))
+
+        return out
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _parse_bulk_squeue(self, out, pids):
+        """
+        StateCoalescer parse hook: map job ids to their slurm state.  Unknown
+        jobs are left out.
+        """
+
+        # output will look like:
+        # 500725|RUNNING            (squeue)
+        # 500723|COMPLETED          (sacct)
+        # 500723.batch|COMPLETED
+        # 500682|CANCELLED by 900369
+        #
+        # squeue lines come first, and take precedence
+
+        results = dict()
+        for line in out.split('\n'):
+
+            elems = line.strip().split('|', 1)
+            if len(elems) != 2 or not elems[1].strip():
+                continue
+
+            slurm_id, slurm_state = elems
+            if slurm_id in pids and slurm_id not in results:
+                results[slurm_id] = slurm_state.split()[0]
+
+        return results
+
+
     # --------------------------------------------------------------------------
     #
     def _job_cancel (self, job):
@@ -824,10 +881,26 @@ class SLURMJobService (saga.adaptors.cpi.job.Service) :
     #
     def container_get_states(self, jobs):
 
-        # TODO: this is not optimized yet
+        # query all started, non-final jobs at once
+        pids = dict()
+        for job in jobs:
+            cpi = job._adaptor
+            if cpi._started and cpi._state not in [saga.job.CANCELED,
+                                                   saga.job.FAILED,
+                                                   saga.job.DONE]:
+                pids[job] = self._adaptor.parse_id(cpi._id)[1]
+
+        results = dict()
+        if pids:
+            results = self._coalescer.get_many(pids.values())
+
         states = list()
         for job in jobs:
-            states.append(job.get_state())
+            cpi = job._adaptor
+            if job in pids:
+                cpi._state = self._slurm_to_saga_jobstate(results.get(pids[job]))
+            states.append(cpi._state)
+
         return states
 
 
@@ -1010,19 +1083,13 @@ class SLURMJob(saga.adaptors.cpi.job.Job):
         rm, pid = self._adaptor.parse_id (job_id)
 
         try:
-            ret, out, _ = self.js.shell.run_sync('scontrol show job %s' % pid)
-            match       = self.js.scontrol_jobstate_re.search(out)
-
-            if match:
-                slurm_state = match.group(1)
-            else:
-                # no jobstate found from scontrol
-                # the job may have finished a while back, use sacct to
-                # look at the full slurm history
-                slurm_state = self._sacct_jobstate_match(pid)
-                if not slurm_state:
-                    # no jobstate found in slurm
-                    return saga.job.UNKNOWN
+            # concurrent queries for other jobs are merged into one squeue
+            # call.  Jobs which finished a while back are looked up in the
+            # full slurm history (sacct).
+            slurm_state = self.js._coalescer.get(pid)
+            if not slurm_state:
+                # no jobstate found in slurm
+                return saga.job.UNKNOWN
 
             return self.js._slurm_to_saga_jobstate(slurm_state)
 
@@ -1036,34 +1103,6 @@ class SLURMJob(saga.adaptors.cpi.job.Job):
                                    " in _job_get_state")
 
 
-    # --------------------------------------------------------------------------
-    #
-    def _sacct_jobstate_match (self, pid):
-        ''' 
-        get the job state from the slurm accounting data
-        '''
-
-        ret, sacct_out, _ = self.js.shell.run_sync(
-            "sacct --format=JobID,State --parsable2 --noheader --jobs=%s" % pid)
-        # output will look like:
-        # 500723|COMPLETED
-        # 500723.batch|COMPLETED
-        # or:
-        # 500682|CANCELLED by 900369
-        # 500682.batch|CANCELLED
-
-        try:
-            for line in sacct_out.strip().split('\n'):
-                (slurm_id, slurm_state) = line.split('|', 1)
-                if slurm_id == pid and slurm_state:
-                    return slurm_state.split()[0].strip()
-
-        except Exception:
-            self._log.warn('cannot parse sacct output:\n%s' % sacct_out)
-
-        return None
-
-
     # --------------------------------------------------------------------------
     #
     @SYNC_CALL
@@ -180,9 +180,16 @@ class Adaptor(saga.adaptors.base.Base):
             src = src.__str__()
         if isinstance(dst, saga.filesystem.file.File):
             dst = dst.get_url()
+
+        # the SRM endpoint is the remote side of the transfer
+        host = saga.Url(src).host
+        if saga.Url(src).scheme not in ['srm']:
+            host = saga.Url(dst).host
+
         try:
-            rc, out, _ = shell.run_sync('gfal-copy --parent --timeout %d --transfer-timeout %d %s %s' % (
-                OPERATION_TIMEOUT, TRANSFER_TIMEOUT, src, dst))
+            with shell.session._transfer_scheduler.transfer(host):
+                rc, out, _ = shell.run_sync('gfal-copy --parent --timeout %d --transfer-timeout %d %s %s' % (
+                    OPERATION_TIMEOUT, TRANSFER_TIMEOUT, src, dst))
         except:
             shell.finalize(kill_pty=True)
             raise Exception("transfer failed")
@@ -142,6 +142,52 @@ class Directory (nsdir.Directory, sa.Attributes) :
         return self._adaptor.attribute_caller (key, id, cb)
 
 
+    # ----------------------------------------------------------------
+    #
+    @rus.takes   ('Directory', 
+                  dict,
+                  rus.optional (rus.one_of (SYNC, ASYNC, TASK)))
+    @rus.returns ((rus.nothing, st.Task))
+    def set_attributes (self, attrs, ttype=None) :
+        """
+        attrs:          dict
+        ttype:          saga.task.type enum
+        ret:            None / saga.Task
+
+        Set several attributes at once -- the backend can apply all of them
+        in a single operation.
+        """
+
+        ret = self._adaptor.set_attributes (attrs, ttype=ttype)
+
+        if  not ttype :
+            for key, val in attrs.iteritems () :
+                self._attributes_i_set (key, val, flow=self._UP)
+
+        return ret
+
+
+    # ----------------------------------------------------------------
+    #
+    @rus.takes   ('Directory')
+    @rus.returns (rus.anything)
+    def batch (self) :
+        """
+        ret:            context manager
+
+        Returns a context manager, within which the attribute reads and
+        writes of all advert entries and directories of the same backend (in
+        the calling thread) are grouped into as few backend operations as
+        possible.  Writes are applied when the context is left::
+
+            with d.batch () :
+                for e in entries :
+                    e.set_attribute ('state', 'done')
+        """
+
+        return self._adaptor.batch ()
+
+
 
     # ----------------------------------------------------------------
     #
@@ -145,6 +145,31 @@ class Entry (nsentry.Entry, sa.Attributes) :
         return self._adaptor.attribute_caller (key, id, cb)
 
 
+    # --------------------------------------------------------------------------
+    #
+    @rus.takes   ('Entry', 
+                  dict,
+                  rus.optional (rus.one_of (SYNC, ASYNC, TASK)))
+    @rus.returns ((rus.nothing, st.Task))
+    def set_attributes (self, attrs, ttype=None) :
+        """
+        attrs:          dict
+        ttype:          saga.task.type enum
+        ret:            None / saga.Task
+
+        Set several attributes at once -- the backend can apply all of them
+        in a single operation.
+        """
+
+        ret = self._adaptor.set_attributes (attrs, ttype=ttype)
+
+        if  not ttype :
+            for key, val in attrs.iteritems () :
+                self._attributes_i_set (key, val, flow=self._UP)
+
+        return ret
+
+
 
     # --------------------------------------------------------------------------
     #
@@ -100,6 +100,17 @@ _config_options = [
     },
     {
     'category'      : 'saga.utils.pty',
+    'name'          : 'stream_transfer',
+    'type'          : bool,
+    'default'       : True,
+    'valid_options' : [True, False],
+    'documentation' : 'stream small data transfers (write_to_remote / '
+                      'read_from_remote) over the shell connection, instead '
+                      'of staging them via temporary files',
+    'env_variable'  : 'SAGA_PTY_STREAM_TRANSFER'
+    },
+    {
+    'category'      : 'saga.utils.pty',
     'name'          : 'connection_pool_ttl',
     'type'          : int,
     'default'       : 10*60,
@@ -122,6 +133,22 @@ _config_options = [
     'default'       : 10*60,
     'documentation' : 'maximum number of seconds to wait for any connection in the connection pool to become available before raising a timeout error',
     'env_variable'  : 'SAGA_PTY_CONN_POOL_WAIT'
+     },
+    {
+    'category'      : 'saga.utils.transfer',
+    'name'          : 'max_streams_per_host',
+    'type'          : int,
+    'default'       : 4,
+    'documentation' : 'maximum number of concurrent data transfers per remote host, per session (0: no limit)',
+    'env_variable'  : 'SAGA_TRANSFER_MAX_STREAMS_PER_HOST'
+    },
+    {
+    'category'      : 'saga.utils.transfer',
+    'name'          : 'max_streams',
+    'type'          : int,
+    'default'       : 0,
+    'documentation' : 'maximum number of concurrent data transfers per session (0: no limit)',
+    'env_variable'  : 'SAGA_TRANSFER_MAX_STREAMS'
     }
 ]
 
@@ -233,6 +233,25 @@ class Directory (nsdir.Directory) :
         else      :  return self._adaptor.is_file_self (      ttype=ttype)
 
 
+    # --------------------------------------------------------------------------
+    #
+    @rus.takes   ('Directory')
+    @rus.returns (rus.anything)
+    def batch (self) :
+        """
+        Returns a context manager, within which the copies issued on this
+        directory (in the calling thread) are collected, and are submitted
+        together when the context is left -- for adaptors which support
+        batched transfers::
+
+            with dir.batch () :
+                for f in files :
+                    dir.copy (f, "go://remote/data/")
+        """
+
+        return self._adaptor.batch ()
+
+
     size  = property (get_size)  # int
 
     
@@ -214,7 +214,7 @@ class File (nsentry.Entry) :
     @rus.takes   ('File', 
                   rus.list_of  (rus.tuple_of (int)),
                   rus.optional (rus.one_of (SYNC, ASYNC, TASK)))
-    @rus.returns ((basestring, st.Task))
+    @rus.returns ((rus.list_of (basestring), st.Task))
     def read_v   (self, iovecs, ttype=None) :
         '''
         iovecs:   list [tuple (int, int)]
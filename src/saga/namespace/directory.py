@@ -354,6 +354,48 @@ class Directory (entry.Entry) :
         else      :  return self._nsentry.copy (url_1,        flags, ttype=ttype)
 
     
+    # --------------------------------------------------------------------------
+    #
+    @rus.takes   ('Directory', 
+                  list,
+                  rus.optional (int, rus.nothing),
+                  rus.optional (int, rus.nothing),
+                  rus.optional (rus.one_of (SYNC, ASYNC, TASK)))
+    @rus.returns ((dict, st.Task))
+    def copy_many (self, copies, flags=0, concurrency=None, ttype=None) :
+        '''
+        :param copies:      list of (src, tgt) tuples
+        :param concurrency: maximum number of concurrent transfers
+
+        copies:        list [tuple (saga.Url, saga.Url)]
+        flags:         flags enum / None
+        concurrency:   int / None
+        ttype:         saga.task.type enum / None
+        ret:           dict / saga.Task
+
+        Copy a set of entries, with bounded parallelism.  Each (src, tgt) pair
+        has the same semantics as for :func:`copy`, and the same flags apply
+        to all of them.  Failing copies do not stop the others.  The returned
+        dict contains a list of per-item results (in order of `copies`) under
+        `results`, and aggregate metrics::
+
+            # copy a set of files
+            dir = saga.namespace.Directory("sftp://localhost/tmp/")
+            ret = dir.copy_many ([["./a.dat", "sftp://remote/data/"],
+                                  ["./b.dat", "sftp://remote/data/"]],
+                                 concurrency=4)
+
+            for res in ret['results'] :
+                if not res['ok'] :
+                    print "%s failed: %s" % (res['src'], res['error'])
+
+            print "%(copied)d files copied in %(time).1fs" % ret
+        '''
+
+        if  not flags : flags = 0
+        return self._adaptor.copy_many (copies, flags, concurrency, ttype=ttype)
+
+  
     # --------------------------------------------------------------------------
     #
     @rus.takes   ('Directory', 
@@ -195,6 +195,58 @@ class LogicalDirectory (nsdir.Directory, sa.Attributes) :
         if attr_pattern  :  return self._adaptor.find_replicas (name_pattern, attr_pattern, flags, ttype=ttype)
         else             :  return self._nsdirec.find          (name_pattern,               flags, ttype=ttype)
 
+
+    # --------------------------------------------------------------------------
+    # non-GFD.90
+    #
+    @rus.takes   ('LogicalDirectory', 
+                  rus.list_of ((surl.Url, basestring)), 
+                  (surl.Url, basestring), 
+                  rus.optional (int, rus.nothing),
+                  rus.optional (rus.one_of (SYNC, ASYNC, TASK)))
+    @rus.returns ((rus.nothing, st.Task))
+    def replicate (self, tgts, name, flags=None, ttype=None) :
+        '''
+        replicate(tgts, name, flags=None)
+
+        Replicate many logical files (or, with RECURSIVE, directories) in
+        one bulk operation.
+
+        tgts:           list [saga.Url], relative to this directory
+        name:           saga.Url
+        flags:          flags enum
+        ttype:          saga.task.type enum
+        ret:            None / saga.Task
+        '''
+        if not flags : flags = 0
+        tgt_urls = [surl.Url (tgt) for tgt in tgts]
+        return self._adaptor.replicate (tgt_urls, name, flags, ttype=ttype)
+
+
+    # --------------------------------------------------------------------------
+    # non-GFD.90
+    #
+    @rus.takes   ('LogicalDirectory', 
+                  (surl.Url, basestring), 
+                  rus.optional ((surl.Url, basestring)),
+                  rus.optional (int, rus.nothing),
+                  rus.optional (rus.one_of (SYNC, ASYNC, TASK)))
+    @rus.returns ((rus.nothing, st.Task))
+    def upload (self, name, tgt=None, flags=None, ttype=None) :
+        '''
+        upload(name, tgt=None, flags=None)
+
+        Upload a physical directory tree into this logical directory.
+
+        name:           saga.Url
+        tgt:            saga.Url
+        flags:          flags enum
+        ttype:          saga.task.type enum
+        ret:            None / saga.Task
+        '''
+        if not flags : flags = 0
+        return self._adaptor.upload (name, tgt, flags, ttype=ttype)
+
     
 
 
@@ -14,6 +14,8 @@ import saga.engine.engine
 import saga.context
 import saga.base
 
+import saga.utils.transfer_scheduler as sts
+
 
 
 # ------------------------------------------------------------------------------
@@ -181,12 +183,15 @@ class Session (saga.base.SimpleBase) :
         # shared list of the default session singleton.  Otherwise, we create
         # a private list which is not populated.
 
-        # a session also has a lease manager, for adaptors in this session to use.
+        # a session also has a lease manager, for adaptors in this session to
+        # use, and a transfer scheduler which coordinates the data transfers of
+        # those adaptors.
 
         if  default :
             default_session     = DefaultSession (uid=self._id)
             self.contexts       = copy.deepcopy(default_session.contexts)
             self._lease_manager = default_session._lease_manager
+            self._transfer_scheduler = default_session._transfer_scheduler
         else :
             self.contexts       = _ContextList (session=self)
 
@@ -201,6 +206,13 @@ class Session (saga.base.SimpleBase) :
                     max_obj_age   = config['connection_pool_ttl'].get_value ()
                     )
 
+            config = self.get_config ('saga.utils.transfer')
+            self._transfer_scheduler = sts.TransferScheduler (
+                    max_streams_per_host = config['max_streams_per_host'].get_value (),
+                    max_streams          = config['max_streams'].get_value (),
+                    logger               = self._logger
+                    )
+
 
     # ----------------------------------------------------------------
     #
@@ -276,6 +288,24 @@ class Session (saga.base.SimpleBase) :
         return saga.engine.engine.Engine ().get_config (section)
 
 
+    # ----------------------------------------------------------------
+    #
+    @rus.takes   ('Session')
+    @rus.returns (dict)
+    def get_transfer_metrics (self) :
+        """
+        ret:     dict
+
+        Return metrics of the data transfers run by adaptors in this session:
+        the number of `queued` and `active` transfers, `bytes_in_flight`,
+        `bytes_done`, `throughput` (bytes/second over the last minute),
+        `queue_wait` and `queue_wait_max` (seconds transfers waited to be
+        started), and the number of active transfer `streams` per host.
+        """
+
+        return self._transfer_scheduler.get_metrics ()
+
+
 
 # ------------------------------------------------------------------------------
 #
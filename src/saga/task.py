@@ -99,7 +99,7 @@ class Task (sbase.SimpleBase, satt.Attributes) :
         # check if this task is supposed to wrap a callable in a future
         if  '_call'   in self._method_context :
 
-            call   = self._method_context['call']
+            call   = self._method_context['_call']
             args   = self._method_context.get('_args',   list())
             kwargs = self._method_context.get('_kwargs', dict())
 
@@ -0,0 +1,125 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+''' Provides a class which merges job state queries into bulk queries.
+'''
+
+import time
+import threading
+
+
+# ------------------------------------------------------------------------------
+#
+class _Batch(object):
+
+    def __init__(self):
+
+        self.ids     = set()
+        self.results = dict()
+        self.error   = None
+        self.event   = threading.Event()
+
+
+# ------------------------------------------------------------------------------
+#
+class StateCoalescer(object):
+    '''
+    Batch job adaptors usually query job states one job at a time, via some
+    scheduler command line tool.  Most of those tools accept multiple job IDs
+    though.  The StateCoalescer merges state queries which arrive concurrently
+    (within a short time window) into a single query for all IDs, and fans the
+    results back out to the individual callers.
+
+    An adaptor supplies two hooks:
+
+      - `query(ids)`     : run one scheduler query for the given list of
+                           (backend) job IDs, and return its output
+      - `parse(out, ids)`: parse that output, and return a dict which maps
+                           those IDs to whatever info the adaptor needs.  IDs
+                           which are not found in the output are left out.
+
+    `get(id)` then blocks for at most `window` seconds plus the time of one
+    query, and returns the info for that ID (or `None`).  `get_many(ids)` runs
+    the query for the given IDs right away -- this is what job monitoring
+    threads would use for all jobs they watch.  Queries are split in chunks of
+    at most `max_ids` IDs, to stay clear of command line limits.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, query, parse, window=0.1, max_ids=500, logger=None):
+
+        self._query   = query
+        self._parse   = parse
+        self._window  = window
+        self._max_ids = max_ids
+        self._logger  = logger
+
+        self._lock    = threading.Lock()
+        self._batch   = None
+
+
+    # --------------------------------------------------------------------------
+    #
+    def get(self, id):
+
+        with self._lock:
+
+            batch  = self._batch
+            leader = batch is None
+
+            if leader:
+                batch       = _Batch()
+                self._batch = batch
+
+            batch.ids.add(id)
+
+        if leader:
+
+            # collect more IDs for a bit, then close the batch and run it
+            if self._window:
+                time.sleep(self._window)
+
+            with self._lock:
+                self._batch = None
+
+            try:
+                batch.results = self.get_many(list(batch.ids))
+            except Exception as e:
+                batch.error = e
+            finally:
+                batch.event.set()
+
+        else:
+            batch.event.wait()
+
+        if batch.error:
+            raise batch.error
+
+        return batch.results.get(id)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def get_many(self, ids):
+
+        ids     = list(ids)
+        results = dict()
+
+        for i in range(0, len(ids), self._max_ids):
+
+            chunk = ids[i:i + self._max_ids]
+
+            if self._logger:
+                self._logger.debug("bulk state query for %d ids" % len(chunk))
+
+            out = self._query(chunk)
+            results.update(self._parse(out, chunk))
+
+        return results
+
+
+# ------------------------------------------------------------------------------
+
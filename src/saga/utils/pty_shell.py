@@ -8,6 +8,7 @@ import re
 import os
 import sys
 import errno
+import base64
 import tempfile
 
 import saga.utils.misc              as sumisc
@@ -42,6 +43,75 @@ STDERR   = 4    # fetch stderr only, discard stdout
 #
 DEFAULT_PROMPT = "[\$#%>\]]\s*$"
 
+# ------------------------------------------------------------------------------
+#
+# stream transfers: data are base64 encoded and pasted into the shell as here
+# documents, in chunks of _STREAM_CHUNK bytes.  We try the encoders listed in
+# _STREAM_CODECS (as (encode, decode) commands) until one works on the remote
+# side.  Lines are kept at 64 characters, so that 'openssl base64' can cope.
+#
+_STREAM_CHUNK  = 1024 * 1024
+_STREAM_LINE   = 48               # raw bytes per line (64 chars encoded)
+_STREAM_EOF    = 'SAGA_STREAM_EOF'
+_STREAM_CODECS = [['base64',         'base64 -d'        ],
+                  ['base64',         'base64 -D'        ],
+                  ['openssl base64', 'openssl base64 -d']]
+
+# ------------------------------------------------------------------------------
+#
+# multi-file copies: at most that many files are passed to a single copy
+# command
+#
+_COPY_MANY_MAX = 100
+
+# ------------------------------------------------------------------------------
+#
+# tar flags for the supported tree copy compression modes
+#
+_TAR_COMPRESSION = {None    : '',
+                    'none'  : '',
+                    'gzip'  : 'z',
+                    'bzip2' : 'j',
+                    'xz'    : 'J'}
+
+
+# ------------------------------------------------------------------------------
+#
+def _group_copies (pairs) :
+    """
+    Sort a list of (src, tgt) copy requests into groups which can be handled by
+    a single multi-file copy command -- i.e. copies which keep the file name,
+    and go into the same target directory.  Returns a list of (tgt_dir, [srcs])
+    tuples (in request order), and a list of the (src, tgt) pairs which cannot
+    be grouped (renames, wildcards).
+    """
+
+    groups  = dict()
+    order   = list()
+    singles = list()
+
+    for src, tgt in pairs :
+
+        name = os.path.basename (src.rstrip ('/'))
+
+        if  not name or re.search (r'[\*\?\[]', src) :
+            singles.append ([src, tgt])
+            continue
+
+        if    tgt.endswith ('/')                  : tgt_dir = tgt.rstrip ('/') or '/'
+        elif  os.path.basename (tgt) == name      : tgt_dir = os.path.dirname (tgt)
+        else :
+            singles.append ([src, tgt])
+            continue
+
+        if  tgt_dir not in groups :
+            groups[tgt_dir] = list()
+            order.append (tgt_dir)
+
+        groups[tgt_dir].append (src)
+
+    return [[tgt_dir, groups[tgt_dir]] for tgt_dir in order], singles
+
 
 # --------------------------------------------------------------------
 #
@@ -207,6 +277,8 @@ class PTYShell (object) :
         self.interactive = interactive # bash -i ?
         self.latency     = 0.0         # set by factory
         self.cp_slave    = None        # file copy channel
+        self.codec       = None        # stream transfer codec (lazy)
+        self.submitter   = None        # owner of transfers, for scheduling
 
         self.initialized = False
 
@@ -226,6 +298,14 @@ class PTYShell (object) :
         self.prompt_re = re.compile ("^(.*?)%s" % self.prompt, re.DOTALL)
         self.logger.info ("PTY prompt pattern: %s" % self.prompt)
 
+        # use stream transfers for write_to_remote / read_from_remote?
+        if 'stream_transfer' in self.options:
+            self.stream = self.options['stream_transfer']
+        elif 'stream_transfer' in self.cfg:
+            self.stream = self.cfg['stream_transfer'].get_value ()
+        else:
+            self.stream = True
+
         # we need a local dir for file staging caches.  At this point we use
         # $HOME, but should make this configurable (FIXME)
         self.base = os.environ['HOME'] + '/.saga/adaptors/shell/'
@@ -795,12 +875,77 @@ class PTYShell (object) :
             except Exception as e :
                 raise ptye.translate_exception (e)
 
+    # ----------------------------------------------------------------
+    #
+    def _get_codec (self) :
+        """
+        Find an encoder/decoder pair for stream transfers on the remote side,
+        and cache it.  Returns `None` if stream transfers are disabled or not
+        supported by the remote host.
+        """
+
+        with self.pty_shell.rlock :
+
+            if  not self.stream :
+                return None
+
+            if  self.codec is None :
+
+                self.codec = False
+
+                for enc, dec in _STREAM_CODECS :
+                    ret, out, _ = self.run_sync (" printf 'c2FnYQ==\\n' | %s 2>/dev/null" % dec)
+                    if  ret == 0 and out.strip () == 'saga' :
+                        self.codec = [enc, dec]
+                        break
+
+                if  not self.codec :
+                    self.logger.warn ("no stream transfer codec, using staging")
+
+            return self.codec or None
+
+
+    # ----------------------------------------------------------------
+    #
+    def _run_stream (self, command, data) :
+        """
+        Run a command which reads the given (raw) data from a here document.
+        The data are base64 encoded.  This is a stripped down version of
+        run_sync() which does not log the payload.
+        """
+
+        with self.pty_shell.rlock :
+
+            self.pty_shell.flush ()
+
+            if not self.pty_shell.alive (recover=True) :
+                raise se.IncorrectState ("Can't run command -- shell died:\n%s" \
+                                      % self.pty_shell.autopsy ())
+
+            lines = [base64.b64encode (data[i:i+_STREAM_LINE])
+                     for i in range (0, len(data), _STREAM_LINE)]
+
+            self.logger.debug ('run_stream: %s (%d bytes)' % (command, len(data)))
+            self.pty_shell.write ("%s << '%s'\n%s\n%s\n" \
+                                 % (command, _STREAM_EOF, '\n'.join (lines),
+                                    _STREAM_EOF), nolog=True)
+
+            fret, match = self.pty_shell.find ([self.prompt], timeout=-1.0)  # blocks
+
+            if  fret == None :
+                self.finalize (kill_pty=True)
+                raise se.IncorrectState ("run_stream failed, no prompt (%s)" % command)
+
+            return self._eval_prompt (match)
+
+
     # ----------------------------------------------------------------
     #
     def write_to_remote (self, src, tgt) :
         """
-        :type  src: string
-        :param src: data to be staged into the target file
+        :type  src: string or iterable
+        :param src: data to be staged into the target file, or an iterable
+                    (such as a generator) which yields the data in chunks
 
         :type  tgt: string
         :param tgt: path to target file to staged to
@@ -811,6 +956,10 @@ class PTYShell (object) :
         on the remote system.  If that file exists, it is overwritten.
         A NoSuccess exception is raised if writing the file was not possible
         (missing permissions, incorrect path, etc.).
+
+        By default, the data are streamed over the shell connection (see
+        `stream_transfer` option), without local temp files.  If the remote
+        host does not support that, the data are staged via the copy channel.
         """
 
         try :
@@ -820,9 +969,45 @@ class PTYShell (object) :
             # FIXME: make this relative to the shell's pwd?  Needs pwd in
             # prompt, and updating pwd state on every find_prompt.
 
-            # first, write data into a tmp file
+            if  isinstance (src, basestring) :
+                chunks = [src[i:i+_STREAM_CHUNK]
+                          for i in range (0, len(src), _STREAM_CHUNK)] or ['']
+            else :
+                chunks = src
+
+            codec = self._get_codec ()
+
+            if  codec :
+
+                with self.pty_shell.rlock :
+
+                    redir = '>'
+                    for chunk in chunks :
+
+                        if  isinstance (chunk, unicode) :
+                            chunk = chunk.encode ('utf-8')
+
+                        ret, out = self._run_stream ("%s %s '%s'" % (codec[1], redir, tgt), chunk)
+                        if  ret :
+                            raise se.NoSuccess ("write to remote file %s failed (%s): %s" \
+                                             % (tgt, ret, out))
+                        redir = '>>'
+
+                    # empty iterables still create the file
+                    if  redir == '>' :
+                        ret, out, _ = self.run_sync (" : > '%s'" % tgt)
+                        if  ret :
+                            raise se.NoSuccess ("write to remote file %s failed (%s): %s" \
+                                             % (tgt, ret, out))
+
+                return list()
+
+            # no streaming: write data into a tmp file, and stage it
             fhandle, fname = tempfile.mkstemp(suffix='.tmp', prefix='rs_pty_staging_')
-            os.write(fhandle, src)
+            for chunk in chunks :
+                if  isinstance (chunk, unicode) :
+                    chunk = chunk.encode ('utf-8')
+                os.write(fhandle, chunk)
             os.fsync(fhandle)
             os.close(fhandle)
 
@@ -844,6 +1029,9 @@ class PTYShell (object) :
         :param src: path to source file to staged from
                     The src path is not an URL, but expected to be a path
                     relative to the shell's URL.
+
+        Like write_to_remote(), this streams the data over the shell
+        connection if possible, and falls back to staging otherwise.
         """
 
         try :
@@ -853,6 +1041,20 @@ class PTYShell (object) :
             # FIXME: make this relative to the shell's pwd?  Needs pwd in
             # prompt, and updating pwd state on every find_prompt.
 
+            codec = self._get_codec ()
+
+            if  codec :
+
+                ret, out, _ = self.run_sync (" test -r '%s' && %s < '%s'" \
+                                           % (src, codec[0], src))
+                if  ret :
+                    raise se.DoesNotExist ("cannot read remote file %s (%s): %s" \
+                                        % (src, ret, out))
+                try :
+                    return base64.b64decode (''.join (out.split ()))
+                except Exception as e :
+                    raise se.NoSuccess ("cannot decode remote file %s: %s" % (src, e))
+
             # first, write data into a tmp file
             fhandle, fname = tempfile.mkstemp(suffix='.tmp', prefix='rs_pty_staging_')
             _ = self.stage_from_remote (src, fname)
@@ -872,6 +1074,27 @@ class PTYShell (object) :
             raise ptye.translate_exception (e)
 
 
+    # ----------------------------------------------------------------
+    #
+    def _transfer (self, srcs=None) :
+        """
+        Return the session's transfer scheduler slot for a transfer from / to
+        this shell's host.  For local sources, the transfer size is announced.
+        """
+
+        size = None
+        if  srcs :
+            try :
+                size = sum ([os.path.getsize (src) for src in srcs])
+            except OSError :
+                pass
+
+        host = surl.Url (self.url).host or 'localhost'
+
+        return self.session._transfer_scheduler.transfer (host, size=size,
+                                                          submitter=self.submitter)
+
+
     # ----------------------------------------------------------------
     #
     def stage_to_remote (self, src, tgt, cp_flags=None) :
@@ -893,7 +1116,8 @@ class PTYShell (object) :
         # prompt, and updating pwd state on every find_prompt.
 
         try :
-            return self.run_copy_to (src, tgt, cp_flags)
+            with self._transfer ([src]) :
+                return self.run_copy_to (src, tgt, cp_flags)
 
         except Exception as e :
             raise ptye.translate_exception (e)
@@ -920,11 +1144,266 @@ class PTYShell (object) :
         # prompt, and updating pwd state on every find_prompt.
 
         try :
-            return self.run_copy_from (src, tgt, cp_flags)
+            with self._transfer () :
+                return self.run_copy_from (src, tgt, cp_flags)
+
+        except Exception as e :
+            raise ptye.translate_exception (e)
+
+    # ----------------------------------------------------------------
+    #
+    def stage_to_remote_many (self, pairs, cp_flags=None) :
+        """
+        :type  pairs: list
+        :param pairs: list of (src, tgt) tuples, with the same semantics as
+                      for stage_to_remote()
+
+        Stage a set of files in as few copy operations as possible.
+        """
+
+        self._trace ("stage to  : %d files" % len(pairs))
+
+        try :
+            with self._transfer ([src for src, _ in pairs]) :
+                return self.run_copy_many_to (pairs, cp_flags)
+
+        except Exception as e :
+            raise ptye.translate_exception (e)
+
+
+    # ----------------------------------------------------------------
+    #
+    def stage_from_remote_many (self, pairs, cp_flags="") :
+        """
+        :type  pairs: list
+        :param pairs: list of (src, tgt) tuples, with the same semantics as
+                      for stage_from_remote()
+
+        Stage a set of files in as few copy operations as possible.
+        """
+
+        self._trace ("stage from: %d files" % len(pairs))
+
+        try :
+            with self._transfer () :
+                return self.run_copy_many_from (pairs, cp_flags)
+
+        except Exception as e :
+            raise ptye.translate_exception (e)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _run_copy_many (self, direction, pairs, cp_flags) :
+        """
+        Copy modes which use an interactive copy slave (sftp, sh) keep that
+        slave alive, and just run one copy after the other on it.  Other modes
+        (scp) would spawn a new process per file -- for those, we group the
+        files by target directory, and run one copy command per group.
+        """
+
+        if  cp_flags is None :
+            cp_flags = ''
+
+        info    = self.pty_info
+        scripts = info['scripts'][info['copy_mode']]
+        files   = list()
+
+        if  direction == 'to' : copy_one = self.run_copy_to
+        else                  : copy_one = self.run_copy_from
+
+        if  'copy_many_%s' % direction not in scripts :
+            for src, tgt in pairs :
+                files += copy_one (src, tgt, cp_flags)
+            return files
+
+        groups, singles = _group_copies (pairs)
+
+        with self.pty_shell.rlock :
+
+            for tgt_dir, srcs in groups :
+
+                for i in range (0, len(srcs), _COPY_MANY_MAX) :
+
+                    chunk = srcs[i:i + _COPY_MANY_MAX]
+
+                    # a trailing slash makes sure that the target is
+                    # a directory, also for single files
+                    tgt = tgt_dir
+                    if  tgt and not tgt.endswith ('/') :
+                        tgt += '/'
+
+                    if  direction == 'to' :
+                        quoted = ['"%s"' % src for src in chunk]
+                    else :
+                        quoted = ['"%s%s"' % (info['scp_root'], src) for src in chunk]
+                        tgt    = tgt or './'
+
+                    repl  = dict ({'srcs'     : ' '.join (quoted),
+                                   'tgt'      : tgt,
+                                   'cp_flags' : cp_flags}.items () + info.items ())
+                    s_cmd = scripts['copy_many_%s' % direction] % repl
+
+                    self._trace ("copy many : %s" % s_cmd)
+
+                    cp_proc = supp.PTYProcess (s_cmd)
+                    out     = cp_proc.wait ()
+                    if  cp_proc.exit_code :
+                        raise ptye.translate_exception (se.NoSuccess ("file copy failed: %s" % out))
+
+                    files += chunk
+
+            for src, tgt in singles :
+                copy_one (src, tgt, cp_flags)
+                files.append (src)
+
+        info['logger'].debug ("copy done: %s" % files)
+
+        return files
+
+
+    # --------------------------------------------------------------------------
+    #
+    def run_copy_many_to (self, pairs, cp_flags=None) :
+        """
+        Like run_copy_to(), but for a list of (src, tgt) tuples.
+        """
+
+        return self._run_copy_many ('to', pairs, cp_flags)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def run_copy_many_from (self, pairs, cp_flags="") :
+        """
+        Like run_copy_from(), but for a list of (src, tgt) tuples.
+        """
+
+        return self._run_copy_many ('from', pairs, cp_flags)
+
+
+    # ----------------------------------------------------------------
+    #
+    def stage_tree_to_remote (self, src, tgt, compression=None) :
+        """
+        :type  src: string
+        :param src: path of a local directory to be staged.
+
+        :type  tgt: string
+        :param tgt: path of the target on the remote host, relative to the
+                    shell's URL.
+
+        :type  compression: string
+        :param compression: one of `none`, `gzip`, `bzip2`, `xz`
+
+        Copy a complete directory tree as a single tar stream, which makes the
+        transfer of many small files about as fast as the connection allows.
+        Like `cp -r`, `src` is copied *into* `tgt` if that is an existing
+        directory, and to `tgt` otherwise.
+        """
+
+        self._trace ("tree to   : %s -> %s" % (src, tgt))
+
+        try :
+            if  not os.path.isdir (src) :
+                raise se.BadParameter ("tree copy source is not a directory: %s" % src)
+
+            ret, _, _ = self.run_sync (" test -d '%s'" % tgt)
+
+            with self._transfer () :
+                return self._run_tar ('tar_to', src, tgt, ret == 0, compression)
 
         except Exception as e :
             raise ptye.translate_exception (e)
 
+
+    # ----------------------------------------------------------------
+    #
+    def stage_tree_from_remote (self, src, tgt, compression=None) :
+        """
+        :type  src: string
+        :param src: path of a remote directory to be staged, relative to the
+                    shell's URL.
+
+        :type  tgt: string
+        :param tgt: path of the local target.
+
+        :type  compression: string
+        :param compression: one of `none`, `gzip`, `bzip2`, `xz`
+
+        The reverse of stage_tree_to_remote().
+        """
+
+        self._trace ("tree from : %s -> %s" % (src, tgt))
+
+        try :
+            ret, _, _ = self.run_sync (" test -d '%s'" % src)
+            if  ret :
+                raise se.BadParameter ("tree copy source is not a directory: %s" % src)
+
+            with self._transfer () :
+                return self._run_tar ('tar_from', src, tgt, os.path.isdir (tgt),
+                                      compression)
+
+        except Exception as e :
+            raise ptye.translate_exception (e)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _run_tar (self, mode, src, tgt, tgt_exists, compression) :
+
+        if  compression not in _TAR_COMPRESSION :
+            raise se.BadParameter ("unknown tree copy compression '%s'" % compression)
+
+        info = self.pty_info
+
+        # an existing target dir gets src as subdir, otherwise the content of
+        # src goes into (a new) tgt
+        src = src.rstrip ('/') or '/'
+        if  tgt_exists :
+            src_dir  = os.path.dirname  (src) or '.'
+            src_name = os.path.basename (src)
+        else :
+            src_dir  = src
+            src_name = '.'
+
+        # the pipeline only reports the exit code of the receiving side -- the
+        # sending side reports its exit code via a status file
+        handle, status = tempfile.mkstemp (prefix='saga-tar-status-')
+        os.close (handle)
+
+        try :
+            repl  = dict (info.items () + {'src_dir'   : src_dir,
+                                           'src_name'  : src_name,
+                                           'tgt'       : tgt,
+                                           'status'    : status,
+                                           'tar_flags' : _TAR_COMPRESSION[compression]
+                                          }.items ())
+            s_cmd = info['scripts'][info['shell_type']][mode] % repl
+
+            self._trace ("tar copy  : %s" % s_cmd)
+
+            # the tar stream does not go through the pty, but through the pipe
+            # between the two tar processes -- so we need a shell for that pipe.
+            cp_proc = supp.PTYProcess (['/bin/sh', '-c', s_cmd])
+            out     = cp_proc.wait ()
+            if  cp_proc.exit_code :
+                raise se.NoSuccess ("tree copy failed: %s" % out)
+
+            with open (status) as f :
+                sender = f.read ().strip ()
+
+            if  sender != '0' :
+                raise se.NoSuccess ("tree copy failed, sender exited with %s: %s" \
+                                 % (sender or 'unknown status', out))
+
+        finally :
+            os.unlink (status)
+
+        return list()
+
+
     # --------------------------------------------------------------------------
     #
     def run_copy_to (self, src, tgt, cp_flags=None) :
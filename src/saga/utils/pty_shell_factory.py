@@ -71,13 +71,22 @@ _SCRIPTS = {
     'ssh' : {
         'master'       : '%(ssh_env)s "%(ssh_exe)s" %(ssh_args)s %(m_flags)s %(host_str)s',
         'shell'        : '%(ssh_env)s "%(ssh_exe)s" %(ssh_args)s %(s_flags)s %(host_str)s',
-        'copy_is_posix': True
+        'copy_is_posix': True,
+        # directory trees as tar streams over the master connection (no pty).
+        # /bin/sh has no pipefail, so the exit code of the sending side is
+        # written to the 'status' file.
+        'tar_to'       : '{ tar -c%(tar_flags)sf - -C "%(src_dir)s" "%(src_name)s" ; echo $? > "%(status)s" ; } | %(ssh_env)s "%(ssh_exe)s" %(ssh_tar_args)s %(s_flags)s %(host_str)s "mkdir -p \'%(tgt)s\' && tar -x%(tar_flags)sf - -C \'%(tgt)s\'"',
+        'tar_from'     : '{ %(ssh_env)s "%(ssh_exe)s" %(ssh_tar_args)s %(s_flags)s %(host_str)s "tar -c%(tar_flags)sf - -C \'%(src_dir)s\' \'%(src_name)s\'" ; echo $? > "%(status)s" ; } | { mkdir -p "%(tgt)s" && tar -x%(tar_flags)sf - -C "%(tgt)s" ; }'
     },
     'scp' : {
         'copy_to'      : '%(scp_env)s "%(scp_exe)s" %(scp_args)s %(s_flags)s %(cp_flags)s "%(src)s" "%(scp_root)s%(tgt)s"',
         'copy_from'    : '%(scp_env)s "%(scp_exe)s" %(scp_args)s %(s_flags)s %(cp_flags)s "%(scp_root)s%(src)s" "%(tgt)s"',
         'copy_to_in'   : '',
         'copy_from_in' : '',
+        # multi-file copies: 'srcs' is a list of quoted (and, for copy_from,
+        # scp_root prefixed) source paths, 'tgt' the target directory
+        'copy_many_to'  : '%(scp_env)s "%(scp_exe)s" %(scp_args)s %(s_flags)s %(cp_flags)s %(srcs)s "%(scp_root)s%(tgt)s"',
+        'copy_many_from': '%(scp_env)s "%(scp_exe)s" %(scp_args)s %(s_flags)s %(cp_flags)s %(srcs)s "%(tgt)s"',
         'copy_is_posix': False
     },
     'sftp' : {
@@ -94,7 +103,9 @@ _SCRIPTS = {
         'copy_from'    : '%(sh_env)s "%(sh_exe)s"  %(sh_args)s',
         'copy_to_in'   : 'cd ~ && "%(cp_exe)s" -v %(cp_flags)s "%(src)s" "%(tgt)s"',
         'copy_from_in' : 'cd ~ && "%(cp_exe)s" -v %(cp_flags)s "%(src)s" "%(tgt)s"',
-        'copy_is_posix': True
+        'copy_is_posix': True,
+        'tar_to'       : 'cd ~ && { tar -c%(tar_flags)sf - -C "%(src_dir)s" "%(src_name)s" ; echo $? > "%(status)s" ; } | { mkdir -p "%(tgt)s" && tar -x%(tar_flags)sf - -C "%(tgt)s" ; }',
+        'tar_from'     : 'cd ~ && { tar -c%(tar_flags)sf - -C "%(src_dir)s" "%(src_name)s" ; echo $? > "%(status)s" ; } | { mkdir -p "%(tgt)s" && tar -x%(tar_flags)sf - -C "%(tgt)s" ; }'
     }
 }
 
@@ -586,6 +597,7 @@ class PTYShellFactory (object) :
                 info['scp_env']   =  "/usr/bin/env TERM=vt100 "  # avoid ansi escapes
                 info['sftp_env']  =  "/usr/bin/env TERM=vt100 "  # avoid ansi escapes
                 info['ssh_args']  =  "-t "                       # force pty
+                info['ssh_tar_args'] = "-T "                     # binary stream, no pty
                 info['scp_args']  =  _SCP_FLAGS
                 info['sftp_args'] =  _SFTP_FLAGS
 
@@ -604,6 +616,7 @@ class PTYShellFactory (object) :
 
                                 if  context.attribute_exists ("user_key")  and  context.user_key  :
                                     info['ssh_args']  += "-o IdentityFile=%s " % context.user_key
+                                    info['ssh_tar_args'] += "-o IdentityFile=%s " % context.user_key
                                     info['scp_args']  += "-o IdentityFile=%s " % context.user_key
                                     info['sftp_args'] += "-o IdentityFile=%s " % context.user_key
 
@@ -642,6 +655,7 @@ class PTYShellFactory (object) :
 
                 if url.port and url.port != -1 :
                     info['ssh_args']  += "-o Port=%d " % int(url.port)
+                    info['ssh_tar_args'] += "-o Port=%d " % int(url.port)
                     info['scp_args']  += "-o Port=%d " % int(url.port)
                     info['sftp_args'] += "-o Port=%d " % int(url.port)
 
@@ -0,0 +1,323 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+''' Provides a session wide scheduler for data transfers.
+'''
+
+import time
+import threading
+import collections
+
+
+# ------------------------------------------------------------------------------
+#
+_THROUGHPUT_WINDOW = 60.0   # seconds over which throughput is averaged
+
+
+# ------------------------------------------------------------------------------
+#
+class _Ticket(object):
+
+    def __init__(self, seq, host, size, submitter, priority):
+
+        self.seq       = seq
+        self.host      = host
+        self.size      = size
+        self.submitter = submitter
+        self.priority  = priority
+        self.queued    = time.time()
+        self.started   = None
+        self.granted   = False
+        self.nbytes    = 0
+
+
+# ------------------------------------------------------------------------------
+#
+class _Slot(object):
+    '''
+    Context manager returned by `TransferScheduler.transfer()`.  Blocks on
+    `__enter__` until the transfer may start, and releases its stream on
+    `__exit__`.  `progress(n)` can be called to report transferred bytes --
+    otherwise, the announced size is accounted once the transfer completed.
+    '''
+
+    def __init__(self, scheduler, ticket):
+
+        self._scheduler = scheduler
+        self._ticket    = ticket
+
+    def __enter__(self):
+
+        if  self._ticket:
+            self._scheduler._acquire(self._ticket)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        if  self._ticket:
+            self._scheduler._release(self._ticket, failed=exc_type is not None)
+
+        return False
+
+    def progress(self, nbytes):
+
+        if  self._ticket:
+            self._scheduler._progress(self._ticket, nbytes)
+
+
+# ------------------------------------------------------------------------------
+#
+class TransferScheduler(object):
+    '''
+    Data transfers of all adaptors in a session go through the session's
+    TransferScheduler.  It limits the number of concurrent transfer streams
+    per remote host (`max_streams_per_host`, to stay clear of sshd and
+    gridftp connection limits) and overall (`max_streams`, 0 for no limit), and
+    queues the remaining transfers.
+
+    Whenever a stream becomes free, the queued transfer with the highest
+    priority is started next.  The priority of a transfer is the priority
+    given to `transfer()`, plus the priority set for its submitter via
+    `set_priority()`.  Between transfers of equal priority, submitters with
+    fewer active transfers go first (so that a burst of transfers from one
+    submitter does not starve the others), and then the oldest transfer.
+
+    Usage::
+
+        with scheduler.transfer(host, size=nbytes, submitter=self) :
+            ... # do the transfer
+
+    Transfers are reentrant per thread: a nested `transfer()` for a host which
+    the calling thread already holds a stream for does not wait for another
+    stream.
+
+    `get_metrics()` returns a dict with the number of `queued` and `active`
+    transfers, `bytes_in_flight` (announced, but not yet transferred bytes of
+    active transfers), `bytes_done`, `throughput` (bytes/second over the last
+    minute), `queue_wait` and `queue_wait_max` (average and maximum time
+    transfers waited for a stream, in seconds), and the number of active
+    streams per host.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, max_streams_per_host=4, max_streams=0, logger=None):
+
+        self._max_host   = max_streams_per_host
+        self._max_total  = max_streams
+        self._logger     = logger
+
+        self._cond       = threading.Condition()
+        self._local      = threading.local()
+        self._seq        = 0
+
+        self._queue      = list()    # waiting tickets
+        self._active     = list()    # granted tickets
+        self._per_host   = dict()    # host      : active streams
+        self._per_sub    = dict()    # submitter : active streams
+        self._priorities = dict()    # submitter : priority
+
+        self._done       = collections.deque()  # [end time, nbytes] in throughput window
+        self._bytes_done = 0
+        self._waited     = 0.0
+        self._nwaited    = 0
+        self._wait_max   = 0.0
+
+
+    # --------------------------------------------------------------------------
+    #
+    def set_priority(self, submitter, priority):
+
+        with self._cond:
+            self._priorities[submitter] = priority
+            self._cond.notify_all()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def transfer(self, host, size=None, submitter=None, priority=0):
+        '''
+        Returns a context manager which guards a transfer from / to `host`.
+        '''
+
+        held = getattr(self._local, 'hosts', None)
+        if  held is None:
+            held = self._local.hosts = dict()
+
+        if  held.get(host):
+            # nested transfer -- already covered by the outer one
+            return _Slot(self, None)
+
+        with self._cond:
+            self._seq += 1
+            ticket = _Ticket(self._seq, host, size, submitter, priority)
+
+        return _Slot(self, ticket)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _can_start(self, ticket):
+
+        if  self._max_total and len(self._active) >= self._max_total:
+            return False
+
+        if  self._max_host and self._per_host.get(ticket.host, 0) >= self._max_host:
+            return False
+
+        return True
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _rank(self, ticket):
+
+        prio = ticket.priority + self._priorities.get(ticket.submitter, 0)
+
+        return (-prio, self._per_sub.get(ticket.submitter, 0), ticket.seq)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _schedule(self):
+        '''
+        grant streams to queued tickets, in order of their rank (call with
+        lock held)
+        '''
+
+        for ticket in sorted(self._queue, key=self._rank):
+
+            if  not self._can_start(ticket):
+                continue
+
+            self._queue.remove(ticket)
+            self._active.append(ticket)
+
+            self._per_host[ticket.host]      = self._per_host.get(ticket.host,      0) + 1
+            self._per_sub [ticket.submitter] = self._per_sub .get(ticket.submitter, 0) + 1
+
+            ticket.granted = True
+            ticket.started = time.time()
+
+            waited           = ticket.started - ticket.queued
+            self._waited    += waited
+            self._nwaited   += 1
+            self._wait_max   = max(self._wait_max, waited)
+
+        self._cond.notify_all()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _acquire(self, ticket):
+
+        with self._cond:
+
+            ticket.queued = time.time()
+            self._queue.append(ticket)
+            self._schedule()
+
+            if  not ticket.granted and self._logger:
+                self._logger.debug("transfer to %s queued (%d active)"
+                                  % (ticket.host, self._per_host.get(ticket.host, 0)))
+
+            while not ticket.granted:
+                self._cond.wait()
+
+        held = getattr(self._local, 'hosts', None)
+        if  held is None:
+            held = self._local.hosts = dict()
+        held[ticket.host] = held.get(ticket.host, 0) + 1
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _progress(self, ticket, nbytes):
+
+        with self._cond:
+            ticket.nbytes += nbytes
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _release(self, ticket, failed=False):
+
+        self._local.hosts[ticket.host] -= 1
+
+        with self._cond:
+
+            self._active.remove(ticket)
+
+            self._per_host[ticket.host] -= 1
+            if  not self._per_host[ticket.host]:
+                del(self._per_host[ticket.host])
+
+            self._per_sub[ticket.submitter] -= 1
+            if  not self._per_sub[ticket.submitter]:
+                del(self._per_sub[ticket.submitter])
+
+            nbytes = ticket.nbytes
+            if  not nbytes and not failed and ticket.size:
+                nbytes = ticket.size
+
+            now = time.time()
+            self._bytes_done += nbytes
+            self._done.append([now, nbytes])
+            self._prune(now)
+
+            self._schedule()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _prune(self, now):
+        """
+        drop completed transfers which left the throughput window (the caller
+        holds the lock)
+        """
+
+        while self._done and self._done[0][0] <= now - _THROUGHPUT_WINDOW:
+            self._done.popleft()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def get_metrics(self):
+
+        with self._cond:
+
+            now        = time.time()
+            self._prune(now)
+
+            in_flight  = 0
+            for ticket in self._active:
+                if  ticket.size:
+                    in_flight += max(0, ticket.size - ticket.nbytes)
+
+            # do not average over a window longer than we have been busy
+            window = _THROUGHPUT_WINDOW
+            starts = [t.started for t in self._active] + \
+                     [t.queued  for t in self._queue]
+            if  self._done:
+                starts.append(self._done[0][0])
+            if  starts:
+                window = max(1.0, min(window, now - min(starts)))
+
+            if  self._nwaited: wait = self._waited / self._nwaited
+            else             : wait = 0.0
+
+            return {'queued'          : len(self._queue),
+                    'active'          : len(self._active),
+                    'bytes_in_flight' : in_flight,
+                    'bytes_done'      : self._bytes_done,
+                    'throughput'      : sum([d[1] for d in self._done]) / window,
+                    'queue_wait'      : wait,
+                    'queue_wait_max'  : self._wait_max,
+                    'streams'         : dict(self._per_host)}
+
+
+# ------------------------------------------------------------------------------
+
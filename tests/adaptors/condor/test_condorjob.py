@@ -0,0 +1,490 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Tests for the event log reader, the bulk state queries and the stage cache
+    of saga.adaptors.condor.condorjob
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+import subprocess
+
+import radical.utils as ru
+
+import saga
+import saga.adaptors.condor.condorjob as condor
+
+
+# user log snippets as written by HTCondor: two jobs of cluster 123, where the
+# last event is cut off in the middle, as if condor was still writing it.
+_LOG_HEAD = """\
+000 (123.000.000) 09/27 07:08:30 Job submitted from host: <10.0.0.1:9618?addrs=10.0.0.1-9618&noUDP>
+...
+000 (123.001.000) 09/27 07:08:30 Job submitted from host: <10.0.0.1:9618?addrs=10.0.0.1-9618&noUDP>
+...
+001 (123.000.000) 09/27 07:08:42 Job executing on host: <10.0.0.5:9618?addrs=10.0.0.5-9618&noUDP>
+...
+"""
+
+_LOG_TERM = """\
+005 (123.000.000) 09/27 07:09:42 Job terminated.
+\t(1) Normal termination (return value 0)
+\t\tUsr 0 00:00:00, Sys 0 00:00:00  -  Run Remote Usage
+\t\tUsr 0 00:00:00, Sys 0 00:00:00  -  Run Local Usage
+\t0  -  Run Bytes Sent By Job
+\t0  -  Run Bytes Received By Job
+...
+"""
+
+_LOG_TAIL = """\
+001 (123.001.000) 09/27 07:09:50 Job executing on host: <10.0.0.6:9618?addrs=10.0.0.6-9618&noUDP>
+...
+005 (123.001.000) 09/27 07:10:50 Job terminated.
+\t(0) Abnormal termination (signal 9)
+\t(0) No core file
+...
+"""
+
+
+# ------------------------------------------------------------------------------
+#
+class _Shell (object) :
+    """ Runs commands locally, in `cwd` and with `bindir` first in the path,
+        and 'uploads' files by copying them
+    """
+
+    def __init__ (self, cwd=None, bindir=None) :
+        self.cwd     = cwd
+        self.env     = dict (os.environ)
+        self.uploads = list ()
+
+        if bindir :
+            self.env['PATH'] = "%s:%s" % (bindir, self.env.get ('PATH', ''))
+
+    def run_sync (self, cmd) :
+        proc = subprocess.Popen (cmd, shell=True, cwd=self.cwd, env=self.env,
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = proc.communicate ()
+        return proc.returncode, out, err
+
+    def stage_to_remote (self, src, tgt) :
+        self.uploads.append (tgt)
+        shutil.copy (src, os.path.join (self.cwd, tgt))
+
+
+# ------------------------------------------------------------------------------
+#
+class _CannedShell (object) :
+    """ Records commands, and returns canned output for them """
+
+    def __init__ (self, out='', ret=0) :
+        self.out  = out
+        self.ret  = ret
+        self.cmds = list ()
+
+    def run_sync (self, cmd) :
+        self.cmds.append (cmd)
+        return self.ret, self.out, ''
+
+
+# ------------------------------------------------------------------------------
+#
+class _Adaptor (object) :
+
+    parse_id = condor.Adaptor.__dict__['parse_id']
+
+    def __init__ (self) :
+        self.id_re    = re.compile ('^\[(.*)\]-\[(.*?)\]$')
+        self.use_hist = True
+
+
+# ------------------------------------------------------------------------------
+#
+class _Service (object) :
+    """ The parts of a job service used by the event log reader, the bulk
+        state queries and the stage cache
+    """
+
+    _read_event_log     = condor.CondorJobService.__dict__['_read_event_log']
+    _job_get_info_multi = condor.CondorJobService.__dict__['_job_get_info_multi']
+    _stage_cached       = condor.CondorJobService.__dict__['_stage_cached']
+    _run_copies         = condor.CondorJobService.__dict__['_run_copies']
+
+    def __init__ (self, event_log=None) :
+        self.rm            = saga.Url ('condor://localhost')
+        self.shell         = _Shell ()
+        self.condor_q      = _CannedShell ()
+        self._adaptor      = _Adaptor ()
+        self._commands     = {'condor_history' : 'condor_history'}
+        self.jobs          = dict ()
+        self.staged        = list ()
+        self._job_objs     = dict ()
+        self._event_log    = event_log
+        self._event_offset = 0
+        self._event_lock   = threading.RLock ()
+        self._hashes       = dict ()
+        self._staged       = set ()
+        self._logger       = ru.Logger ('radical.saga')
+
+    def job_id (self, pid) :
+        rm_clone = saga.Url (self.rm)
+        rm_clone.query = ""
+        rm_clone.path  = ""
+        return "[%s]-[%s]" % (rm_clone, pid)
+
+    def add_job (self, pid) :
+        job_id = self.job_id (pid)
+        self.jobs[job_id] = {'state' : saga.job.PENDING,
+                             'gone'  : False,
+                             'td'    : pid}
+        return self.jobs[job_id]
+
+    def _handle_file_transfers (self, td, mode) :
+        self.staged.append ((td, mode))
+
+    def _run_condor_q (self, retries=1, timeout=10,
+                       pid=None, options=None, egrep=None) :
+        return self.condor_q.run_sync (options)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_condor_parse_events () :
+    """ Test parsing of complete, truncated and unterminated user log events """
+
+    data = _LOG_HEAD + _LOG_TERM
+    events, consumed = condor._parse_condor_events (data)
+
+    assert (consumed == len (data))
+    assert ([e['code'] for e in events] == [0, 0, 1, 5])
+    assert ([e['pid']  for e in events] == ['123.0', '123.1', '123.0', '123.0'])
+    assert (events[2]['time'] == '09/27 07:08:42')
+    assert (events[3]['text'][0] == 'Job terminated.')
+    assert (events[3]['text'][1] == '(1) Normal termination (return value 0)')
+    assert (len (events[3]['text']) == 6)
+
+    # a truncated final event is not consumed, nor is an incomplete line
+    cut = _LOG_TERM.index ('\t0  -  Run Bytes Received')
+    for tail in [_LOG_TERM[:cut], _LOG_TERM[:cut + 5], _LOG_TERM[:-1]] :
+
+        events, consumed = condor._parse_condor_events (_LOG_HEAD + tail)
+
+        assert (consumed == len (_LOG_HEAD))
+        assert ([e['code'] for e in events] == [0, 0, 1])
+
+        # parsing resumes at the start of the truncated event
+        rest = (_LOG_HEAD + _LOG_TERM)[consumed:]
+        events, consumed = condor._parse_condor_events (rest)
+        assert (consumed == len (_LOG_TERM))
+        assert ([e['code'] for e in events] == [5])
+
+    # pty line endings, and noise between events
+    events, consumed = condor._parse_condor_events (
+                       'noise\r\n' + _LOG_TAIL.replace ('\n', '\r\n'))
+    assert ([e['code'] for e in events] == [1, 5])
+    assert (events[1]['text'][1] == '(0) Abnormal termination (signal 9)')
+
+    assert (condor._parse_condor_events ('') == ([], 0))
+
+
+# ------------------------------------------------------------------------------
+#
+def test_condor_read_event_log () :
+    """ Test that the event log is read incrementally, from the last offset """
+
+    tmp = tempfile.mkdtemp ()
+
+    try :
+        log = os.path.join (tmp, 'events.log')
+        svc = _Service (log)
+        j0  = svc.add_job ('123.0')
+        j1  = svc.add_job ('123.1')
+
+        # no log yet
+        svc._read_event_log ()
+        assert (svc._event_offset == 0)
+
+        # the terminate event of 123.0 is only partially written
+        cut = _LOG_TERM.index ('\t0  -  Run Bytes Sent')
+        with open (log, 'w') as f :
+            f.write (_LOG_HEAD + _LOG_TERM[:cut])
+
+        svc._read_event_log ()
+
+        assert (svc._event_offset == len (_LOG_HEAD))
+        assert (j0['state']       == saga.job.RUNNING)
+        assert (j0['create_time'] == '09/27 07:08:30')
+        assert (j0['start_time']  == '09/27 07:08:42')
+        assert (j0['exec_hosts']  == ['10.0.0.5'])
+        assert (j1['state']       == saga.job.PENDING)
+        assert (not svc.staged)
+
+        # nothing new: the offset stays in the middle of the file
+        svc._read_event_log ()
+        assert (svc._event_offset == len (_LOG_HEAD))
+        assert (j0['state']       == saga.job.RUNNING)
+
+        # the remainder arrives, followed by more events
+        with open (log, 'a') as f :
+            f.write (_LOG_TERM[cut:] + _LOG_TAIL)
+
+        svc._read_event_log ()
+
+        assert (svc._event_offset == os.path.getsize (log))
+        assert (j0['state']       == saga.job.DONE)
+        assert (j0['returncode']  == 0)
+        assert (j0['end_time']    == '09/27 07:09:42')
+        assert (j0['gone'])
+        assert (j1['state']       == saga.job.FAILED)
+        assert (j1['returncode']  == 1)
+        assert (j1['exec_hosts']  == ['10.0.0.6'])
+        assert (svc.staged == [('123.0', 'out'), ('123.1', 'out')])
+
+        # events are not parsed twice, and don't resurrect final jobs
+        with open (log, 'a') as f :
+            f.write (_LOG_HEAD)
+
+        svc._read_event_log ()
+        assert (svc._event_offset == os.path.getsize (log))
+        assert (j0['state']       == saga.job.DONE)
+        assert (len (svc.staged)  == 2)
+
+    finally :
+        shutil.rmtree (tmp)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_condor_get_info_multi () :
+    """ Test the bulk condor_q and condor_history queries and their parsing """
+
+    svc  = _Service ()
+    jobs = dict ()
+    for pid in ['123.0', '123.1', '124.0', '125.0', '126.0', '127.0'] :
+        jobs[pid] = svc.add_job (pid)
+    jobs['127.0']['gone'] = True
+
+    # condor_q knows cluster 123 and 124, and a proc we don't track
+    svc.condor_q.out = "123, 0, 2, 0, undefined, 0\n"              \
+                       "123, 1, 4, 0, false, 1506496182\n"         \
+                       "123, 2, 2, 0, undefined, 0\n"              \
+                       "-- Schedd: submit.example.org : <10.0.0.1:9618?...\n" \
+                       "124, 0, 4, , true, 1506496183\n"
+    svc.shell = _CannedShell ("125, 0, 3, false, 1506496182, 1506496100, "
+                              "1506496000, /tmp/job.err, /tmp/job.out\n")
+
+    svc._job_get_info_multi ([svc.job_id (pid) for pid in sorted (jobs)])
+
+    # one query covers all clusters with jobs which are not gone
+    assert (len (svc.condor_q.cmds) == 1)
+    assert (svc.condor_q.cmds[0].startswith (
+            "-constraint 'ClusterId == 123 || ClusterId == 124 || "
+            "ClusterId == 125 || ClusterId == 126' -autoformat:, "))
+
+    assert (jobs['123.0']['state']      == saga.job.RUNNING)
+    assert (jobs['123.1']['state']      == saga.job.DONE)
+    assert (jobs['123.1']['end_time']   == '1506496182')
+    assert (jobs['124.0']['state']      == saga.job.DONE)
+    assert (jobs['124.0']['returncode'] == 1)
+    assert (not jobs['123.0']['gone'])
+
+    # condor_history is only asked for the jobs condor_q did not report
+    assert (len (svc.shell.cmds) == 1)
+    assert ("-constraint 'ClusterId == 125 || ClusterId == 126' "
+            in svc.shell.cmds[0])
+
+    assert (jobs['125.0']['state']      == saga.job.FAILED)
+    assert (jobs['125.0']['returncode'] == 3)
+    assert (jobs['125.0']['stdout']     == '/tmp/job.out')
+    assert (jobs['125.0']['start_time'] == '1506496100')
+    assert (jobs['125.0']['gone'])
+
+    # jobs which are in neither are considered done
+    assert (jobs['126.0']['state']      == saga.job.DONE)
+    assert (jobs['126.0']['gone'])
+
+    # gone jobs are not queried again
+    assert ('timestamp' not in jobs['127.0'])
+
+    # condor_q failures are fatal
+    svc.condor_q.ret = 1
+    try :
+        svc._job_get_info_multi ([svc.job_id ('123.0')])
+        assert (False)
+    except Exception as e :
+        assert ('condor_q failed' in str (e))
+
+    try :
+        svc._job_get_info_multi ([svc.job_id ('999.0')])
+        assert (False)
+    except ValueError :
+        pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_condor_get_info_multi_chunks () :
+    """ Test that bulk queries are split into chunks of _BULK_QUERY_MAX clusters """
+
+    svc      = _Service ()
+    n        = 2 * condor._BULK_QUERY_MAX + 10
+    clusters = [str (1000 + i) for i in range (n)]
+
+    for cluster in clusters :
+        svc.add_job ('%s.0' % cluster)
+    svc.add_job ('%s.1' % clusters[0])
+
+    svc.shell             = _CannedShell ()
+    svc._adaptor.use_hist = False
+    svc._job_get_info_multi (list (svc.jobs.keys ()))
+
+    queried = list ()
+    for opts in svc.condor_q.cmds :
+        constraint = opts.split ("'")[1]
+        queried   += re.findall (r'ClusterId == (\d+)', constraint)
+        assert (len (constraint.split (' || ')) <= condor._BULK_QUERY_MAX)
+
+    # each cluster is queried once, even if it has several jobs
+    assert (len (svc.condor_q.cmds) == 3)
+    assert (sorted (queried) == clusters)
+    assert (not svc.shell.cmds)
+
+    for info in svc.jobs.values () :
+        assert (info['state'] == saga.job.DONE)
+        assert (info['gone'])
+
+
+# ------------------------------------------------------------------------------
+#
+def _read (path) :
+    with open (path) as f :
+        return f.read ()
+
+
+# ------------------------------------------------------------------------------
+#
+def _write (path, data) :
+    with open (path, 'w') as f :
+        f.write (data)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_condor_stage_cached () :
+    """ Test stage cache hits and misses, and the remote content check """
+
+    tmp = tempfile.mkdtemp ()
+
+    try :
+        remote = os.path.join (tmp, 'remote')
+        src    = os.path.join (tmp, 'input.dat')
+        os.mkdir (remote)
+        _write (src, 'input data\n')
+
+        svc       = _Service ()
+        svc.shell = _Shell (cwd=remote)
+        cache     = os.path.join (remote, condor._STAGE_CACHE_DIR)
+
+        # miss: the file is uploaded into the cache, and copied from there
+        svc._stage_cached (src, 'job.1/input.dat')
+
+        digest = condor._file_hash (src)
+        assert (svc.shell.uploads == ['%s/%s' % (condor._STAGE_CACHE_DIR, digest)])
+        assert (os.listdir (cache) == [digest])
+        assert (_read (os.path.join (remote, 'job.1/input.dat')) == 'input data\n')
+
+        # hit: the same content is not uploaded again
+        copies = list ()
+        svc._stage_cached (src, 'job.2/input.dat', copies)
+        svc._stage_cached (src, 'job.3/sub/input.dat', copies)
+        assert (len (copies) == 2)
+        assert (not os.path.exists (os.path.join (remote, 'job.2')))
+
+        svc._run_copies (copies)
+        assert (len (svc.shell.uploads) == 1)
+        assert (_read (os.path.join (remote, 'job.2/input.dat'))     == 'input data\n')
+        assert (_read (os.path.join (remote, 'job.3/sub/input.dat')) == 'input data\n')
+
+        # the copies are not linked to the cache: jobs can modify them
+        _write (os.path.join (remote, 'job.2/input.dat'), 'modified\n')
+        assert (_read (os.path.join (cache, digest)) == 'input data\n')
+
+        # cmp mismatch: a changed or removed target is copied again
+        svc._stage_cached (src, 'job.2/input.dat')
+        os.unlink (os.path.join (remote, 'job.3/sub/input.dat'))
+        svc._stage_cached (src, 'job.3/sub/input.dat')
+        assert (len (svc.shell.uploads) == 1)
+        assert (_read (os.path.join (remote, 'job.2/input.dat'))     == 'input data\n')
+        assert (_read (os.path.join (remote, 'job.3/sub/input.dat')) == 'input data\n')
+
+        # new local content is a miss
+        _write (src, 'new input data\n')
+        svc._stage_cached (src, 'job.1/input.dat')
+        assert (len (svc.shell.uploads) == 2)
+        assert (len (os.listdir (cache)) == 2)
+        assert (_read (os.path.join (remote, 'job.1/input.dat')) == 'new input data\n')
+
+    finally :
+        shutil.rmtree (tmp)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_condor_stage_cached_no_reflink () :
+    """ Test the fallback to plain copies if 'cp --reflink' is not supported """
+
+    tmp = tempfile.mkdtemp ()
+
+    try :
+        remote = os.path.join (tmp, 'remote')
+        bindir = os.path.join (tmp, 'bin')
+        log    = os.path.join (tmp, 'cp.log')
+        src    = os.path.join (tmp, 'input.dat')
+        os.mkdir (remote)
+        os.mkdir (bindir)
+        _write (src, 'input data\n')
+
+        # a cp which does not know '--reflink', and logs its invocations
+        fake = os.path.join (bindir, 'cp')
+        _write (fake, '#!/bin/sh\n'
+                      'echo "$*" >> %s\n'
+                      'case "$1" in --reflink*) echo "unrecognized option" >&2; '
+                      'exit 1;; esac\n'
+                      'PATH=${PATH#*:} exec cp "$@"\n' % log)
+        os.chmod (fake, 0755)
+
+        svc       = _Service ()
+        svc.shell = _Shell (cwd=remote, bindir=bindir)
+        svc._stage_cached (src, 'job.1/input.dat')
+
+        assert (_read (os.path.join (remote, 'job.1/input.dat')) == 'input data\n')
+
+        calls = _read (log).splitlines ()
+        assert (len (calls) == 2)
+        assert (calls[0].startswith ('--reflink=auto -f '))
+        assert (calls[1].startswith ('-f '))
+
+        # an identical target is not copied at all
+        svc._stage_cached (src, 'job.1/input.dat')
+        assert (len (_read (log).splitlines ()) == 2)
+
+        # failing copies are reported
+        _write (fake, '#!/bin/sh\nexit 1\n')
+        os.chmod (fake, 0755)
+        try :
+            svc._stage_cached (src, 'job.2/input.dat')
+            assert (False)
+        except saga.NoSuccess :
+            pass
+
+    finally :
+        shutil.rmtree (tmp)
+
+
+# ------------------------------------------------------------------------------
+
@@ -0,0 +1,156 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Tests for saga.adaptors.globus_online.go_file
+"""
+
+import shlex
+import threading
+
+import saga
+import saga.adaptors.globus_online.go_file as go
+
+
+_ITEMS = [('me#src/data/a.dat', 'me#tgt/data/a.dat', 0),
+          ('me#src/data/tree',  'me#tgt/data/tree',  saga.filesystem.RECURSIVE),
+          ('me#src/data/b.dat', 'me#tgt/data/b.dat', 0)]
+
+
+# ------------------------------------------------------------------------------
+#
+def test_go_batch_input () :
+    """ Test that batch input lists one transfer per line """
+
+    assert (go._go_batch_input (_ITEMS).splitlines () ==
+            ["'me#src/data/a.dat' 'me#tgt/data/a.dat'",
+             "'me#src/data/tree' 'me#tgt/data/tree' -r",
+             "'me#src/data/b.dat' 'me#tgt/data/b.dat'"])
+
+    # embedded quotes are escaped, line breaks are rejected
+    line = go._go_batch_input ([("me#src/it's here", "me#tgt/'x'", 0)])
+    assert (shlex.split (line) == ["me#src/it's here", "me#tgt/'x'"])
+
+    try :
+        go._go_batch_input ([('me#src/a\nb', 'me#tgt/a', 0)])
+        assert (False)
+    except saga.BadParameter :
+        pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_go_failed_items () :
+    """ Test that failed files are mapped back to the submitted items """
+
+    details = "source_path,destination_path,status\n"            \
+              "/data/a.dat,/data/a.dat,SUCCEEDED\n"               \
+              "/data/tree/x/y.dat,/data/tree/x/y.dat,FAILED\n"    \
+              "/data/b.dat,/data/b.dat,SUCCEEDED\n"
+
+    assert (go._go_failed_items (_ITEMS, details) == [1])
+    assert (go._go_failed_items (_ITEMS, '')      == [])
+
+
+# ------------------------------------------------------------------------------
+#
+def test_go_transfer_batch () :
+    """ Test that batched copies are submitted when the batch is left """
+
+    class _Adaptor (object) :
+        def __init__ (self) :
+            self.calls = list ()
+        def go_transfer_many (self, session, shell, items) :
+            self.calls.append (items)
+            return [None if 'ok' in i[0] else saga.NoSuccess ('x')
+                    for i in items], 1
+
+    class _Dir (object) :
+        def __init__ (self) :
+            self._adaptor = _Adaptor ()
+            self._local   = threading.local ()
+            self.session  = None
+            self.shell    = None
+
+    d = _Dir ()
+
+    with go.GOTransferBatch (d) as b :
+        b.add ('ok_1', 't1', ('ep#ok_1', 'ep#t1', 0))
+        with go.GOTransferBatch (d) as inner :
+            assert (inner is b)
+            inner.add ('ok_2', 't2', ('ep#ok_2', 'ep#t2', 0))
+        assert (not d._adaptor.calls)
+
+    assert (len (d._adaptor.calls) == 1)
+    assert (len (d._adaptor.calls[0]) == 2)
+    assert (b.results['copied'] == 2)
+
+    # failed items are reported
+    try :
+        with go.GOTransferBatch (d) as b :
+            b.add ('ok_1', 't1', ('ep#ok_1', 'ep#t1', 0))
+            b.add ('bad',  't2', ('ep#bad',  'ep#t2', 0))
+        assert (False)
+    except saga.NoSuccess :
+        pass
+
+    assert (b.results['failed'] == 1)
+    assert (not b.results['results'][1]['ok'])
+
+
+# ------------------------------------------------------------------------------
+#
+def test_go_task_wait () :
+    """ Test that waiting for a task which was not started fails """
+
+    class _Task (object) :
+        def get_state (self) :
+            return saga.task.NEW
+
+    try :
+        go.BulkTransfer (None).task_wait (_Task (), -1.0)
+        assert (False)
+    except saga.IncorrectState :
+        pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_go_container_wait () :
+    """ Test that container_wait polls for a timeout of 0, and blocks otherwise """
+
+    bulk = go.BulkTransfer (None)
+
+    class _Task (object) :
+        def __init__ (self) :
+            self._method_context = {'done' : threading.Event ()}
+            self.timeouts        = list ()
+
+        def get_state (self) :
+            return saga.task.RUNNING
+
+        def wait (self, timeout=-1.0) :
+            self.timeouts.append (timeout)
+            bulk.task_wait (self, timeout)
+
+    tasks = [_Task (), _Task ()]
+
+    # does not block on tasks which are not done
+    bulk.container_wait (tasks, saga.task.ALL, 0.0)
+    assert ([t.timeouts for t in tasks] == [[0.0], [0.0]])
+
+    bulk.container_wait (tasks, saga.task.ALL, 0.1)
+    assert (0.0 <= tasks[1].timeouts[-1] <= tasks[0].timeouts[-1] <= 0.1)
+
+    # a negative timeout blocks until all tasks are done
+    threading.Timer (0.1, tasks[0]._method_context['done'].set).start ()
+    threading.Timer (0.1, tasks[1]._method_context['done'].set).start ()
+
+    bulk.container_wait (tasks, saga.task.ALL, -1.0)
+    assert (tasks[0]._method_context['done'].is_set ())
+    assert (tasks[1]._method_context['done'].is_set ())
+
+
+# ------------------------------------------------------------------------------
+
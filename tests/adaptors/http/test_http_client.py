@@ -0,0 +1,286 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Tests for saga.adaptors.http.http_client (and for reads via the http_file
+adaptor), against a local HTTP server which supports range requests.
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+import SocketServer
+import BaseHTTPServer
+
+import saga
+import saga.adaptors.http.http_client as shc
+
+
+_DATA = ''.join([chr(i % 251) for i in range(300 * 1024)])
+
+
+# ------------------------------------------------------------------------------
+#
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    requests         = list()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body):
+
+        self.requests.append([self.command, self.headers.get('Range')])
+
+        rng = self.headers.get('Range')
+        if  rng:
+            start, end = re.match(r'bytes=(\d+)-(\d*)', rng).groups()
+            start = int(start)
+            end   = int(end) if end else len(_DATA) - 1
+            if  start >= len(_DATA):
+                self.send_response(416)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            end = min(end, len(_DATA) - 1)
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d'
+                            % (start, end, len(_DATA)))
+            data = _DATA[start:end + 1]
+        else:
+            self.send_response(200)
+            data = _DATA
+
+        self.send_header('Accept-Ranges',  'bytes')
+        self.send_header('ETag',           '"v1"')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+
+        if  body:
+            self.wfile.write(data)
+
+    def do_HEAD(self): self._send(body=False)
+    def do_GET (self): self._send(body=True)
+
+
+# ------------------------------------------------------------------------------
+#
+class _Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    # keep-alive connections block a handler thread each
+    daemon_threads = True
+
+
+# ------------------------------------------------------------------------------
+#
+def _server():
+
+    server = _Server(('localhost', 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    return server, 'http://localhost:%d/data.bin' % server.server_port
+
+
+# ------------------------------------------------------------------------------
+#
+def test_http_segmented_download () :
+    """ Test segmented parallel download """
+
+    server, url = _server()
+    tmp         = tempfile.mkdtemp()
+
+    try:
+        _Handler.requests = list()
+        client = shc.HTTPClient()
+        target = os.path.join(tmp, 'data.bin')
+        size   = client.download(url, target, max_segments=3,
+                                 segment_size=64 * 1024)
+
+        assert (size == len(_DATA)),                   size
+        assert (open(target, 'rb').read() == _DATA)
+        assert (not os.path.exists(target + '.part'))
+
+        ranges = [r for m, r in _Handler.requests if m == 'GET' and r]
+        assert (len(ranges) == 3),                     _Handler.requests
+
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_http_resume_download () :
+    """ Test that an interrupted download is resumed """
+
+    server, url = _server()
+    tmp         = tempfile.mkdtemp()
+
+    try:
+        client = shc.HTTPClient()
+        target = os.path.join(tmp, 'data.bin')
+        half   = len(_DATA) // 2
+
+        # fake an interrupted single segment download
+        with open(target + '.part', 'wb') as f:
+            f.write(_DATA[:half])
+            f.truncate(len(_DATA))
+
+        with open(target + '.part.json', 'w') as f:
+            f.write('{"url": "%s", "size": %d, "validator": "\\"v1\\"", '
+                    '"segments": [[0, %d, %d]]}' % (url, len(_DATA), len(_DATA), half))
+
+        _Handler.requests = list()
+        client.download(url, target, max_segments=1)
+
+        assert (open(target, 'rb').read() == _DATA)
+        assert (['GET', 'bytes=%d-%d' % (half, len(_DATA) - 1)] in _Handler.requests), \
+               _Handler.requests
+
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_http_part_file () :
+    """ Test that flushed part file data are on disk """
+
+    tmp  = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'data.part')
+
+    try:
+        with open(path, 'wb') as f:
+            f.truncate(100)
+
+        part = shc._PartFile(path)
+        part.write(10, 'abc')
+        part.write(50, 'xyz')
+        part.flush()
+
+        # read through another file object, not through the writer's buffer
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        assert (len(data)    == 100)
+        assert (data[10:13]  == 'abc')
+        assert (data[50:53]  == 'xyz')
+
+        part.close()
+
+    finally:
+        shutil.rmtree(tmp)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_http_read_range () :
+    """ Test ranged reads """
+
+    server, url = _server()
+
+    try:
+        client = shc.HTTPClient()
+
+        assert (client.read_range(url, 10, 20) == _DATA[10:30])
+        assert (client.read_range(url, len(_DATA) - 5, 20) == _DATA[-5:])
+        assert (client.read_range(url, len(_DATA) + 5, 20) == '')
+        assert (client.read_range(url, 100, None) == _DATA[100:])
+
+        info = client.stat(url)
+        assert (info['size'] == len(_DATA)), info
+        assert (info['ranges']),             info
+
+    finally:
+        server.shutdown()
+
+
+# ------------------------------------------------------------------------------
+#
+def test_http_block_cache () :
+    """ Test LRU eviction in the block cache """
+
+    cache = shc.BlockCache(size=30, block_size=10)
+
+    cache.put(0, 'a')
+    cache.put(1, 'b')
+    cache.put(2, 'c')
+
+    assert (cache.get(0) == 'a')
+
+    cache.put(3, 'd')
+
+    assert (cache.get(1) is None)
+    assert (cache.get(0) == 'a')
+    assert (cache.get(2) == 'c')
+    assert (cache.get(3) == 'd')
+
+
+# ------------------------------------------------------------------------------
+#
+def test_http_file_read () :
+    """ Test block assembly, read-ahead and EOF handling of file reads """
+
+    server, url = _server()
+    block       = 64 * 1024
+    size        = len(_DATA)
+
+    def gets():
+        return len([r for m, r in _Handler.requests if m == 'GET'])
+
+    try:
+        _Handler.requests = list()
+        f = saga.filesystem.File(url)
+
+        # a miss reads ahead (256k by default, i.e. blocks 0-3)...
+        assert (f.read(10) == _DATA[:10])
+        assert (gets() == 1), _Handler.requests
+
+        # ... so that reads across those blocks are served from the cache
+        f.seek(60 * 1024, saga.filesystem.START)
+        assert (f.read(10 * 1024) == _DATA[60 * 1024:70 * 1024])
+        assert (gets() == 1), _Handler.requests
+
+        # a read over cached block 3 and the short final block 4 only fetches
+        # block 4 -- the read-ahead beyond EOF returns short
+        offset = 3 * block + 100
+        f.seek(offset, saga.filesystem.START)
+        assert (f.read(100 * 1024) == _DATA[offset:offset + 100 * 1024])
+        assert (gets() == 2), _Handler.requests
+        assert (['GET', 'bytes=%d-%d' % (4 * block, 8 * block - 1)]
+                in _Handler.requests), _Handler.requests
+
+        # reads stop at EOF
+        offset += 100 * 1024
+        assert (f.read(20000) == _DATA[offset:])
+        assert (f.read(10)    == '')
+        assert (gets() == 2), _Handler.requests
+
+        # seek relative to the end
+        assert (f.seek(-100, saga.filesystem.END) == size - 100)
+        assert (f.read() == _DATA[-100:])
+        assert (f.seek(-50, saga.filesystem.CURRENT) == size - 50)
+        assert (f.read(10) == _DATA[-50:-40])
+        assert (gets() == 2), _Handler.requests
+
+        try:
+            f.seek(-1, saga.filesystem.START)
+            assert (False)
+        except saga.BadParameter:
+            pass
+
+        f.close()
+
+    finally:
+        server.shutdown()
+
+
+# ------------------------------------------------------------------------------
+
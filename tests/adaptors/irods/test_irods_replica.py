@@ -0,0 +1,348 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Tests for saga.adaptors.irods.irods_replica
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import subprocess
+
+import saga.adaptors.irods.irods_replica as irods
+
+
+_LISTING = """/osg/home/azebro1:
+  azebro1           0 UFlorida-SSERCA_FTP            12 2012-11-14.09:55 & irods-test.txt
+        /data/cache/UFlorida-SSERCA_FTPplaceholder/home/azebro1/irods-test.txt    osgGridFtpGroup
+  azebro1           1 Nebraska_FTP                   12 2012-11-14.09:57 & irods-test.txt
+        /data/cache/Nebraska_FTPplaceholder/home/azebro1/irods-test.txt    osgGridFtpGroup
+  azebro1           0 Nebraska_FTP                 2048 2012-11-15.10:00 & my data.tgz
+        /data/cache/Nebraska_FTPplaceholder/home/azebro1/my data.tgz    osgGridFtpGroup
+  C- /osg/home/azebro1/subdir
+"""
+
+
+# ------------------------------------------------------------------------------
+#
+def test_irods_parse_listing () :
+    """ Test that replicas are merged while parsing 'ils -L' output """
+
+    listing = irods._irods_parse_listing (_LISTING)
+
+    assert ([e.name for e in listing] == ['irods-test.txt', 'my data.tgz',
+                                          '/osg/home/azebro1/subdir'])
+
+    assert (listing[0].locations == ['UFlorida-SSERCA_FTP', 'Nebraska_FTP'])
+    assert (listing[0].size      == '12')
+    assert (listing[0].owner     == 'azebro1')
+    assert (listing[1].locations == ['Nebraska_FTP'])
+    assert (listing[1].size      == '2048')
+
+    assert (not listing[0].is_directory)
+    assert (    listing[2].is_directory)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_irods_resource () :
+    """ Test that the target resource is taken from the url query """
+
+    assert (irods._irods_resource (None)                                 is None)
+    assert (irods._irods_resource ('irods:///zone/home/a.dat')           is None)
+    assert (irods._irods_resource ('irods:///zone/home/?other=x')        is None)
+    assert (irods._irods_resource ('irods:///zone/home/?resource=disk1') == 'disk1')
+    assert (irods._irods_resource ('irods:///zone/home/?other=x&resource=disk1') == 'disk1')
+
+
+# ------------------------------------------------------------------------------
+#
+def test_irods_catalog () :
+    """ Test that collection listings are cached until invalidated """
+
+    calls = []
+
+    def fetch (collection) :
+        calls.append (collection)
+        return irods._irods_parse_listing (_LISTING)
+
+    catalog = irods._IRODSCatalog (ttl=60)
+
+    listing, index = catalog.get ('/osg/home/azebro1', fetch)
+    assert (len (listing) == 3)
+    assert (index['subdir'].is_directory)
+    assert (index['my data.tgz'].size == '2048')
+
+    catalog.get ('/osg/home/azebro1', fetch)
+    assert (len (calls) == 1)
+
+    catalog.invalidate ('/osg/home/azebro1')
+    catalog.get ('/osg/home/azebro1', fetch)
+    assert (len (calls) == 2)
+
+    # a ttl of 0 disables caching
+    catalog = irods._IRODSCatalog (ttl=0)
+    catalog.get ('/osg/home/azebro1', fetch)
+    catalog.get ('/osg/home/azebro1', fetch)
+    assert (len (calls) == 4)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_irods_stat () :
+    """ Test that stat only lists the collection if it is cached already """
+
+    class _FakeShell (object) :
+
+        def __init__ (self) :
+            self.cmds = list ()
+
+        def run_sync (self, cmd) :
+            self.cmds.append (cmd)
+            if cmd == 'ils -L /osg/home/azebro1/irods-test.txt' :
+                return 0, "\n".join (_LISTING.split ("\n")[1:5]), ''
+            if cmd == 'ils -L /osg/home/azebro1/subdir' :
+                return 0, "/osg/home/azebro1/subdir:\n", ''
+            return 4, 'does not exist', ''
+
+    adaptor          = irods.Adaptor.__new__ (irods.Adaptor)
+    adaptor._catalog = irods._IRODSCatalog (ttl=60)
+    shell            = _FakeShell ()
+
+    # cold cache: only the path itself is queried
+    entry = adaptor.irods_stat ('/osg/home/azebro1/irods-test.txt', shell)
+    assert (entry.locations == ['UFlorida-SSERCA_FTP', 'Nebraska_FTP'])
+    assert (shell.cmds == ['ils -L /osg/home/azebro1/irods-test.txt'])
+
+    entry = adaptor.irods_stat ('/osg/home/azebro1/subdir/', shell)
+    assert (entry.is_directory)
+
+    try :
+        adaptor.irods_stat ('/osg/home/azebro1/nope', shell)
+        assert (False)
+    except irods.saga.DoesNotExist :
+        pass
+
+    # populated catalog: no commands at all
+    adaptor._catalog.get ('/osg/home/azebro1',
+                          lambda c : irods._irods_parse_listing (_LISTING))
+    del (shell.cmds[:])
+
+    assert (adaptor.irods_stat ('/osg/home/azebro1/my data.tgz', shell).size == '2048')
+    assert (adaptor.irods_stat ('/osg/home/azebro1/subdir', shell).is_directory)
+
+    try :
+        adaptor.irods_stat ('/osg/home/azebro1/nope', shell)
+        assert (False)
+    except irods.saga.DoesNotExist :
+        pass
+
+    assert (shell.cmds == [])
+
+
+# ------------------------------------------------------------------------------
+#
+def test_irods_task_wait () :
+    """ Test that waiting for a task which was not started fails """
+
+    class _Task (object) :
+        def get_state (self) :
+            return irods.saga.task.NEW
+
+    try :
+        irods.IRODSFile.task_wait.im_func (None, _Task (), -1.0)
+        assert (False)
+    except irods.saga.IncorrectState :
+        pass
+
+
+# ------------------------------------------------------------------------------
+#
+class _Shell (object) :
+    """ Runs commands locally, with fake icommands in the path """
+
+    def __init__ (self, bindir) :
+        self.env         = dict (os.environ)
+        self.env['PATH'] = "%s:%s" % (bindir, self.env.get ('PATH', ''))
+
+    def run_sync (self, cmd) :
+        proc = subprocess.Popen (cmd, shell=True, env=self.env,
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = proc.communicate ()
+        return proc.returncode, out, err
+
+
+# ------------------------------------------------------------------------------
+#
+def test_irods_bulk () :
+    """ Test that bulk icommands cover all paths in few invocations """
+
+    tmp = tempfile.mkdtemp ()
+
+    try :
+        log  = os.path.join (tmp, 'log')
+        fake = os.path.join (tmp, 'irepl')
+
+        with open (fake, 'w') as f :
+            f.write ('#!/bin/sh\n')
+            f.write ('echo "$#" >> %s\n' % log)
+            f.write ('for arg in "$@"; do echo "$arg" >> %s; done\n' % log)
+            f.write ('case "$*" in *fail*) exit 3;; esac\n')
+        os.chmod (fake, 0755)
+
+        shell = _Shell (tmp)
+        paths = ['/zone/home/data %03d.dat' % i for i in range (100)]
+
+        irods._irods_bulk (shell, 'irepl -R dest', paths, max_len=1000)
+
+        with open (log) as f :
+            lines = f.read ().splitlines ()
+
+        # several invocations, each with the options and a share of the paths
+        counts = list ()
+        args   = list ()
+        while lines :
+            n = int (lines.pop (0))
+            counts.append (n)
+            args  += lines[2:n]
+            lines  = lines[n:]
+
+        assert (1 < len (counts) < 10), counts
+        assert (args == paths)
+
+        # failures are reported
+        try :
+            irods._irods_bulk (shell, 'irepl -R dest', ['/zone/fail'])
+            assert (False)
+        except irods.saga.NoSuccess :
+            pass
+
+        # or collected per path, by retrying failing invocations path by path
+        os.unlink (log)
+        failed = dict ()
+        irods._irods_bulk (shell, 'irepl -R dest',
+                           ['/zone/a', '/zone/fail 1', '/zone/b'], failed=failed)
+
+        assert (list (failed.keys ()) == ['/zone/fail 1'])
+        assert ('errorcode 3' in failed['/zone/fail 1'])
+
+        with open (log) as f :
+            counts = [l for l in f.read ().splitlines () if l.isdigit ()]
+        assert (counts == ['5', '3', '3', '3']), counts
+
+    finally :
+        shutil.rmtree (tmp)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_irods_bulk_replicate () :
+    """ Test that bulk replication runs in the background, and fails per task """
+
+    tmp     = tempfile.mkdtemp ()
+    release = threading.Event ()
+
+    class _BlockingShell (_Shell) :
+        def run_sync (self, cmd) :
+            assert (release.wait (10))
+            return _Shell.run_sync (self, cmd)
+
+    class _Adaptor (object) :
+        irods_opts = irods.Adaptor.__dict__['irods_opts']
+        threads    = 0
+
+        def irods_invalidate (self, path) :
+            pass
+
+    class _Entry (object) :
+        def __init__ (self, shell, path) :
+            self.shell = shell
+            self._url  = irods.saga.Url ('irods://%s' % path)
+
+    class _Task (object) :
+        def __init__ (self, shell, path, resource) :
+            self._adaptor        = _Entry (shell, path)
+            self._method_context = {'target' : 'irods:///zone?resource=%s' % resource,
+                                    'flags'  : 0,
+                                    'done'   : threading.Event ()}
+            self.state           = None
+            self.exception       = None
+
+        def _set_state (self, state) :
+            self.state = state
+
+        def _set_exception (self, e) :
+            self.exception = e
+
+    try :
+        fake = os.path.join (tmp, 'irepl')
+        with open (fake, 'w') as f :
+            f.write ('#!/bin/sh\n')
+            f.write ('case "$*" in *fail*) exit 3;; esac\n')
+        os.chmod (fake, 0755)
+
+        shell = _BlockingShell (tmp)
+        tasks = [_Task (shell, '/zone/a',      'dest1'),
+                 _Task (shell, '/zone/fail 1', 'dest1'),
+                 _Task (shell, '/zone/b',      'dest1'),
+                 _Task (shell, '/zone/c',      'dest2')]
+
+        bulk = irods.BulkLogicalFile (_Adaptor ())
+
+        # returns while the irepl invocations are still blocked
+        bulk.container_replicate (tasks)
+
+        assert ([t.state for t in tasks] == [irods.saga.task.RUNNING] * 4)
+        assert (not [t for t in tasks if t._method_context['done'].is_set ()])
+
+        release.set ()
+        for t in tasks :
+            assert (t._method_context['done'].wait (10))
+
+        # only the task of the failing path fails
+        assert ([t.state for t in tasks] == [irods.saga.task.DONE,
+                                             irods.saga.task.FAILED,
+                                             irods.saga.task.DONE,
+                                             irods.saga.task.DONE])
+        assert (isinstance (tasks[1].exception, irods.saga.NoSuccess))
+        assert (tasks[0].exception is None)
+
+    finally :
+        shutil.rmtree (tmp)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_irods_container_wait () :
+    """ Test that container_wait polls for a timeout of 0 """
+
+    class _Task (object) :
+        def __init__ (self) :
+            self._method_context = {'done' : threading.Event ()}
+            self.timeouts        = list ()
+
+        def get_state (self) :
+            return irods.saga.task.RUNNING
+
+        def wait (self, timeout=-1.0) :
+            self.timeouts.append (timeout)
+            irods.IRODSFile.task_wait.im_func (None, self, timeout)
+
+    bulk  = irods.BulkLogicalFile (None)
+    tasks = [_Task (), _Task ()]
+
+    bulk.container_wait (tasks, irods.saga.task.ALL, 0.0)
+    assert ([t.timeouts for t in tasks] == [[0.0], [0.0]])
+
+    for t in tasks :
+        t._method_context['done'].set ()
+
+    bulk.container_wait (tasks, irods.saga.task.ALL, -1.0)
+    assert ([t.timeouts for t in tasks] == [[0.0, -1.0], [0.0, -1.0]])
+
+
+# ------------------------------------------------------------------------------
+
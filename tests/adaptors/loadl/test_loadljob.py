@@ -0,0 +1,42 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Tests for the bulk llq parser of saga.adaptors.loadl.loadljob
+"""
+
+import saga.adaptors.loadl.loadljob as loadl
+
+
+# 'llq -j kisti.123 kisti.124 kisti.12 kisti.999 -r %id %st %dd %cc %jt %c %Xs'
+_LLQ = """\
+kisti.123.0!R!03/25/2014 13:47!!Serial!normal!kisti.kim
+kisti.124.0!I!03/25/2014 13:48!!Serial!normal!kisti.kim
+llq: There is currently no job status to report.
+"""
+
+
+# ------------------------------------------------------------------------------
+#
+def test_loadl_parse_bulk_llq () :
+    """ Test mapping bulk llq output to job ids """
+
+    parse = loadl.LOADLJobService.__dict__['_parse_bulk_llq']
+    pids  = ['kisti.123', 'kisti.124', 'kisti.12', 'kisti.999']
+    res   = parse (None, _LLQ, pids)
+
+    # job steps map to their jobs, and a job id prefix does not match
+    assert (sorted (res.keys ()) == ['kisti.123', 'kisti.124'])
+
+    assert (res['kisti.123'] == ['R', '03/25/2014 13:47', '', 'Serial',
+                                 'normal', 'kisti.kim'])
+    assert (res['kisti.124'][0] == 'I')
+
+    assert (parse (None, '', pids) == dict ())
+    assert (parse (None, 'llq: There is currently no job status to report.\n',
+                   pids) == dict ())
+
+
+# ------------------------------------------------------------------------------
+
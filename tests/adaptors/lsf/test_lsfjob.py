@@ -0,0 +1,44 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Tests for the bulk bjobs parser of saga.adaptors.lsf.lsfjob
+"""
+
+import saga.adaptors.lsf.lsfjob as lsf
+
+
+# 'bjobs -noheader 2001 2002 2003 2004'
+_BJOBS = """\
+2001    merzky  RUN   normal     login1      node01      sleep      Jun 24 17:24
+2002    merzky  PEND  normal     login1                  sleep      Jun 24 17:25
+Job <2003> is not found
+2004    merzky  DONE  normal     login1      node02      sleep      Jun 24 17:20
+20010   merzky  RUN   normal     login1      node03      other      Jun 24 17:24
+"""
+
+
+# ------------------------------------------------------------------------------
+#
+def test_lsf_parse_bulk_bjobs () :
+    """ Test mapping bulk bjobs output to job ids """
+
+    parse = lsf.LSFJobService.__dict__['_parse_bulk_bjobs']
+    pids  = ['2001', '2002', '2003', '2004']
+    res   = parse (None, _BJOBS, pids)
+
+    # unknown and untracked jobs are left out
+    assert (sorted (res.keys ()) == ['2001', '2002', '2004'])
+
+    assert (res['2001'][2] == 'RUN')
+    assert (res['2001'][5] == 'node01')
+    assert (res['2002'][2] == 'PEND')
+    assert (res['2004'][2] == 'DONE')
+
+    assert (parse (None, '', pids) == dict ())
+    assert (parse (None, 'Job <2001> is not found\n', pids) == dict ())
+
+
+# ------------------------------------------------------------------------------
+
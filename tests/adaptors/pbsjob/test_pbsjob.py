@@ -0,0 +1,63 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Tests for the bulk qstat parser of saga.adaptors.pbs.pbsjob
+"""
+
+import saga.adaptors.pbs.pbsjob as pbs
+
+
+# 'qstat -f1 101.pbs 102.pbs 103.pbs 104.pbs', filtered by _bulk_qstat.  Job
+# 104 is reported with the fully qualified server name.
+_QSTAT = """\
+Job Id: 101.pbs.example.org
+    job_state = R
+    ctime = Tue Jun 24 17:24:43 2013
+    exec_host = node01/0+node01/1
+    start_time = Tue Jun 24 17:24:50 2013
+    mtime = Tue Jun 24 17:24:50 2013
+qstat: Unknown Job Id 103.pbs.example.org
+Job Id: 102.pbs.example.org
+    job_state = Q
+    ctime = Tue Jun 24 17:24:44 2013
+    mtime = Tue Jun 24 17:24:44 2013
+Job Id: 104.pbs.example.org
+    job_state = C
+    exec_host = node02/0
+    exit_status = 1
+    mtime = Tue Jun 24 17:30:12 2013
+Job Id: 999.pbs.example.org
+    job_state = R
+"""
+
+
+# ------------------------------------------------------------------------------
+#
+def test_pbs_parse_bulk_qstat () :
+    """ Test splitting bulk qstat output into per-job lines """
+
+    parse = pbs.PBSJobService.__dict__['_parse_bulk_qstat']
+    pids  = ['101.pbs', '102.pbs', '103.pbs', '104.pbs.example.org']
+    res   = parse (None, _QSTAT, pids)
+
+    # unknown and untracked jobs are left out
+    assert (sorted (res.keys ()) == ['101.pbs', '102.pbs', '104.pbs.example.org'])
+
+    assert (res['101.pbs'][0].strip () == 'job_state = R')
+    assert (len (res['101.pbs'])       == 5)
+    assert (res['102.pbs'][0].strip () == 'job_state = Q')
+    assert (len (res['102.pbs'])       == 3)
+    assert (res['104.pbs.example.org'][2].strip () == 'exit_status = 1')
+
+    # the error line does not end up in the previous job's lines
+    assert (not [l for l in res['101.pbs'] if 'Unknown' in l])
+
+    assert (parse (None, '', pids) == dict ())
+    assert (parse (None, 'qstat: Unknown Job Id 101.pbs.example.org\n',
+                   pids) == dict ())
+
+
+# ------------------------------------------------------------------------------
+
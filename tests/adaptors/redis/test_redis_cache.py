@@ -0,0 +1,103 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Tests for saga.adaptors.redis.redis_cache
+"""
+
+import time
+import logging
+
+import saga.adaptors.redis.redis_cache as rc
+
+
+_logger = logging.getLogger ('test_redis_cache')
+
+
+# ------------------------------------------------------------------------------
+#
+def _miss (cache, key) :
+
+    try :
+        cache.get (key)
+        return False
+    except AttributeError :
+        return True
+
+
+# ------------------------------------------------------------------------------
+#
+def test_redis_cache_lru () :
+    """ Test that the least recently used entries are evicted """
+
+    cache = rc.Cache (logger=_logger, size=3, ttl=60)
+
+    for key in 'abc' :
+        cache.set (key, key)
+
+    # 'a' becomes most recently used, so 'b' is evicted next
+    assert (cache.get ('a') == 'a')
+    cache.set ('d', 'd')
+
+    assert (_miss (cache, 'b'))
+    assert (cache.get ('a') == 'a')
+    assert (cache.get ('c') == 'c')
+    assert (cache.get ('d') == 'd')
+
+    metrics = cache.get_metrics ()
+    assert (metrics['entries']   == 3), metrics
+    assert (metrics['evictions'] == 1), metrics
+    assert (metrics['hits']      == 4), metrics
+    assert (metrics['misses']    == 1), metrics
+
+
+# ------------------------------------------------------------------------------
+#
+def test_redis_cache_bytes () :
+    """ Test that the cache stays within its byte limit """
+
+    cache = rc.Cache (logger=_logger, size=100, ttl=60, max_bytes=10)
+
+    cache.set ('a', 'x' * 4)
+    cache.set ('b', 'x' * 4)
+    cache.set ('c', set (['xx', 'yy']))
+
+    assert (_miss (cache, 'a'))
+    assert (cache.get ('b') == 'x' * 4)
+    assert (cache.get_metrics ()['bytes'] == 8)
+
+    # replacing an entry accounts for the new size only
+    cache.set ('b', 'x')
+    assert (cache.get_metrics ()['bytes'] == 5)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_redis_cache_expiry () :
+    """ Test that expired entries are purged """
+
+    cache = rc.Cache (logger=_logger, ttl=0.1)
+
+    cache.set ('a', 'a')
+    cache.set ('b', 'b')
+    cache.invalidate ('b')
+
+    # a stale fetch is not cached
+    epoch = cache.epoch
+    cache.invalidate ('c')
+    cache.set ('c', 'c', epoch=epoch)
+    assert (_miss (cache, 'c'))
+
+    time.sleep (0.2)
+    cache.purge ()
+
+    metrics = cache.get_metrics ()
+    assert (metrics['entries'] == 0), metrics
+    assert (metrics['bytes']   == 0), metrics
+    assert (metrics['expired'] == 1), metrics
+    assert (not cache.expiry)
+
+
+# ------------------------------------------------------------------------------
+
@@ -0,0 +1,376 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Tests for saga.adaptors.redis.redis_namespace, against a locally spawned
+redis-server.
+"""
+
+import time
+import socket
+import unittest
+import subprocess
+
+import radical.utils as ru
+
+import saga
+import saga.advert
+
+import saga.adaptors.redis.redis_namespace as rns
+
+
+_server = None
+_url    = None
+
+
+# ------------------------------------------------------------------------------
+#
+def setup_module () :
+
+    global _server, _url
+
+    if  not ru.which ('redis-server') :
+        raise unittest.SkipTest ('redis-server not found')
+
+    s = socket.socket ()
+    s.bind (('localhost', 0))
+    port = s.getsockname ()[1]
+    s.close ()
+
+    _server = subprocess.Popen (['redis-server', '--port', str(port),
+                                 '--save', '', '--appendonly', 'no'],
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    _url    = saga.Url ('redis://localhost:%d/' % port)
+
+    for _ in range (50) :
+        try :
+            socket.create_connection (('localhost', port)).close ()
+            return
+        except socket.error :
+            time.sleep (0.1)
+
+    raise RuntimeError ('redis-server did not start')
+
+
+# ------------------------------------------------------------------------------
+#
+def teardown_module () :
+
+    if  _server :
+        _server.terminate ()
+        _server.wait ()
+
+
+# ------------------------------------------------------------------------------
+#
+def _wait_for (check, timeout=2.0) :
+
+    start = time.time ()
+    while time.time () - start < timeout :
+        if  check () :
+            return True
+        time.sleep (0.01)
+
+    return False
+
+
+# ------------------------------------------------------------------------------
+#
+def test_redis_cache_coherence () :
+    """ Test that cached entries are invalidated by other clients' writes """
+
+    r1 = rns.redis_ns_server (_url, cache_ttl=60)
+    r2 = rns.redis_ns_server (_url, cache_ttl=60)
+
+    flags = saga.advert.CREATE | saga.advert.CREATE_PARENTS
+
+    e1 = rns.redis_ns_entry.open (r1, '/coherence', flags)
+    e1.set_key ('state', 'idle')
+
+    e2 = rns.redis_ns_entry.open (r2, '/coherence', 0)
+    assert (e2.get_key ('state') == 'idle')
+
+    # reads are now served from the cache
+    hits = r2.cache.hit
+    for _ in range (10) :
+        assert (e2.get_key ('state') == 'idle')
+    assert (r2.cache.hit >= hits + 10), r2.cache.hit
+
+    # a write by the other client invalidates the cached entry
+    e1.set_key ('state', 'busy with work')
+    assert (_wait_for (lambda : e2.get_key ('state') == 'busy with work'))
+
+
+# ------------------------------------------------------------------------------
+#
+def test_redis_cache_stale_writes () :
+    """ Test that updates are not cached if invalidated while in flight """
+
+    r     = rns.redis_ns_server (_url, cache_ttl=60)
+    flags = saga.advert.CREATE | saga.advert.CREATE_PARENTS
+    key   = rns.DATA + ':/stale'
+
+    e = rns.redis_ns_entry.open (r, '/stale', flags)
+
+    # another writer's invalidation arrives between fetch and update
+    fetch = e.fetch
+    def _fetch () :
+        fetch ()
+        r.cache.invalidate (key)
+    e.fetch = _fetch
+
+    e.set_key ('state', 'idle')
+
+    try :
+        r.cache.get (key)
+        assert (False), 'stale data cached'
+    except AttributeError :
+        pass
+
+    # same for updates which wait in a batch
+    e.fetch = fetch
+
+    with r.batch () :
+        e.set_key ('state', 'busy')
+        r.cache.invalidate (key)
+
+    try :
+        r.cache.get (key)
+        assert (False), 'stale batch data cached'
+    except AttributeError :
+        pass
+
+
+# ------------------------------------------------------------------------------
+#
+def test_redis_list_recursive () :
+    """ Test that recursive listings cover the whole tree in one call """
+
+    r     = rns.redis_ns_server (_url)
+    flags = saga.advert.CREATE | saga.advert.CREATE_PARENTS
+
+    for path in ['/tree/a/x', '/tree/a/y', '/tree/b/c/z', '/tree/e'] :
+        rns.redis_ns_entry.open (r, path, flags)
+
+    root = rns.redis_ns_entry.opendir (r, '/tree', 0)
+    assert (sorted (root.list_recursive ()) == ['/tree/a',   '/tree/a/x',
+                                                '/tree/a/y', '/tree/b',
+                                                '/tree/b/c', '/tree/b/c/z',
+                                                '/tree/e'])
+
+    leaf = rns.redis_ns_entry.opendir (r, '/tree/b/c', 0)
+    assert (leaf.list_recursive () == ['/tree/b/c/z'])
+
+
+# ------------------------------------------------------------------------------
+#
+def test_redis_find () :
+    """ Test index backed searches for names and attributes """
+
+    r     = rns.redis_ns_server (_url)
+    flags = saga.advert.CREATE | saga.advert.CREATE_PARENTS
+
+    for name, state in [['w1', 'idle'], ['w2', 'busy'], ['w3', 'idle']] :
+        e = rns.redis_ns_entry.open (r, '/pool/%s' % name, flags)
+        e.set_key ('state', state)
+        e.set_key ('host',  'node_%s' % name)
+
+    # 'idle' as value of another key must not match state=idle
+    e = rns.redis_ns_entry.open (r, '/pool/sub/w4', flags)
+    e.set_key ('mood', 'idle')
+
+    pool = rns.redis_ns_entry.opendir (r, '/pool', 0)
+
+    assert (pool.find (attrs=[['state', 'idle']]) == ['/pool/w1', '/pool/w3'])
+    assert (pool.find (attrs=[['state', 'idle'], ['host', '*3']]) == ['/pool/w3'])
+    assert (pool.find (attrs=[['*', 'idle']], recursive=True)
+                                    == ['/pool/sub/w4', '/pool/w1', '/pool/w3'])
+    assert (pool.find (attrs=[['mood', None]]) == [])
+    assert (pool.find (attrs=[['mood', None]], recursive=True) == ['/pool/sub/w4'])
+    assert (pool.find (attrs=[['state', 'gone*']]) == [])
+
+    assert (pool.find ('w[12]') == ['/pool/w1', '/pool/w2'])
+    assert (pool.find ('w*', recursive=True) == ['/pool/sub/w4', '/pool/w1',
+                                                 '/pool/w2',     '/pool/w3'])
+
+
+# ------------------------------------------------------------------------------
+#
+def test_redis_expiry_events () :
+    """ Test that the server config is only changed if asked to """
+
+    key = 'notify-keyspace-events'
+    r   = rns.redis_ns_server (_url, cache_ttl=0)
+    r.config_set (key, '')
+
+    rns.redis_ns_server (_url, cache_ttl=0)
+    assert (r.config_get (key)[key] == '')
+
+    rns.redis_ns_server (_url, cache_ttl=0, expiry_events=True)
+    assert (sorted (r.config_get (key)[key]) == ['E', 'x'])
+
+
+# ------------------------------------------------------------------------------
+#
+def test_redis_ttl () :
+    """ Test that expired entries are removed from listings and indexes """
+
+    r     = rns.redis_ns_server (_url, expiry_events=True)
+    flags = saga.advert.CREATE | saga.advert.CREATE_PARENTS
+
+    beat = rns.redis_ns_entry.open (r, '/pilots/p1', flags)
+    beat.set_key ('state', 'alive')
+    assert (beat.get_ttl () == -1.0)
+
+    old = rns.redis_ns_entry.opendir (r, '/pilots/old', flags)
+    rns.redis_ns_entry.open (r, '/pilots/old/p2', flags).set_key ('state', 'alive')
+
+    beat.set_ttl (0.2)
+    old.set_ttl  (0.2)
+    assert (0 < beat.get_ttl () <= 0.2)
+
+    pilots = rns.redis_ns_entry.opendir (r, '/pilots', 0)
+    assert (len (pilots.list_recursive ()) == 3)
+
+    # redis expires keys lazily on access, or in its periodic expiry cycle
+    def gone () :
+        r.exists ('node:/pilots/p1')
+        r.exists ('node:/pilots/old')
+        return not pilots.list_recursive ()
+
+    assert (_wait_for (gone, timeout=5.0))
+    assert (not r.sismember ('vals:alive', '/pilots/p1'))
+    assert (not r.sismember ('vals:alive', '/pilots/old/p2'))
+    assert (not r.exists    ('idx:/pilots/old/p2'))
+
+    # a refreshed ttl can be removed again
+    beat = rns.redis_ns_entry.open (r, '/pilots/p3', flags)
+    beat.set_ttl (10)
+    beat.set_ttl (-1)
+    assert (beat.get_ttl () == -1.0)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_redis_dir_child_ttl () :
+    """ Test that a ttl set through a directory applies to the child """
+
+    flags = saga.advert.CREATE | saga.advert.CREATE_PARENTS
+    base  = str (_url).rstrip ('/')
+
+    d = saga.advert.Directory (base + '/dir_ttl/', flags)
+    e = saga.advert.Entry     (base + '/dir_ttl/child', flags)
+
+    d.set_ttl ('child', 10.0)
+
+    assert (0 < d.get_ttl ('child') <= 10.0)
+    assert (0 < e.get_ttl ()        <= 10.0)
+    assert (d.get_ttl () == -1.0)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_redis_callbacks () :
+    """ Test per-path notifications and batched attribute updates """
+
+    class _Obj (object) :
+        _UP = 'up'
+        def __init__ (self)               : self.seen = dict ()
+        def set_attribute (self, k, v, f) : self.seen[k] = v
+
+    def numsub (path) :
+        return r.execute_command ('PUBSUB', 'NUMSUB', rns.MON+':'+path)[1]
+
+    r     = rns.redis_ns_server (_url, cache_ttl=0)
+    flags = saga.advert.CREATE | saga.advert.CREATE_PARENTS
+
+    # no cache, no callbacks: no need to listen to any advert events
+    assert (rns.MON not in r.channels)
+
+    e1  = rns.redis_ns_entry.open (r, '/cb/e1', flags)
+    e2  = rns.redis_ns_entry.open (r, '/cb/e2', flags)
+    obj = _Obj ()
+
+    e1.manage_callback ('state', 1, lambda : True, obj)
+    assert (_wait_for (lambda : numsub ('/cb/e1') == 1))
+    assert (numsub ('/cb/e2') == 0)
+
+    e1.set_attributes ({'state' : 'busy', 'load' : '0.5'})
+    e2.set_attributes ({'state' : 'idle'})
+
+    assert (_wait_for (lambda : obj.seen.get ('state') == 'busy'))
+    assert (obj.seen == {'state' : 'busy'}), obj.seen
+
+    assert (e1.get_data () == {'state' : 'busy', 'load' : '0.5'})
+    assert (r.smembers ('vals:busy') == set (['/cb/e1']))
+    assert (r.smembers ('idx:/cb/e1') == set (['keys:state', 'keys:load',
+                                               'vals:busy',  'vals:0.5']))
+
+    # the last callback removed unsubscribes the path
+    e1.manage_callback ('state', 1, None, obj)
+    assert (_wait_for (lambda : numsub ('/cb/e1') == 0))
+    assert ('/cb/e1' not in r.callbacks)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_redis_batch () :
+    """ Test that batched updates are sent when the batch is left """
+
+    r     = rns.redis_ns_server (_url, pool_size=2)
+    other = rns.redis_ns_server (_url, cache_ttl=0)
+    flags = saga.advert.CREATE | saga.advert.CREATE_PARENTS
+
+    assert (r.pool.max_connections == 2)
+
+    paths   = ['/batch/e%d' % i for i in range (10)]
+    entries = [rns.redis_ns_entry.open (r, path, flags) for path in paths]
+
+    with r.batch () as b :
+
+        b.prefetch (entries)
+
+        for e in entries :
+            e.set_key ('state', 'done')
+
+        # nested batches are merged into the outer one
+        with r.batch () as inner :
+            assert (inner is b)
+            entries[0].set_key ('extra', 'yes')
+
+        # nothing is sent yet
+        assert (len (b.pipe) > 0)
+        assert (rns.redis_ns_entry.open (other, paths[0], 0).get_data () == {})
+
+    assert (r.get_batch () is None)
+    for path in paths :
+        assert (rns.redis_ns_entry.open (other, path, 0).get_key ('state') == 'done')
+    assert (entries[0].get_data () == {'state' : 'done', 'extra' : 'yes'})
+
+    # a failing batch is dropped as a whole
+    try :
+        with r.batch () :
+            entries[1].set_key ('state', 'lost')
+            raise RuntimeError ('oops')
+    except RuntimeError :
+        pass
+
+    assert (rns.redis_ns_entry.open (other, paths[1], 0).get_key ('state') == 'done')
+
+
+# ------------------------------------------------------------------------------
+#
+def test_redis_attrs_match () :
+    """ Test attribute pattern matching """
+
+    data = {'state' : 'idle', 'host' : 'node_1'}
+
+    assert (    rns._attrs_match (data, [['state', 'idle']]))
+    assert (    rns._attrs_match (data, [['state', None], ['h*', 'node_?']]))
+    assert (not rns._attrs_match (data, [['host',  'idle']]))
+    assert (not rns._attrs_match (data, [['state', 'idle'], ['mood', None]]))
+
+
+# ------------------------------------------------------------------------------
+
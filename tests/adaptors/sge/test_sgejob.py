@@ -0,0 +1,95 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Tests for the qstat and accounting parsers of saga.adaptors.sge.sgejob
+"""
+
+import saga
+import saga.adaptors.sge.sgejob as sge
+
+
+_QSTAT_XML = """<?xml version='1.0'?>
+<job_info  xmlns:xsd="http://arc.liv.ac.uk/repos/darcs/sge/source/dist/util/resources/schemas/qstat/qstat.xsd">
+  <queue_info>
+    <job_list state="running">
+      <JB_job_number>101</JB_job_number>
+      <JAT_prio>0.55500</JAT_prio>
+      <JB_name>sim_1</JB_name>
+      <JB_owner>merzky</JB_owner>
+      <state>r</state>
+      <JAT_start_time>2013-06-24T17:24:50</JAT_start_time>
+      <queue_name>all.q@node01</queue_name>
+      <slots>1</slots>
+    </job_list>
+  </queue_info>
+  <job_info>
+    <job_list state="pending">
+      <JB_job_number>102</JB_job_number>
+      <JAT_prio>0.00000</JAT_prio>
+      <JB_name>sim_2</JB_name>
+      <JB_owner>merzky</JB_owner>
+      <state>qw</state>
+      <JB_submission_time>2013-06-24T17:24:43</JB_submission_time>
+      <queue_name></queue_name>
+      <slots>1</slots>
+    </job_list>
+  </job_info>
+</job_info>
+"""
+
+# qname:hostname:group:owner:job_name:job_number:account:priority:
+# submission_time:start_time:end_time:failed:exit_status:...
+_ACCOUNTING = """# Version: 2011.11p1
+# ATTENTION: This file contains the following data records
+all.q:node01:users:merzky:sim_1:101:sge:0:1372087483:1372087490:1372088690:0:0:1200
+all.q:node02:users:merzky:sim_3:103:sge:0:1372087483000:1372087490000:1372088690000:100:137:1200
+all.q:node02:users:merzky:other:999:sge:0:1372087483:1372087490:1372088690:0:0:1200
+all.q:node02:users:merzky:broken
+"""
+
+
+# ------------------------------------------------------------------------------
+#
+def test_sge_parse_qstat_xml () :
+    """ Test parsing of 'qstat -xml' output for running and pending jobs """
+
+    jobs = sge._parse_qstat_xml (_QSTAT_XML)
+
+    assert (sorted (jobs.keys ()) == ['101', '102'])
+
+    assert (jobs['101']['state']      == 'r')
+    assert (jobs['101']['name']       == 'sim_1')
+    assert (jobs['101']['queue']      == 'all.q@node01')
+    assert (jobs['101']['start_time'] == 'Mon Jun 24 17:24:50 2013')
+
+    assert (jobs['102']['state']       == 'qw')
+    assert (jobs['102']['create_time'] == 'Mon Jun 24 17:24:43 2013')
+    assert (jobs['102']['start_time']  is None)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_sge_parse_accounting () :
+    """ Test parsing of accounting records, in seconds and milliseconds """
+
+    infos = sge._parse_accounting (_ACCOUNTING, ['101', '103', '104'])
+
+    assert (sorted (infos.keys ()) == ['101', '103'])
+
+    assert (infos['101']['state']      == saga.job.DONE)
+    assert (infos['101']['returncode'] == 0)
+    assert (infos['101']['exec_hosts'] == 'node01')
+    assert (infos['101']['name']       == 'sim_1')
+
+    assert (infos['103']['state']      == saga.job.FAILED)
+    assert (infos['103']['returncode'] == 137)
+
+    # millisecond time stamps are converted like second ones
+    assert (infos['103']['start_time'] == infos['101']['start_time'])
+    assert (infos['103']['end_time']   == infos['101']['end_time'])
+
+
+# ------------------------------------------------------------------------------
+
@@ -0,0 +1,156 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Tests for saga.adaptors.shell.shell_file
+"""
+
+import os
+import shutil
+import tempfile
+import subprocess
+
+import saga
+import saga.adaptors.shell.shell_file as sf
+
+
+# ------------------------------------------------------------------------------
+#
+def test_shell_parse_list_stat () :
+    """ Test parsing of the listing used to fill the stat cache """
+
+    out = "f 5 1372087490.5 a.dat\r\n"          \
+          "d 4096 1372087491.0 sub dir\n"       \
+          "l 7 - link\n"                        \
+          "p 0 - fifo\n"                        \
+          "f - - unknown size\n"                \
+          "garbage\n"
+
+    entries = sf._parse_list_stat (out)
+
+    assert (sorted (entries.keys ()) == ['a.dat', 'fifo', 'link',
+                                         'sub dir', 'unknown size'])
+
+    assert (entries['a.dat']        == ('f', 5,    1372087490.5))
+    assert (entries['sub dir']      == ('d', 4096, 1372087491.0))
+    assert (entries['link']         == ('l', 7,    None))
+    assert (entries['fifo']         == ('o', 0,    None))
+    assert (entries['unknown size'] == ('f', None, None))
+
+
+# ------------------------------------------------------------------------------
+#
+def test_shell_stat_cache () :
+    """ Test that copy, move, remove and make_dir invalidate the stat cache """
+
+    tmp = tempfile.mkdtemp ()
+
+    try :
+        with open (os.path.join (tmp, 'a'), 'w') as f : f.write ('hello')
+        with open (os.path.join (tmp, 'b'), 'w') as f : f.write ('abc')
+
+        os.mkdir (os.path.join (tmp, 'sub'))
+        with open (os.path.join (tmp, 'sub', 'c'), 'w') as f : f.write ('x')
+
+        d = saga.filesystem.Directory ('file://localhost%s' % tmp)
+
+        # uncached sizes are exact bytes, too
+        assert (d.get_size ('sub/c') == 1)
+
+        assert (d.list () == [saga.Url ('a'), saga.Url ('b'), saga.Url ('sub')])
+        assert (d.get_size ('a') == 5)
+        assert (d.get_size ('b') == 3)
+
+        d.copy ('a', 'b', saga.filesystem.OVERWRITE)
+        assert (d.get_size ('b') == 5)
+
+        d.list ()
+        d.move ('a', 'moved')
+        assert (not d.exists  ('a'))
+        assert (    d.is_file ('moved'))
+
+        d.list ()
+        d.remove ('moved')
+        assert (not d.exists ('moved'))
+
+        d.list ()
+        d.make_dir ('new')
+        assert (d.is_dir ('new'))
+
+        d.close ()
+
+    finally :
+        shutil.rmtree (tmp)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_shell_octal_escape () :
+    """ Test that escaped data survive the shell's printf """
+
+    assert (sf._octal_escape ('a\n\x00\xff') == '\\141\\012\\000\\377')
+    assert (sf._octal_escape ('') == '')
+
+    data = ''.join ([chr (i) for i in range (256)])
+    out  = subprocess.check_output (['sh', '-c', "printf '%s'" % sf._octal_escape (data)])
+
+    assert (out == data)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_shell_file_ranges () :
+    """ Test seek, read and write, and their vectored versions """
+
+    tmp  = tempfile.mkdtemp ()
+    path = os.path.join (tmp, 'data')
+
+    def _content () :
+        with open (path) as f :
+            return f.read ()
+
+    try :
+        with open (path, 'w') as f :
+            f.write ('some old content, longer than the new one')
+
+        flags = saga.filesystem.READ | saga.filesystem.WRITE
+        f     = saga.filesystem.File ('file://localhost%s' % path, flags)
+
+        # the first write on a pristine handle replaces the file...
+        f.write ('0123456789')
+        assert (_content () == '0123456789')
+
+        # ... later writes patch it in place
+        f.seek (2, saga.filesystem.START)
+        f.write ('XY')
+        f.write ('Z')
+        assert (_content () == '01XYZ56789')
+
+        f.seek (3, saga.filesystem.START)
+        assert (f.read (4) == 'YZ56')
+        assert (f.read (2) == '78')
+
+        f.seek (-2, saga.filesystem.END)
+        assert (f.read () == '89')
+
+        assert (f.read_v ([(0, 2), (8, 2), (4, 1)]) == ['01', '89', 'Z'])
+        assert (f.write_v ([(0, 'a'), (9, 'b')])    == [1, 1])
+        assert (_content () == 'a1XYZ5678b')
+
+        f.close ()
+
+        # a handle which was read from is not pristine anymore
+        f = saga.filesystem.File ('file://localhost%s' % path, flags)
+        assert (f.read (1) == 'a')
+        f.write ('Q')
+        assert (_content () == 'aQXYZ5678b')
+
+        f.close ()
+
+    finally :
+        shutil.rmtree (tmp)
+
+
+# ------------------------------------------------------------------------------
+
@@ -0,0 +1,93 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Tests for saga.adaptors.shell.shell_job
+"""
+
+import threading
+
+import radical.utils as ru
+
+import saga
+import saga.adaptors.shell.shell_job as sj
+
+
+# ------------------------------------------------------------------------------
+#
+class _Service (object) :
+    """ The parts of a job service used by the staging pipeline """
+
+    class _Shell (object) :
+        submitter = None
+
+    def __init__ (self) :
+        self.rm      = saga.Url ('fork://localhost/')
+        self.opts    = None
+        self.shell   = self._Shell ()
+        self.session = saga.Session ()
+
+    def get_session (self) :
+        return self.session
+
+
+# ------------------------------------------------------------------------------
+#
+def test_shell_staging_pipeline () :
+    """ Test task submission, callbacks and error propagation of the pipeline """
+
+    pipeline = sj._staging_pipeline (_Service (), 2,
+                                     ru.Logger ('radical.saga'))
+    results  = list ()
+    lock     = threading.Lock ()
+    done     = threading.Event ()
+
+    def _task (shell) :
+        ret, out, _ = shell.run_sync ('echo hello')
+        assert (ret == 0 and out.strip () == 'hello')
+
+    def _callback (error) :
+        with lock :
+            results.append (error)
+            if  len (results) == 5 :
+                done.set ()
+
+    try :
+        for _ in range (5) :
+            pipeline.submit (_task, _callback)
+
+        done.wait (60)
+        assert (results == [None] * 5)
+        assert (len (pipeline.workers) == 2)
+
+        # errors are passed to callbacks, and raised by run()
+        def _fail (shell) :
+            raise saga.NoSuccess ('staging failed')
+
+        try :
+            pipeline.run (_fail)
+            assert (False)
+        except saga.NoSuccess :
+            pass
+
+        pipeline.run (_task)
+
+        # queued tasks complete before the workers and their shells go away
+        workers = list (pipeline.workers)
+        results = list ()
+        done.clear ()
+
+        for _ in range (5) :
+            pipeline.submit (_task, _callback)
+
+    finally :
+        pipeline.finalize ()
+
+    assert (results == [None] * 5)
+    assert (not [w for w in workers if w.is_alive ()])
+    assert (pipeline.shells == [])
+
+
+# ------------------------------------------------------------------------------
+
@@ -0,0 +1,51 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Tests for the bulk squeue/sacct parser of saga.adaptors.slurm.slurm_job
+"""
+
+import saga.adaptors.slurm.slurm_job as slurm
+
+
+# squeue output, followed by sacct output for the same jobs: sacct also
+# reports job steps, and may lag behind squeue.
+_SQUEUE = """\
+500725|COMPLETING
+500726|PENDING
+500723|COMPLETED
+500723.batch|COMPLETED
+500723.0|COMPLETED
+500725|RUNNING
+500725.batch|RUNNING
+500682|CANCELLED by 900369
+500730|
+"""
+
+
+# ------------------------------------------------------------------------------
+#
+def test_slurm_parse_bulk_squeue () :
+    """ Test merging bulk squeue and sacct output """
+
+    parse = slurm.SLURMJobService.__dict__['_parse_bulk_squeue']
+    pids  = ['500682', '500723', '500725', '500726', '500730', '500999']
+    res   = parse (None, _SQUEUE, pids)
+
+    # jobs without state, and jobs unknown to both, are left out
+    assert (sorted (res.keys ()) == ['500682', '500723', '500725', '500726'])
+
+    # squeue comes first, and takes precedence over sacct
+    assert (res['500725'] == 'COMPLETING')
+    assert (res['500726'] == 'PENDING')
+    assert (res['500723'] == 'COMPLETED')
+    assert (res['500682'] == 'CANCELLED')
+
+    assert (parse (None, '', pids) == dict ())
+    assert (parse (None, "slurm_load_jobs error: Invalid job id specified\n",
+                   pids) == dict ())
+
+
+# ------------------------------------------------------------------------------
+
@@ -6,11 +6,17 @@ __license__   = "MIT"
 
 import os
 import time
+import shutil
 import signal
+import tempfile
+import unittest
+import threading
+
 import saga
 import saga.utils.pty_shell   as sups
 import saga.utils.test_config as sutc
 
+import radical.utils         as ru
 import radical.utils.testing as rut
 
 
@@ -115,5 +121,113 @@ def test_ptyshell_file_stage () :
 
 
 # ------------------------------------------------------------------------------
+#
+def test_ptyshell_tree_stage_fail () :
+    """ Test that tree copies fail if the sending tar fails """
+
+    if  os.geteuid () == 0 :
+        raise unittest.SkipTest ('root can read unreadable files')
+
+    conf  = rut.get_test_config ()
+    shell = sups.PTYShell (saga.Url(conf.job_service_url), conf.session)
+
+    src = tempfile.mkdtemp (prefix='saga-test-tree-')
+    tgt = "/tmp/saga-test-tree-%d" % os.getpid ()
+
+    try :
+        for name in ['a', 'b', 'c'] :
+            with open (os.path.join (src, name), 'w') as f :
+                f.write (name)
+
+        os.chmod (os.path.join (src, 'b'), 0)
+
+        try :
+            shell.stage_tree_to_remote (src, tgt)
+            assert (False), "expected NoSuccess"
+        except saga.NoSuccess :
+            pass
+
+    finally :
+        os.chmod (os.path.join (src, 'b'), 0600)
+        shutil.rmtree (src)
+        shell.run_sync ("rm -rf '%s'" % tgt)
+        shell.finalize (True)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyshell_group_copies () :
+    """ Test grouping of copies by target directory """
+
+    pairs = [['/data/a.txt',   '/tgt/a.txt'  ],
+             ['/data/b.txt',   '/other/'     ],
+             ['/data/c.txt',   '/tgt/'       ],
+             ['/data/d.txt',   '/tgt/e.txt'  ],   # rename
+             ['/data/*.dat',   '/tgt/'       ],   # wildcard
+             ['/data/sub/',    '/tgt/sub'    ],
+             ['/',             '/tgt/root'   ],   # no name
+             ['/data/f.txt',   '/other/f.txt'],
+             ['g.txt',         'g.txt'       ],
+             ['/data/h.txt',   '/'           ]]
+
+    groups, singles = sups._group_copies (pairs)
+
+    # groups keep the order of their first request, and files keep their order
+    assert (groups  == [['/tgt',   ['/data/a.txt', '/data/c.txt', '/data/sub/']],
+                        ['/other', ['/data/b.txt', '/data/f.txt']],
+                        ['',       ['g.txt'                     ]],
+                        ['/',      ['/data/h.txt'               ]]])
 
+    assert (singles == [['/data/d.txt', '/tgt/e.txt'],
+                        ['/data/*.dat', '/tgt/'     ],
+                        ['/',           '/tgt/root' ]])
+
+    assert (sups._group_copies ([]) == ([], []))
+
+
+# ------------------------------------------------------------------------------
+#
+def test_ptyshell_copy_many_flags () :
+    """ Test that grouped copies run one command per target dir, with flags """
+
+    tmp = tempfile.mkdtemp ()
+    log = os.path.join (tmp, 'log')
+
+    class _Shell (object) :
+
+        def __init__ (self) :
+            self.pty_shell = type ('pty', (object,), {'rlock' : threading.RLock ()}) ()
+            self.singles   = list ()
+            self.pty_info  = {'copy_mode' : 'fake',
+                              'scp_root'  : '',
+                              'logger'    : ru.Logger ('radical.saga'),
+                              'scripts'   : {'fake' : {'copy_many_to' :
+                                  "sh -c 'echo \"%%(cp_flags)s|%%(tgt)s|\" %%(srcs)s >> %s'" % log}}}
+
+        def _trace (self, msg) :
+            pass
+
+        def run_copy_to (self, src, tgt, cp_flags) :
+            self.singles.append ([src, tgt, cp_flags])
+            return [src]
+
+    try :
+        shell = _Shell ()
+        files = sups.PTYShell._run_copy_many.im_func (shell, 'to',
+                        [['/data/a.txt', '/tgt/a.txt'],
+                         ['/data/b.txt', '/tgt/c.txt'],
+                         ['/data/d.txt', '/tgt/'     ]], '-r')
+
+        # renames are copied one by one, after the groups
+        assert (files == ['/data/a.txt', '/data/d.txt', '/data/b.txt'])
+        assert (shell.singles == [['/data/b.txt', '/tgt/c.txt', '-r']])
+
+        with open (log) as f :
+            assert (f.read ().splitlines () == ['-r|/tgt/| /data/a.txt /data/d.txt'])
+
+    finally :
+        shutil.rmtree (tmp)
+
+
+# ------------------------------------------------------------------------------
 
@@ -0,0 +1,125 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Unit tests for saga.utils.job.state_coalescer.py
+"""
+
+import threading
+
+import saga.utils.job.state_coalescer as scm
+
+from saga.utils.job import StateCoalescer
+
+
+# ------------------------------------------------------------------------------
+#
+def test_coalescer_merges_concurrent_queries () :
+    """ Test that concurrent queries result in one bulk query """
+
+    queries  = list ()
+    joined   = threading.Event ()   # all callers joined the batch
+    querying = threading.Event ()   # the bulk query is running
+    release  = threading.Event ()   # let the bulk query return
+
+    # the batch window is held open until all callers joined the batch
+    class _Ids (set) :
+        def add (self, id) :
+            set.add (self, id)
+            if  len (self) == 5 :
+                joined.set ()
+
+    class _Batch (scm._Batch) :
+        def __init__ (self) :
+            super (_Batch, self).__init__ ()
+            self.ids = _Ids ()
+
+    class _Time (object) :
+        def sleep (self, seconds) :
+            assert (joined.wait (10))
+
+    def query (ids) :
+        queries.append (sorted (ids))
+        querying.set ()
+        assert (release.wait (10))
+        return ' '.join (ids)
+
+    def parse (out, ids) :
+        return dict ([(i, 'state_%s' % i) for i in out.split () if i != '3'])
+
+    batch, clock = scm._Batch, scm.time
+    scm._Batch   = _Batch
+    scm.time     = _Time ()
+
+    try :
+        sc      = StateCoalescer (query, parse, window=0.2)
+        results = dict ()
+
+        def worker (i) :
+            results[i] = sc.get (str (i))
+
+        threads = [threading.Thread (target=worker, args=[i]) for i in range (5)]
+        for t in threads : t.start ()
+
+        # the batch is closed once its query runs: a new call starts a new
+        # batch, and does not see the results of the running query
+        assert (querying.wait (10))
+        assert (sc._batch is None)
+
+        threads.append (threading.Thread (target=worker, args=[5]))
+        threads[-1].start ()
+
+        release.set ()
+        for t in threads : t.join (10)
+
+        assert (queries == [['0', '1', '2', '3', '4'], ['5']]), queries
+        assert (results[0] == 'state_0'), results
+        assert (results[5] == 'state_5'), results
+        assert (results[3] is None),      results
+
+    finally :
+        scm._Batch = batch
+        scm.time   = clock
+
+
+# ------------------------------------------------------------------------------
+#
+def test_coalescer_chunks () :
+    """ Test that get_many() splits large queries """
+
+    queries = list()
+
+    def query (ids) :
+        queries.append (ids)
+        return ids
+
+    def parse (out, ids) :
+        return dict ([(i, i) for i in out])
+
+    sc      = StateCoalescer (query, parse, max_ids=2)
+    results = sc.get_many (['a', 'b', 'c'])
+
+    assert (len(queries) == 2), queries
+    assert (results == {'a' : 'a', 'b' : 'b', 'c' : 'c'}), results
+
+
+# ------------------------------------------------------------------------------
+#
+def test_coalescer_error () :
+    """ Test that query errors are passed to the callers """
+
+    def query (ids) :
+        raise RuntimeError ('backend down')
+
+    sc = StateCoalescer (query, None, window=0)
+
+    try :
+        sc.get ('1')
+        assert False
+    except RuntimeError as e :
+        assert ('backend down' in str(e)), str(e)
+
+
+# ------------------------------------------------------------------------------
+
@@ -0,0 +1,131 @@
+__author__    = "Andre Merzky"
+__copyright__ = "Copyright 2018, The SAGA Project"
+__license__   = "MIT"
+
+
+""" Unit tests for saga.utils.transfer_scheduler.py
+"""
+
+import time
+import threading
+
+import saga.utils.transfer_scheduler as sts
+
+
+# ------------------------------------------------------------------------------
+#
+def test_scheduler_host_limit () :
+    """ Test that concurrent transfers per host are capped """
+
+    ts     = sts.TransferScheduler (max_streams_per_host=2)
+    lock   = threading.Lock ()
+    active = {'a' : 0, 'b' : 0}
+    peak   = {'a' : 0, 'b' : 0}
+
+    def worker (host) :
+        with ts.transfer (host, size=10) :
+            with lock :
+                active[host] += 1
+                peak[host]    = max (peak[host], active[host])
+            time.sleep (0.05)
+            with lock :
+                active[host] -= 1
+
+    threads = [threading.Thread (target=worker, args=[h]) for h in 'aaaaab']
+    for t in threads : t.start ()
+    for t in threads : t.join  ()
+
+    assert (peak == {'a' : 2, 'b' : 1}), peak
+
+    metrics = ts.get_metrics ()
+    assert (metrics['bytes_done'] == 60),  metrics
+    assert (metrics['queued']     == 0),   metrics
+    assert (metrics['active']     == 0),   metrics
+    assert (metrics['queue_wait_max'] > 0), metrics
+
+
+# ------------------------------------------------------------------------------
+#
+def test_scheduler_priority () :
+    """ Test that queued transfers are started by priority and fair share """
+
+    ts      = sts.TransferScheduler (max_streams_per_host=2)
+    order   = list()
+    release = threading.Event ()
+
+    ts.set_priority ('high', 10)
+
+    def blocker () :
+        with ts.transfer ('a', submitter='blocker') :
+            release.wait ()
+
+    # 'busy' keeps one transfer active, 'blocker' holds the second stream
+    with ts.transfer ('a', submitter='busy') :
+
+        threads = [threading.Thread (target=blocker)]
+        threads[0].start ()
+
+        while ts.get_metrics ()['active'] < 2 :
+            time.sleep (0.01)
+
+        for sub in ['busy', 'other', 'high'] :
+            def worker (sub=sub) :
+                with ts.transfer ('a', submitter=sub) :
+                    order.append (sub)
+            t = threading.Thread (target=worker)
+            t.start ()
+            threads.append (t)
+
+        while ts.get_metrics ()['queued'] < 3 :
+            time.sleep (0.01)
+
+        release.set ()
+        for t in threads : t.join ()
+
+    assert (order == ['high', 'other', 'busy']), order
+
+
+# ------------------------------------------------------------------------------
+#
+def test_scheduler_reentrant () :
+    """ Test that nested transfers to the same host do not block """
+
+    ts = sts.TransferScheduler (max_streams_per_host=1)
+
+    with ts.transfer ('a') as outer :
+        with ts.transfer ('a') :
+            outer.progress (5)
+
+    assert (ts.get_metrics ()['bytes_done'] == 5)
+
+
+# ------------------------------------------------------------------------------
+#
+def test_scheduler_prune () :
+    """ Test that completed transfers are pruned without reading metrics """
+
+    window = sts._THROUGHPUT_WINDOW
+    sts._THROUGHPUT_WINDOW = 0.1
+
+    try :
+        ts = sts.TransferScheduler ()
+
+        for _ in range (10) :
+            with ts.transfer ('a', size=10) :
+                pass
+
+        assert (len (ts._done) == 10)
+
+        time.sleep (0.2)
+        with ts.transfer ('a', size=10) :
+            pass
+
+        assert (len (ts._done) == 1)
+        assert (ts.get_metrics ()['bytes_done'] == 110)
+
+    finally :
+        sts._THROUGHPUT_WINDOW = window
+
+
+# ------------------------------------------------------------------------------
+